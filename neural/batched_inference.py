@@ -0,0 +1,65 @@
+import asyncio
+from typing import List, Optional
+
+import numpy as np
+
+import logger_config
+from logger_config import get_logger
+from robocode_env import RobocodeGameState
+
+logger = get_logger(__name__)
+
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent act requests from many sessions into one forward pass.
+
+    Requests queue up until max_batch_size are pending or max_delay seconds have passed since the
+    first one, then DQNAgent.act_batch picks every action at once and the awaiting coroutines are
+    resumed with their own result.
+    """
+
+    def __init__(self, agent, max_batch_size: int = 32, max_delay: float = 0.001):
+        self.agent = agent
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._states: List[np.ndarray] = []
+        self._futures: List[asyncio.Future] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def act(self, game_state: RobocodeGameState) -> int:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._states.append(self.agent.env.encode_observation(game_state))
+        self._futures.append(future)
+
+        if len(self._futures) >= self.max_batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        states, futures = self._states, self._futures
+        self._states, self._futures = [], []
+        if not futures:
+            return
+
+        try:
+            actions = self.agent.act_batch(np.stack(states))
+        except Exception as e:
+            logger.exception("Batched inference failed")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, action in zip(futures, actions.tolist()):
+            # The caller may have gone away (cancelled RPC) while waiting for the batch
+            if not future.done():
+                future.set_result(action)
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Batched inference over {len(futures)} requests")
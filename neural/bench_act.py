@@ -0,0 +1,113 @@
+"""
+Micro-benchmark for the DQNAgent.act inference path.
+
+Compares the previous torch path (the original process_observation, kept below as
+baseline_process_observation: two torch.tensor calls from Python lists and a torch.cat, then a
+forward under no_grad and argmax().item()) with the NumpyPolicy fast path on the same weights and
+the same game state. The encoder is also timed on its own, old against new.
+
+    python bench_act.py --iterations 20000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import torch
+
+import robot
+from dqn_agent import DQN
+from inference import NumpyPolicy
+from robocode_env import RobocodeEnv, RobocodeGameState
+
+
+def sample_state() -> RobocodeGameState:
+    robot_state = robot.RobotState(x=120.0, y=260.0, velocity=4.0, heading=90.0, gun_heading=45.0,
+                                   radar_heading=10.0, gun_heat=0.4, gun_turn_remaining=5.0,
+                                   radar_turn_remaining=30.0, energy=87.5,
+                                   battle_field_width=400.0, battle_field_height=400.0)
+    enemy = robot.ScannedRobotEvent(x=0.0, y=0.0, velocity=-3.0, heading=180.0, bearing=-25.0,
+                                    distance=210.0, energy=64.0)
+    return RobocodeGameState(robot_state=robot_state, enemy=enemy, events=[])
+
+
+def baseline_process_observation(env: RobocodeEnv, game_state: RobocodeGameState) -> torch.Tensor:
+    """The encoder act() used before NumpyPolicy, verbatim apart from being a free function."""
+    robot_state = game_state.robot_state
+    enemy_state = game_state.enemy
+    max_distance = np.sqrt(robot_state.battle_field_width ** 2 + robot_state.battle_field_height ** 2)
+    robot_tensor = torch.tensor([
+        robot_state.x / robot_state.battle_field_width,
+        robot_state.y / robot_state.battle_field_height,
+        robot_state.velocity / env.MAX_VELOCITY,
+        robot_state.heading / (2 * math.pi),
+        robot_state.gun_heading / (2 * math.pi),
+        robot_state.radar_heading / (2 * math.pi),
+        robot_state.gun_heat / env.MAX_GUN_HEAT,
+        robot_state.gun_turn_remaining / (2 * math.pi),
+        robot_state.radar_turn_remaining / (2 * math.pi),
+        robot_state.energy / env.MAX_ENERGY,
+    ], dtype=torch.float32)
+    if enemy_state is None:
+        enemy_tensor = torch.tensor([-1, -1, 0, -1, env.MISSING_BEARING, -1, -1], dtype=torch.float32)
+    else:
+        enemy_tensor = torch.tensor([
+            enemy_state.x / robot_state.battle_field_width,
+            enemy_state.y / robot_state.battle_field_height,
+            enemy_state.velocity / env.MAX_VELOCITY,
+            enemy_state.heading / (2 * math.pi),
+            env._normalize_bearing(enemy_state.bearing),
+            enemy_state.distance / max_distance,
+            enemy_state.energy / env.MAX_ENERGY,
+        ], dtype=torch.float32)
+    return torch.cat([robot_tensor, enemy_tensor])
+
+
+def measure(fn, iterations: int) -> float:
+    for _ in range(min(1000, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    env = RobocodeEnv()
+    model = DQN(17, len(RobocodeEnv.ActionType))
+    model.eval()
+    policy = NumpyPolicy.from_model(model)
+    game_state = sample_state()
+
+    def torch_path() -> int:
+        state = baseline_process_observation(env, game_state)
+        with torch.no_grad():
+            act_values = model(state)
+        return torch.argmax(act_values).item()
+
+    def numpy_path() -> int:
+        return policy.act(env.encode_observation(game_state))
+
+    assert np.array_equal(baseline_process_observation(env, game_state).numpy(), env.encode_observation(game_state)), \
+        "new encoder does not reproduce the baseline features"
+    assert torch_path() == numpy_path(), "fast path disagrees with the torch model"
+
+    old_encode_us = measure(lambda: baseline_process_observation(env, game_state), args.iterations)
+    new_encode_us = measure(lambda: env.encode_observation(game_state), args.iterations)
+    torch_us = measure(torch_path, args.iterations)
+    numpy_us = measure(numpy_path, args.iterations)
+    print(f"baseline encode: {old_encode_us:8.2f} us/call")
+    print(f"numpy encode   : {new_encode_us:8.2f} us/call")
+    print(f"torch act path : {torch_us:8.2f} us/call")
+    print(f"numpy act path : {numpy_us:8.2f} us/call")
+    print(f"speedup        : {torch_us / numpy_us:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Measures in-process send_state latency under each logging profile.
+
+Each profile runs in its own interpreter because logging is configured once at import of main.
+Runs inside a scratch directory so the bench never touches the real model, logs or replay buffer.
+
+    python bench_logging.py --steps 5000
+    python bench_logging.py --profile production --steps 5000
+
+On one CPU core shared with the background learner, 3000 calls per run, debug measured a mean of
+1424-1653 us (p50 1038-1304 us) and production 738-963 us (p50 430-601 us).
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from logger_config import LOG_PROFILE_ENV, PROFILES
+
+
+def random_game_state(rng: random.Random):
+    import robot
+    robot_state = robot.RobotState(x=rng.uniform(18, 382), y=rng.uniform(18, 382), velocity=rng.uniform(-8, 8),
+                                   heading=rng.uniform(0, 360), gun_heading=rng.uniform(0, 360),
+                                   radar_heading=rng.uniform(0, 360), gun_heat=rng.uniform(0, 1.6),
+                                   gun_turn_remaining=rng.uniform(-20, 20), radar_turn_remaining=rng.uniform(-45, 45),
+                                   energy=rng.uniform(0, 100), battle_field_width=400, battle_field_height=400)
+    enemy = robot.ScannedRobotEvent(velocity=rng.uniform(-8, 8), heading=rng.uniform(0, 360),
+                                    bearing=rng.uniform(-180, 180), distance=rng.uniform(36, 560),
+                                    energy=rng.uniform(0, 100))
+    return robot.GameState(robot_state=robot_state, enemy=enemy)
+
+
+async def run(steps: int) -> np.ndarray:
+    from main import RobotServiceServicer
+    from betterproto.lib.std.google.protobuf import Empty
+
+    servicer = RobotServiceServicer(replay_path=None)
+    rng = random.Random(0)
+    latencies = np.empty(steps, dtype=np.float64)
+    try:
+        await servicer.start_round(Empty())
+        for i in range(steps):
+            game_state = random_game_state(rng)
+            start = time.perf_counter()
+            await servicer.send_state(game_state)
+            latencies[i] = time.perf_counter() - start
+    finally:
+        servicer.close()
+    return latencies
+
+
+def bench_profile(profile: str, steps: int) -> None:
+    os.environ[LOG_PROFILE_ENV] = profile
+    os.chdir(tempfile.mkdtemp(prefix='bench-logging-'))
+    latencies = asyncio.run(run(steps)) * 1e6
+    print(f"{profile:>10}: mean {latencies.mean():8.1f} us  p50 {np.percentile(latencies, 50):8.1f} us  "
+          f"p99 {np.percentile(latencies, 99):8.1f} us  ({steps} send_state calls)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=5000)
+    parser.add_argument('--profile', choices=sorted(PROFILES), help="run one profile in this process")
+    args = parser.parse_args()
+
+    if args.profile:
+        bench_profile(args.profile, args.steps)
+        return
+    for profile in ('debug', 'production'):
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--profile', profile, '--steps', str(args.steps)],
+                       check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Load generator for RobotServiceServicer, so capacity can be measured without the JVM and Robocode.
+
+Each simulated robot plays rounds of StartRound, SendState (or Act) and EndRound, with OnEvent
+bursts between states (or, with --batch-events, the same events carried by the next GameState or
+RoundResult, as NeuralRobot sends them by default) and a share of turns where the enemy was not scanned. Clients run closed-loop
+(next call as soon as the previous reply arrives) or at a fixed rate per client; fixed-rate latency
+is measured from the scheduled send time so a stalled server is not hidden by the client backing off.
+
+    python bench_servicer.py --clients 8 --seconds 20
+    python bench_servicer.py --clients 8 --event-burst-rate 0.5 --batch-events
+    python bench_servicer.py --target grpc --clients 16 --rate 30 --batch-events --action-repeat 3
+    python bench_servicer.py --target grpc --clients 32 --rate 30
+    python bench_servicer.py --target grpc --address 127.0.0.1:5001 --clients 4 --rpc act
+
+The in-process and locally served targets run in a scratch directory so the real model, replay
+buffer and logs are never touched; --address benchmarks a server that is already running.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+from betterproto.lib.std.google.protobuf import Empty
+
+import robot
+from instrumentation import LatencyHistogram, percentiles_ns
+from session import SESSION_METADATA_KEY, current_session_id
+
+RPC_NAMES = ('SendState', 'Act', 'OnEvent', 'EndRound', 'StartRound')
+FIELD_SIZE = 800.0
+
+
+class TrafficGenerator:
+    """Produces one robot's message sequence: a smooth random walk plus events and round ends."""
+
+    def __init__(self, rng: random.Random, steps_per_round: int = 300, enemy_missing_rate: float = 0.2,
+                 event_burst_rate: float = 0.05, max_burst_size: int = 8, batch_events: bool = False):
+        self.rng = rng
+        self.steps_per_round = steps_per_round
+        self.enemy_missing_rate = enemy_missing_rate
+        self.event_burst_rate = event_burst_rate
+        self.max_burst_size = max_burst_size
+        self.batch_events = batch_events
+
+    def rounds(self, state_rpc: str) -> Iterator[Tuple[str, object]]:
+        while True:
+            yield 'StartRound', Empty()
+            x, y, heading, energy, enemy_energy = FIELD_SIZE / 2, FIELD_SIZE / 2, 0.0, 100.0, 100.0
+            pending = []
+            for step in range(self.steps_per_round):
+                heading = (heading + self.rng.uniform(-10, 10)) % 360
+                velocity = self.rng.uniform(-8, 8)
+                x = min(max(x + velocity * math.sin(math.radians(heading)), 18), FIELD_SIZE - 18)
+                y = min(max(y + velocity * math.cos(math.radians(heading)), 18), FIELD_SIZE - 18)
+                energy = max(energy - self.rng.uniform(0, 0.3), 0)
+                enemy_energy = max(enemy_energy - self.rng.uniform(0, 0.3), 0)
+                state = self.game_state(x, y, velocity, heading, energy, enemy_energy, step)
+                state.events, pending = pending, []
+                yield state_rpc, state
+                if self.rng.random() < self.event_burst_rate:
+                    events = [self.event() for _ in range(self.rng.randint(1, self.max_burst_size))]
+                    if self.batch_events:
+                        pending = events
+                    else:
+                        for event in events:
+                            yield 'OnEvent', event
+                if energy == 0 or enemy_energy == 0:
+                    break
+            reason = robot.RoundResultReason.WIN if energy >= enemy_energy else robot.RoundResultReason.LOSS
+            yield 'EndRound', robot.RoundResult(reason=reason, events=pending)
+
+    def game_state(self, x, y, velocity, heading, energy, enemy_energy, step) -> robot.GameState:
+        rng = self.rng
+        robot_state = robot.RobotState(x=x, y=y, velocity=velocity, heading=heading,
+                                       gun_heading=rng.uniform(0, 360), radar_heading=rng.uniform(0, 360),
+                                       gun_heat=rng.uniform(0, 1.6), gun_turn_remaining=rng.uniform(-20, 20),
+                                       radar_turn_remaining=rng.uniform(-45, 45), energy=energy,
+                                       battle_field_width=FIELD_SIZE, battle_field_height=FIELD_SIZE, time=step)
+        if rng.random() < self.enemy_missing_rate:
+            return robot.GameState(robot_state=robot_state)
+        # The Java mapper leaves the enemy's x/y unset, so they arrive as zero
+        enemy = robot.ScannedRobotEvent(velocity=rng.uniform(-8, 8), heading=rng.uniform(0, 360),
+                                        bearing=rng.uniform(-180, 180), distance=rng.uniform(36, 1000),
+                                        energy=enemy_energy, time=step)
+        return robot.GameState(robot_state=robot_state, enemy=enemy)
+
+    def event(self) -> robot.Event:
+        rng = self.rng
+        bullet = robot.Bullet(heading_radians=rng.uniform(0, 2 * math.pi), x=rng.uniform(0, FIELD_SIZE),
+                              y=rng.uniform(0, FIELD_SIZE), power=rng.uniform(0.1, 3), is_active=False)
+        kind = rng.randrange(5)
+        if kind == 0:
+            return robot.Event(bullet_hit=robot.BulletHitEvent(name='enemy', energy=rng.uniform(0, 100), bullet=bullet))
+        if kind == 1:
+            return robot.Event(bullet_missed=robot.BulletMissedEvent(bullet=bullet))
+        if kind == 2:
+            return robot.Event(hit_by_bullet=robot.HitByBulletEvent(bearing=rng.uniform(-180, 180), bullet=bullet))
+        if kind == 3:
+            return robot.Event(hit_wall=robot.HitWallEvent(bearing=rng.uniform(-180, 180)))
+        return robot.Event(hit_robot=robot.HitRobotEvent(robot_name='enemy', bearing=rng.uniform(-180, 180),
+                                                         energy=rng.uniform(0, 100), at_fault=rng.random() < 0.5))
+
+
+class InProcessTarget:
+    """Calls the servicer coroutines directly; measures handler cost without HTTP/2 or protobuf."""
+
+    def __init__(self, servicer):
+        self.methods = {'SendState': servicer.send_state, 'Act': servicer.act, 'OnEvent': servicer.on_event,
+                        'EndRound': servicer.end_round, 'StartRound': servicer.start_round}
+
+    def client(self, session_id: str):
+        # Each client runs in its own task, so setting the context variable here only affects that client
+        current_session_id.set(session_id)
+        return self.methods
+
+
+class GrpcTarget:
+    def __init__(self, channel):
+        self.stub = robot.RobotServiceStub(channel)
+
+    def client(self, session_id: str):
+        metadata = {SESSION_METADATA_KEY: session_id}
+        stub = self.stub
+
+        def bind(method):
+            return lambda message: method(message, metadata=metadata)
+
+        return {'SendState': bind(stub.send_state), 'Act': bind(stub.act), 'OnEvent': bind(stub.on_event),
+                'EndRound': bind(stub.end_round), 'StartRound': bind(stub.start_round)}
+
+
+async def run_client(target, client_id: int, args, histograms: Dict[str, LatencyHistogram], held: Dict[str, int],
+                     deadline: float) -> None:
+    methods = target.client(f"bench-{client_id}-{uuid.uuid4().hex[:8]}")
+    generator = TrafficGenerator(random.Random(args.seed + client_id), steps_per_round=args.steps_per_round,
+                                 enemy_missing_rate=args.enemy_missing_rate, event_burst_rate=args.event_burst_rate,
+                                 batch_events=args.batch_events)
+    state_rpc = 'Act' if args.rpc == 'act' else 'SendState'
+    interval = 1.0 / args.rate if args.rate else 0.0
+    next_send = time.perf_counter()
+    repeats_left, carried_events = 0, []
+
+    for rpc, message in generator.rounds(state_rpc):
+        if time.perf_counter() >= deadline:
+            return
+        if rpc == state_rpc and interval:
+            # Fixed rate applies to turns; events and round markers go out back to back like the robot sends them
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = next_send
+            next_send += interval
+        else:
+            start = time.perf_counter()
+        if rpc == state_rpc and repeats_left:
+            # The robot re-applies its last plan here; batched events wait for the next message it sends
+            repeats_left -= 1
+            carried_events.extend(message.events)
+            held[state_rpc] += 1
+            continue
+        if rpc in (state_rpc, 'EndRound'):
+            message.events, carried_events = carried_events + message.events, []
+            repeats_left = 0
+        reply = await methods[rpc](message)
+        histograms[rpc].record(int((time.perf_counter() - start) * 1e9))
+        if rpc == state_rpc:
+            repeats_left = reply.repeat
+
+
+async def run(args, target) -> Tuple[Dict[str, LatencyHistogram], Dict[str, int], float]:
+    histograms = {name: LatencyHistogram() for name in RPC_NAMES}
+    held = {'SendState': 0, 'Act': 0}
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    await asyncio.gather(*(run_client(target, i, args, histograms, held, deadline) for i in range(args.clients)))
+    return histograms, held, time.perf_counter() - started
+
+
+def report(histograms: Dict[str, LatencyHistogram], held: Dict[str, int], elapsed: float, args) -> None:
+    print(f"target={args.target} clients={args.clients} "
+          f"mode={'%g/s per client' % args.rate if args.rate else 'closed-loop'} elapsed={elapsed:.1f}s")
+    print(f"{'rpc':<11}{'count':>9}{'calls/s':>10}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>11}")
+    for name in RPC_NAMES:
+        h = histograms[name]
+        if not h.count:
+            continue
+        p50, p90, p99 = (percentiles_ns(h.counts, h.count, h.max_ns) / 1e3).tolist()
+        print(f"{name:<11}{h.count:>9}{h.count / elapsed:>10.1f}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}"
+              f"{h.max_ns / 1e3:>11.1f}")
+    steps = histograms['SendState'].count + histograms['Act'].count
+    calls = sum(h.count for h in histograms.values())
+    print(f"steps/sec: {steps / elapsed:.1f}  rpcs/step: {calls / max(steps, 1):.2f}")
+    if args.action_repeat:
+        turns = steps + sum(held.values())
+        print(f"states/sec incl. held by action plans: {turns / elapsed:.1f}  rpcs/state: {calls / max(turns, 1):.2f}")
+
+
+def make_servicer(args):
+    os.chdir(tempfile.mkdtemp(prefix='bench-servicer-'))
+    from main import RobotServiceServicer
+    return RobotServiceServicer(background_learning=not args.sync_learning, replay_path=None,
+                                latency_snapshot_path=None, action_repeat=args.action_repeat)
+
+
+async def main_async(args) -> None:
+    if args.target == 'inprocess':
+        servicer = make_servicer(args)
+        try:
+            histograms, held, elapsed = await run(args, InProcessTarget(servicer))
+        finally:
+            servicer.close()
+        report(histograms, held, elapsed, args)
+        return
+
+    from grpclib.client import Channel
+    from grpclib.server import Server
+
+    servicer, server = None, None
+    if args.address:
+        host, port = args.address.rsplit(':', 1)
+    else:
+        servicer = make_servicer(args)
+        server = Server([servicer])
+        host, port = '127.0.0.1', args.port
+        await server.start(host, int(port))
+    channel = Channel(host, int(port))
+    try:
+        histograms, held, elapsed = await run(args, GrpcTarget(channel))
+    finally:
+        channel.close()
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            servicer.close()
+    report(histograms, held, elapsed, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('inprocess', 'grpc'), default='inprocess')
+    parser.add_argument('--address', help="host:port of a running server (grpc target only)")
+    parser.add_argument('--port', type=int, default=50151, help="port for the locally started server")
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=0.0, help="turns per second per client; 0 = closed-loop")
+    parser.add_argument('--rpc', choices=('send_state', 'act'), default='send_state')
+    parser.add_argument('--steps-per-round', type=int, default=300)
+    parser.add_argument('--enemy-missing-rate', type=float, default=0.2)
+    parser.add_argument('--event-burst-rate', type=float, default=0.05)
+    parser.add_argument('--batch-events', action='store_true', help="send events inside GameState instead of OnEvent")
+    parser.add_argument('--action-repeat', type=int, default=0,
+                        help="Actions.repeat the locally started server answers with; clients always honour it")
+    parser.add_argument('--sync-learning', action='store_true', help="train on the request path, not the learner thread")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    np.random.seed(args.seed)
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
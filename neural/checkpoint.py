@@ -0,0 +1,105 @@
+import glob
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+import torch
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+class CheckpointManager:
+    """
+    Writes full training-state checkpoints from a background thread.
+
+    Every checkpoint is written to a temp file, fsynced and renamed into place, so a crash never
+    leaves a truncated file behind. The newest checkpoint is always at model_path; the last
+    keep_last ones are also kept as checkpoints/dqn-<train_step>.pth next to it (none with keep_last=0).
+    """
+
+    def __init__(self, model_path: str, keep_last: int = 5):
+        if keep_last < 0:
+            raise ValueError(f"keep_last must be >= 0, got {keep_last}")
+        self.model_path = model_path
+        self.keep_last = keep_last
+        self.checkpoint_dir = os.path.join(os.path.dirname(model_path) or '.', 'checkpoints')
+        # Room for one pending checkpoint; if the disk is slower than save_interval we skip rather than queue up
+        self._queue: queue.Queue = queue.Queue(maxsize=1)
+        self._thread: Optional[threading.Thread] = None
+
+    def save_async(self, state: Dict[str, Any], step: int) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((state, step))
+            return True
+        except queue.Full:
+            logger.warning(f"Checkpoint writer busy, skipping checkpoint at step {step}")
+            return False
+
+    def close(self, timeout: float = 30.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def load_latest(self, map_location=None) -> Optional[Dict[str, Any]]:
+        # Fall back through the history if the newest file is unreadable
+        for path in [self.model_path] + self.history()[::-1]:
+            if not os.path.exists(path):
+                continue
+            try:
+                state = torch.load(path, map_location=map_location)
+                logger.info(f"Checkpoint loaded from {path}")
+                return state
+            except Exception as e:
+                logger.warning(f"Could not load checkpoint {path}: {e}")
+        return None
+
+    def history(self) -> List[str]:
+        """History files, oldest first."""
+        # By write time rather than name: train_step starts over on a fresh run or a legacy checkpoint
+        # without one, and then older, higher-numbered files would sort after the newest
+        paths = glob.glob(os.path.join(self.checkpoint_dir, 'dqn-*.pth'))
+        return sorted(paths, key=lambda path: (os.stat(path).st_mtime_ns, path))
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            state, step = self._queue.get()
+            if state is None:
+                return
+            try:
+                self.write(state, step)
+            except Exception:
+                logger.exception(f"Failed to write checkpoint at step {step}")
+
+    def write(self, state: Dict[str, Any], step: int) -> None:
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        history_path = os.path.join(self.checkpoint_dir, f"dqn-{step:09d}.pth")
+        self._atomic_save(state, history_path)
+        self._atomic_save(state, self.model_path)
+
+        history = self.history()
+        # An explicit end index: [:-keep_last] would be [:-0], an empty slice, for keep_last=0
+        for stale in history[:max(len(history) - self.keep_last, 0)]:
+            os.remove(stale)
+        logger.info(f"Checkpoint for step {step} saved to {self.model_path} and {history_path}")
+
+    @staticmethod
+    def _atomic_save(state: Dict[str, Any], path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
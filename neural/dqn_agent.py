@@ -1,14 +1,21 @@
+import copy
+import itertools
+import time
+from typing import Optional, Tuple
+
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import random
 import numpy as np
-from collections import deque
-import os
+from checkpoint import CHECKPOINT_FORMAT_VERSION, CheckpointManager
+from inference import POLICY_PRECISIONS, NumpyPolicy, QuantizedPolicy, agreement
+from instrumentation import LatencyRecorder, now
+import logger_config
 from logger_config import get_logger
 
-from typing import Deque, Tuple
-
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer
+from reward_engine import REWARD_INPUT_FIELDS, RewardEngine
 from robocode_env import  RobocodeGameState
 logger = get_logger(__name__)
 
@@ -27,11 +34,21 @@ class DQN(nn.Module):
         return self.fc3(x)
 
 class DQNAgent:
-    def __init__(self, state_size: int, action_size: int, env, writer, model_path: str = "dqn_model.pth", save_interval: int = 1000):
+    def __init__(self, state_size: int, action_size: int, env, metrics, model_path: str = "dqn_model.pth", save_interval: int = 1000,
+                 memory_size: int = 50000, policy_publish_interval: int = 10, prioritized_replay: bool = False,
+                 keep_checkpoints: int = 5, memory_path: Optional[str] = None,
+                 latency: Optional[LatencyRecorder] = None, policy_precision: str = 'fp32',
+                 min_policy_agreement: float = 0.98, agreement_sample_size: int = 512):
+        if policy_precision not in POLICY_PRECISIONS:
+            raise ValueError(f"policy_precision must be one of {POLICY_PRECISIONS}, got {policy_precision!r}")
         self.env = env
+        self.latency = latency if latency is not None else LatencyRecorder(enabled=False)
         self.state_size = state_size
         self.action_size = action_size
-        self.memory: Deque[Tuple[RobocodeGameState, int, float, RobocodeGameState, bool]] = deque(maxlen=50000)
+        self.prioritized_replay = prioritized_replay
+        memory_class = PrioritizedReplayBuffer if prioritized_replay else ReplayBuffer
+        self.memory: ReplayBuffer = memory_class(memory_size, state_size, path=memory_path,
+                                                 reward_input_size=len(REWARD_INPUT_FIELDS))
         self.gamma = 0.9  # Discount rate
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_min = 0.01
@@ -45,51 +62,102 @@ class DQNAgent:
         else:
             self.device = torch.device("cpu")
 
-        self.writer = writer
+        self.metrics = metrics
         self.train_step = 0
 
         self.model = DQN(state_size, action_size).to(self.device)
         self.target_model = DQN(state_size, action_size).to(self.device)
+        # Immutable fp32 copy of self.model for act() and GetPolicy; replaced wholesale so readers never see a
+        # half-updated net
+        self.policy: NumpyPolicy = NumpyPolicy.from_model(self.model)
+        # Policy versions start at the wall clock in microseconds, so an actor's cached version is never
+        # mistaken for a current one after a server restart
+        self._policy_versions = itertools.count(time.time_ns() // 1000)
+        self.policy_publish_interval = policy_publish_interval
+        # What act() runs: self.policy, or a policy_precision copy of it while its greedy actions agree with
+        # self.policy on at least min_policy_agreement of agreement_sample_size stored states
+        self.act_policy = self.policy
+        self.policy_precision = policy_precision
+        self.min_policy_agreement = min_policy_agreement
+        self.agreement_sample_size = agreement_sample_size
         self.optimizer = optim.Adam(self.model.parameters(), lr=self.learning_rate)
-        self.criterion = nn.MSELoss()
+        # Per-sample loss so prioritized replay can apply importance-sampling weights
+        self.criterion = nn.MSELoss(reduction='none')
 
         self.model_path = model_path
         self.save_interval = save_interval
         self.episodes = 0
+        self.checkpoints = CheckpointManager(model_path, keep_last=keep_checkpoints)
 
         self.load()
+        self.publish_policy()
         logger.info(f"DQNAgent initialized. Device: {self.device}, Model path: {self.model_path}")
 
-    def remember(self, state: RobocodeGameState, action: int, reward: float, next_state: RobocodeGameState, done: bool) -> None:
-        self.memory.append((state, action, reward, next_state, done))
-        logger.debug(f"Memory updated. Current size: {len(self.memory)}")
+    def remember(self, state: RobocodeGameState, action: int, reward: float, next_state: RobocodeGameState,
+                 done: bool, reward_inputs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Encode once here so replay() only has to gather rows from the buffer
+        encoded_state = self.env.encode_observation(state)
+        encoded_next_state = encoded_state if next_state is state else self.env.encode_observation(next_state)
+        self.memory.add(encoded_state, action, reward, encoded_next_state, done, reward_inputs)
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Memory updated. Current size: {len(self.memory)}")
+        return encoded_state, encoded_next_state
+
+    def remember_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray,
+                       dones: np.ndarray, reward_inputs: Optional[np.ndarray] = None) -> None:
+        # Already-encoded rows, e.g. from RobocodeEnv.encode_columns over many simulated arenas
+        self.memory.add_batch(states, actions, rewards, next_states, dones, reward_inputs)
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Memory updated with {len(actions)} transitions. Current size: {len(self.memory)}")
+
+    def relabel_rewards(self, engine: Optional[RewardEngine] = None) -> int:
+        """Rewrite stored rewards with engine, by default the env's current one, e.g. after changing its constants."""
+        return self.memory.relabel(engine if engine is not None else self.env.reward_engine)
 
     def act(self, game_state: RobocodeGameState) -> int:
         if np.random.rand() <= self.epsilon:
             action = random.randrange(self.action_size)
-            logger.debug(f"Random action chosen: {action}. Epsilon: {self.epsilon}")
+            if logger_config.HOT_PATH_DEBUG:
+                logger.debug(f"Random action chosen: {action}. Epsilon: {self.epsilon}")
             return action
 
-        state = self.env.process_observation(game_state).to(self.device)
-        with torch.no_grad():
-            act_values = self.model(state)
-        action = torch.argmax(act_values).item()
-        logger.debug(f"Model-based action chosen: {action}. Epsilon: {self.epsilon}")
+        start = now()
+        state = self.env.encode_observation(game_state)
+        encoded = now()
+        action = self.act_policy.act(state)
+        self.latency.record('agent/encode_observation', encoded - start)
+        self.latency.record('agent/policy_act', now() - encoded)
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Model-based action chosen: {action}. Epsilon: {self.epsilon}")
         return action
 
+    def act_batch(self, states: np.ndarray) -> np.ndarray:
+        # One forward pass for the whole batch, then an epsilon mask replaces some rows with random actions
+        start = now()
+        actions = self.act_policy.act_batch(states)
+        self.latency.record('agent/policy_act_batch', now() - start)
+        explore = np.random.rand(len(actions)) <= self.epsilon
+        n_explore = int(explore.sum())
+        if n_explore:
+            actions[explore] = np.random.randint(self.action_size, size=n_explore)
+        return actions
+
     def replay(self, batch_size: int) -> None:
         if len(self.memory) < batch_size:
-            logger.debug(f"Skipping replay. Memory size ({len(self.memory)}) < batch size ({batch_size})")
+            if logger_config.HOT_PATH_DEBUG:
+                logger.debug(f"Skipping replay. Memory size ({len(self.memory)}) < batch size ({batch_size})")
             return
 
-        minibatch = random.sample(self.memory, batch_size)
-        states, actions, rewards, next_states, dones = zip(*minibatch)
+        start = now()
+        states, actions, rewards, next_states, dones, indices, weights = self.memory.sample(batch_size)
+        sampled = now()
 
-        states = self.env.process_observation_batch(states).to(self.device)
-        next_states = self.env.process_observation_batch(next_states).to(self.device)
-        actions = torch.tensor(actions, dtype=torch.long).to(self.device)
-        rewards = torch.tensor(rewards, dtype=torch.float32).to(self.device)
-        dones = torch.tensor(dones, dtype=torch.float32).to(self.device)
+        states = torch.from_numpy(states).to(self.device)
+        next_states = torch.from_numpy(next_states).to(self.device)
+        actions = torch.from_numpy(actions).to(self.device)
+        rewards = torch.from_numpy(rewards).to(self.device)
+        dones = torch.from_numpy(dones).to(self.device)
+        weights = torch.from_numpy(weights).to(self.device)
 
         q_values = self.model(states)
         current_q_values = q_values.gather(1, actions.unsqueeze(1)).squeeze(1)
@@ -99,36 +167,102 @@ class DQNAgent:
 
         target_q_values = rewards + (1 - dones) * self.gamma * next_q_values
 
-        loss = self.criterion(current_q_values, target_q_values)
+        loss = (self.criterion(current_q_values, target_q_values) * weights).mean()
+        if self.prioritized_replay:
+            self.memory.update_priorities(indices, (target_q_values - current_q_values).detach().cpu().numpy())
 
         self.optimizer.zero_grad()
         loss.backward()
         torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
         self.optimizer.step()
 
-        self.writer.add_scalar('Loss/Train', loss.item(), self.train_step)
+        self.metrics.record('Loss/Train', loss.item())
+        self.latency.record('agent/replay_sample', sampled - start)
+        self.latency.record('agent/replay_update', now() - sampled)
         self.train_step += 1
+        if self.train_step % self.policy_publish_interval == 0:
+            self.publish_policy()
 
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
         self.episodes += 1
-        logger.debug(f"Replay performed. Loss: {loss.item()}, Epsilon: {self.epsilon}")
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Replay performed. Loss: {loss.item()}, Epsilon: {self.epsilon}")
 
         if self.episodes % self.save_interval == 0:
             self.save()
+
+    def publish_policy(self) -> None:
+        # Read before self.policy is replaced, after which act_policy never is the new snapshot
+        was_reduced = self.act_policy is not self.policy
+        self.policy = NumpyPolicy.from_model(self.model, next(self._policy_versions))
+        self.act_policy = self._reduced_precision_policy(was_reduced) or self.policy
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Policy snapshot {self.policy.version} published at train step {self.train_step}")
+
+    def _reduced_precision_policy(self, was_reduced: bool) -> Optional[QuantizedPolicy]:
+        """
+        The policy_precision copy of the current snapshot, or None to serve the fp32 one.
+
+        Only an agent constructed with policy_precision 'fp16' or 'int8' builds and checks the copy; with
+        the default 'fp32' a publish is just the NumpyPolicy snapshot.
+        """
+        if self.policy_precision == 'fp32' or len(self.memory) < self.agreement_sample_size:
+            return None  # without stored states there is nothing to check the copy against
+        candidate = QuantizedPolicy.from_model(self.model, self.policy_precision, self.policy.version)
+        agreed = agreement(candidate, self.policy, self.memory.sample_states(self.agreement_sample_size))
+        self.metrics.record('Policy/QuantizedAgreement', agreed)
+        accepted = agreed >= self.min_policy_agreement
+        if accepted != was_reduced:  # only log when the served precision changes
+            logger.info(f"{'Serving' if accepted else 'Falling back to fp32 from'} {self.policy_precision} policy: "
+                        f"argmax agreement {agreed:.3f}, threshold {self.min_policy_agreement}")
+        return candidate if accepted else None
+
     def update_target_model(self) -> None:
         self.target_model.load_state_dict(self.model.state_dict())
         logger.info("Target model updated")
 
     def load(self) -> None:
-        if os.path.exists(self.model_path):
-            self.model.load_state_dict(torch.load(self.model_path))
+        state = self.checkpoints.load_latest(map_location=self.device)
+        if state is None:
+            logger.info(f"No existing model found at {self.model_path}. Starting with a new model.")
+            return
+
+        if 'format_version' not in state:
+            # Older checkpoints only hold the online model's state_dict
+            self.model.load_state_dict(state)
             self.update_target_model()
             logger.info(f"Model loaded from {self.model_path}")
-        else:
-            logger.info(f"No existing model found at {self.model_path}. Starting with a new model.")
+            return
+
+        self.model.load_state_dict(state['model'])
+        self.target_model.load_state_dict(state['target_model'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.epsilon = state['epsilon']
+        self.train_step = state['train_step']
+        self.episodes = state['episodes']
+        logger.info(f"Training state restored from {self.model_path}. "
+                    f"Train step: {self.train_step}, epsilon: {self.epsilon}")
+
+    def checkpoint_state(self) -> dict:
+        # Copied on the calling thread so training can continue while the writer pickles it
+        return {
+            'format_version': CHECKPOINT_FORMAT_VERSION,
+            'model': {k: v.detach().cpu().clone() for k, v in self.model.state_dict().items()},
+            'target_model': {k: v.detach().cpu().clone() for k, v in self.target_model.state_dict().items()},
+            'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+            'epsilon': self.epsilon,
+            'train_step': self.train_step,
+            'episodes': self.episodes,
+        }
 
     def save(self) -> None:
-        torch.save(self.model.state_dict(), self.model_path)
-        logger.info(f"Model saved to {self.model_path}")
+        if self.checkpoints.save_async(self.checkpoint_state(), self.train_step):
+            logger.info(f"Checkpoint for step {self.train_step} queued")
+
+    def close(self) -> None:
+        # Drain the writer, then persist the final state synchronously so shutdown never drops it
+        self.checkpoints.close()
+        self.checkpoints.write(self.checkpoint_state(), self.train_step)
+        self.memory.close()
@@ -0,0 +1,129 @@
+import copy
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Precisions DQNAgent can serve act() with; fp32 is the NumpyPolicy snapshot itself
+POLICY_PRECISIONS = ('fp32', 'fp16', 'int8')
+
+
+class NumpyPolicy:
+    """
+    Frozen float32 copy of a DQN evaluated with plain NumPy matmuls.
+
+    For a 17->32->32->10 MLP the torch dispatch, tensor construction and .item() dominate the
+    actual arithmetic, so act() runs on this snapshot instead. It is rebuilt by
+    DQNAgent.publish_policy whenever the online weights change and is never mutated afterwards.
+    version identifies the snapshot to actors that fetch it over GetPolicy and run it themselves.
+    """
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray]], version: int = 0):
+        self.layers = layers
+        self.version = version
+        self._blob: Optional[bytes] = None
+
+    @property
+    def layer_sizes(self) -> List[int]:
+        return [self.layers[0][0].shape[0]] + [bias.shape[0] for _, bias in self.layers]
+
+    def to_bytes(self) -> bytes:
+        """Little-endian float32 weights ([in][out], as used here) then bias, layer by layer."""
+        if self._blob is None:  # the snapshot is immutable, so every actor gets the same encoded blob
+            self._blob = b''.join(array.astype('<f4', copy=False).tobytes()
+                                  for layer in self.layers for array in layer)
+        return self._blob
+
+    @classmethod
+    def from_bytes(cls, layer_sizes: Sequence[int], blob: bytes, version: int = 0) -> 'NumpyPolicy':
+        values = np.frombuffer(blob, dtype='<f4')
+        expected = sum(n_in * n_out + n_out for n_in, n_out in zip(layer_sizes, layer_sizes[1:]))
+        if values.size != expected:
+            raise ValueError(f"Policy blob holds {values.size} floats, layers {list(layer_sizes)} need {expected}")
+        layers, offset = [], 0
+        for n_in, n_out in zip(layer_sizes, layer_sizes[1:]):
+            weight = values[offset:offset + n_in * n_out].reshape(n_in, n_out).astype(np.float32)
+            offset += n_in * n_out
+            bias = values[offset:offset + n_out].astype(np.float32)
+            offset += n_out
+            weight.flags.writeable = False
+            bias.flags.writeable = False
+            layers.append((weight, bias))
+        return cls(layers, version)
+
+    @classmethod
+    def from_model(cls, model: nn.Module, version: int = 0) -> 'NumpyPolicy':
+        layers = []
+        for linear in (model.fc1, model.fc2, model.fc3):
+            # Store W^T contiguously so the forward pass is x @ W^T + b without a transpose per call
+            weight = np.ascontiguousarray(linear.weight.detach().cpu().numpy().T, dtype=np.float32)
+            bias = linear.bias.detach().cpu().numpy().astype(np.float32, copy=True)
+            weight.flags.writeable = False
+            bias.flags.writeable = False
+            layers.append((weight, bias))
+        return cls(layers, version)
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        x = states
+        last = len(self.layers) - 1
+        for i, (weight, bias) in enumerate(self.layers):
+            x = x @ weight + bias
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def act(self, state: np.ndarray) -> int:
+        return int(self.q_values(state).argmax())
+
+    def act_batch(self, states: np.ndarray) -> np.ndarray:
+        return self.q_values(states).argmax(axis=1)
+
+
+class QuantizedPolicy:
+    """
+    Reduced-precision copy of a DQN with the same act interface as NumpyPolicy: dynamic int8 linear
+    layers (int8 weights, activations quantized per batch) or fp16 weights and activations.
+
+    Whether it is cheaper than the fp32 NumpyPolicy depends on the network; for 17->32->32->10 the
+    per-call overhead dominates and it is not. Its greedy actions can differ from the fp32 ones, so
+    DQNAgent only serves it while agreement() on stored states stays above a threshold.
+    """
+
+    def __init__(self, module: nn.Module, precision: str, version: int = 0):
+        self.module = module
+        self.precision = precision
+        self.version = version
+
+    @classmethod
+    def from_model(cls, model: nn.Module, precision: str, version: int = 0) -> 'QuantizedPolicy':
+        module = copy.deepcopy(model).cpu().eval()
+        if precision == 'int8':
+            module = torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+        elif precision == 'fp16':
+            module = module.half()
+        else:
+            raise ValueError(f"Unknown reduced precision {precision!r}, expected 'fp16' or 'int8'")
+        return cls(module, precision, version)
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        x = torch.from_numpy(np.asarray(states, dtype=np.float32))
+        if self.precision == 'fp16':
+            x = x.half()
+        with torch.inference_mode():
+            return self.module(x).float().numpy()
+
+    def act(self, state: np.ndarray) -> int:
+        return int(self.q_values(state).argmax())
+
+    def act_batch(self, states: np.ndarray) -> np.ndarray:
+        return self.q_values(states).argmax(axis=1)
+
+
+def agreement(policy, reference, states: np.ndarray) -> float:
+    """Fraction of states on which both policies pick the same greedy action."""
+    return float((policy.act_batch(states) == reference.act_batch(states)).mean())
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from grpclib.const import Cardinality
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# HDR-style log-linear buckets over integer nanoseconds: values below 2**SUB_BUCKET_BITS get one bucket
+# each, every power of two above that is split into 2**SUB_BUCKET_BITS equal buckets (~6% resolution).
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = (64 - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+PERCENTILES = (50, 90, 99)
+
+now = time.perf_counter_ns
+
+
+def bucket_index(value_ns: int) -> int:
+    if value_ns < SUB_BUCKETS:
+        return max(value_ns, 0)
+    exponent = value_ns.bit_length() - 1
+    return (exponent - SUB_BUCKET_BITS + 1) * SUB_BUCKETS + (value_ns >> (exponent - SUB_BUCKET_BITS)) - SUB_BUCKETS
+
+
+def _bucket_upper_bounds() -> np.ndarray:
+    index = np.arange(BUCKET_COUNT)
+    group, sub = np.divmod(index, SUB_BUCKETS)
+    width = np.exp2(np.maximum(group - 1, 0))
+    return np.where(group == 0, index, (SUB_BUCKETS + sub) * width + width - 1)
+
+
+BUCKET_UPPER_BOUNDS = _bucket_upper_bounds()
+
+
+def percentiles_ns(counts: np.ndarray, count: int, max_ns: int) -> np.ndarray:
+    # Highest value equivalent to the bucket holding each percentile, as HdrHistogram reports it
+    ranks = np.ceil(np.array(PERCENTILES) / 100 * count).astype(np.int64)
+    indices = np.searchsorted(np.cumsum(counts), np.maximum(ranks, 1))
+    return np.minimum(BUCKET_UPPER_BOUNDS[indices], max_ns)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns: int) -> None:
+        self.counts[bucket_index(value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+
+class LatencyRecorder:
+    """
+    Per-stage latency histograms for the servicer and the agent.
+
+    Callers take `start = instrumentation.now()` and pass `now() - start` to record(); recording is one
+    bucket increment under a lock, so it is safe from the learner thread too. Histograms are
+    cumulative since start-up; a background thread writes them as JSON (p50/p90/p99/max in
+    microseconds plus calls/s since the previous snapshot) to snapshot_path every snapshot_interval
+    seconds. With enabled=False record() returns immediately.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_interval: float = 10.0, enabled: bool = True):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.enabled = enabled
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._last_snapshot_time = time.monotonic()
+        self._last_counts: Dict[str, int] = {}
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if enabled and snapshot_path:
+            self._thread = threading.Thread(target=self._run, name="latency-snapshot", daemon=True)
+            self._thread.start()
+
+    def record(self, name: str, elapsed_ns: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                self._histograms[name] = histogram
+            histogram.record(elapsed_ns)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms = {name: (h.counts.copy(), h.count, h.total_ns, h.max_ns)
+                          for name, h in self._histograms.items()}
+        current_time = time.monotonic()
+        interval = max(current_time - self._last_snapshot_time, 1e-9)
+        self._last_snapshot_time = current_time
+
+        stages = {}
+        for name, (counts, count, total_ns, max_ns) in sorted(histograms.items()):
+            if not count:
+                continue
+            p50, p90, p99 = (percentiles_ns(counts, count, max_ns) / 1e3).tolist()
+            stages[name] = {
+                'count': count,
+                'rate_per_s': round((count - self._last_counts.get(name, 0)) / interval, 2),
+                'mean_us': round(total_ns / count / 1e3, 2),
+                'p50_us': round(p50, 2),
+                'p90_us': round(p90, 2),
+                'p99_us': round(p99, 2),
+                'max_us': round(max_ns / 1e3, 2),
+            }
+            self._last_counts[name] = count
+        return {'timestamp': time.time(), 'uptime_s': round(time.time() - self._started, 1), 'stages': stages}
+
+    def write_snapshot(self) -> None:
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        # Readers polling the file never see a half-written snapshot
+        os.replace(tmp_path, self.snapshot_path)
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(self.snapshot_interval + 5)
+        self._thread = None
+        self.write_snapshot()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self.write_snapshot()
+            except Exception:
+                logger.exception("Latency snapshot failed")
+
+
+def timed_handlers(mapping: dict, recorder: LatencyRecorder) -> dict:
+    """
+    Time unary grpclib handlers end to end, including request decoding and response encoding.
+
+    Comparing rpc/<Method> with the servicer's own stage timings shows how much of a turn is spent in
+    grpclib/betterproto rather than in the handler. Streaming handlers are left alone: their lifetime
+    is a whole connection, and the per-message work is timed inside the servicer.
+    """
+    def wrap(name, func):
+        async def handler(stream) -> None:
+            start = now()
+            try:
+                await func(stream)
+            finally:
+                recorder.record(name, now() - start)
+        return handler
+
+    return {path: handler._replace(func=wrap(f"rpc/{path.rsplit('/', 1)[-1]}", handler.func))
+            if handler.cardinality == Cardinality.UNARY_UNARY else handler
+            for path, handler in mapping.items()}
@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Optional
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackgroundLearner:
+    """
+    Runs DQNAgent.replay on a dedicated thread so the gRPC handlers never wait on gradient steps.
+
+    Handlers only hand out update credits; the acting path keeps reading the policy snapshot the
+    agent publishes every policy_publish_interval updates.
+    """
+
+    def __init__(self, agent, batch_size: int = 128, min_memory: int = 1000, max_pending_updates: int = 8,
+                 scheduler=None, metrics=None):
+        self.agent = agent
+        # Told how long each update took, so the effective replay ratio it reports counts real updates
+        self.scheduler = scheduler
+        # Learner/DroppedUpdates sums the updates refused by the max_pending_updates cap per flush
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.min_memory = min_memory
+        self.max_pending_updates = max_pending_updates
+        self.pending_updates = 0
+        self.dropped_updates = 0
+        self._target_update_requested = False
+        self._running = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="dqn-learner", daemon=True)
+        self._thread.start()
+        logger.info("Background learner started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info(f"Background learner stopped; {self.dropped_updates} updates dropped by the pending cap")
+
+    def request_updates(self, count: int = 1) -> None:
+        with self._condition:
+            # Never let the learner fall arbitrarily far behind the actors
+            allowed = min(count, self.max_pending_updates - self.pending_updates)
+            dropped = count - max(allowed, 0)
+            if dropped > 0:
+                self.dropped_updates += dropped
+                if self.metrics is not None:
+                    self.metrics.increment('Learner/DroppedUpdates', dropped)
+            if allowed > 0:
+                self.pending_updates += allowed
+                self._condition.notify()
+
+    def request_target_update(self) -> None:
+        # Applied on the learner thread so the target network is never copied mid-update
+        with self._condition:
+            self._target_update_requested = True
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and self.pending_updates == 0 and not self._target_update_requested:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                update_target = self._target_update_requested
+                self._target_update_requested = False
+                run_update = self.pending_updates > 0
+                if run_update:
+                    self.pending_updates -= 1
+
+            try:
+                if update_target:
+                    self.agent.update_target_model()
+                if run_update and len(self.agent.memory) >= self.min_memory:
+                    start = time.perf_counter()
+                    self.agent.replay(self.batch_size)
+                    if self.scheduler is not None:
+                        self.scheduler.record_update(time.perf_counter() - start)
+            except Exception:
+                logger.exception("Background learner update failed")
@@ -1,63 +1,96 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List
+
+LOG_PROFILE_ENV = 'ROBOCODE_LOG_PROFILE'
+
+# debug keeps the historical behaviour (everything at DEBUG to file, reward breakdown per step);
+# production logs INFO and above and turns the per-turn debug lines off entirely.
+PROFILES = {
+    'debug': {'file_level': logging.DEBUG, 'console_level': logging.INFO, 'reward_breakdown': True},
+    'production': {'file_level': logging.INFO, 'console_level': logging.INFO, 'reward_breakdown': False},
+}
+
+# Per-turn code checks this plain module attribute before building any debug message, so with the
+# production profile a disabled debug line costs one attribute lookup: no f-string, no isEnabledFor.
+HOT_PATH_DEBUG = False
+
+_listeners: List[QueueListener] = []
+
+
+def setup_logger(log_file='robocode_ai.log', profile=None):
+    global HOT_PATH_DEBUG
+    profile = profile or os.environ.get(LOG_PROFILE_ENV, 'debug')
+    settings = PROFILES[profile]
 
-def setup_logger(log_file='robocode_ai.log'):
     # Create logs directory if it doesn't exist
     log_dir = 'logs'
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
-    # Set up root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-
-    # Create file handler which logs even debug messages
-    fh = logging.FileHandler(os.path.join(log_dir, log_file))
-    fh.setLevel(logging.DEBUG)
-
-    # Create console handler with a higher log level
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-
-    # Create formatter and add it to the handlers
+    # Create formatter and the real handlers; they run on the listener thread, not in the handlers
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fh = logging.FileHandler(os.path.join(log_dir, log_file))
+    fh.setLevel(settings['file_level'])
     fh.setFormatter(formatter)
+    ch = logging.StreamHandler()
+    ch.setLevel(settings['console_level'])
     ch.setFormatter(formatter)
 
-    # Add the handlers to the root logger
-    root_logger.addHandler(fh)
-    root_logger.addHandler(ch)
+    # Set up root logger with a queue handler so callers never block on file I/O
+    root_logger = logging.getLogger()
+    root_logger.setLevel(min(settings['file_level'], settings['console_level']))
+    root_logger.addHandler(_start_queue_listener(fh, ch))
 
-def get_logger(name):
-    return logging.getLogger(name)
+    _setup_reward_logger(settings['reward_breakdown'])
+    HOT_PATH_DEBUG = root_logger.isEnabledFor(logging.DEBUG)
+    logging.getLogger(__name__).info(f"Logging configured with profile '{profile}'")
 
-def get_reward_logger():
-    logger = logging.getLogger('reward_breakdown')
-    logger.setLevel(logging.DEBUG)
 
-    # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+def _start_queue_listener(*handlers) -> QueueHandler:
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return QueueHandler(log_queue)
 
-    # Create a file handler
-    file_handler = RotatingFileHandler('logs/reward_breakdown.log', maxBytes=10*1024*1024, backupCount=5)
-    file_handler.setLevel(logging.DEBUG)
 
-    # Create a console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)  # Set to DEBUG to show in console
+def _setup_reward_logger(enabled: bool):
+    logger = get_reward_logger()
+    if not enabled:
+        logger.setLevel(logging.WARNING)
+        return
+
+    logger.setLevel(logging.DEBUG)
 
-    # Create a formatter
+    # Create a rotating file handler and a console handler
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = RotatingFileHandler('logs/reward_breakdown.log', maxBytes=10*1024*1024, backupCount=5)
+    file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
 
-    # Add the handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(_start_queue_listener(file_handler, console_handler))
+
 
+@atexit.register
+def shutdown_logging():
+    # Drain whatever is still queued before the interpreter exits
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def get_reward_logger():
+    logger = logging.getLogger('reward_breakdown')
     # Prevent the log messages from being propagated to the root logger
     logger.propagate = False
-
     return logger
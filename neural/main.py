@@ -1,147 +1,463 @@
-from typing import Optional
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Sequence
 
 import betterproto
 from betterproto.lib.std.google.protobuf import Empty as BetterProtoEmpty
 from grpclib.server import Server
 from grpclib.utils import graceful_exit
-from torch.utils.tensorboard import SummaryWriter
 
 import robot
-from dqn_agent import DQNAgent
+from batched_inference import InferenceBatcher
+from instrumentation import LatencyRecorder, now, timed_handlers
+from learner import BackgroundLearner
+import logger_config
 from logger_config import setup_logger, get_logger
+from metrics import MetricsAggregator, TensorBoardSink
+from recorder import TrajectoryRecorder
 from robocode_env import RobocodeEnv, RobocodeGameState
+from scheduler import ReplayScheduler
+from session import Session, current_evaluation, current_session_id, with_session
+
+if TYPE_CHECKING:
+    from dqn_agent import DQNAgent
+    from inference import NumpyPolicy
 
 setup_logger()
 logger = get_logger(__name__)
 
 EMPTY = BetterProtoEmpty()
+# Directory for TrajectoryRecorder chunks; recording is off when unset
+RECORD_PATH_ENV = 'ROBOCODE_RECORD_PATH'
+# Directory of a memory-mapped replay buffer for serve() to persist and resume; unset or empty keeps it in memory only
+REPLAY_PATH_ENV = 'ROBOCODE_REPLAY_PATH'
+# Further scans each decision is held for (Actions.repeat); 0 asks the server at every scan
+ACTION_REPEAT_ENV = 'ROBOCODE_ACTION_REPEAT'
+# fp32 (default), fp16 or int8 copy of the policy for act(); see DQNAgent.policy_precision
+POLICY_PRECISION_ENV = 'ROBOCODE_POLICY_PRECISION'
+# Seconds without evaluation traffic after which the next evaluation game gets the current policy
+EVAL_REFRESH_IDLE_ENV = 'ROBOCODE_EVAL_REFRESH_IDLE'
+# Written (JSON: pid, port, startup_seconds) once the server is ready and removed on shutdown
+READY_FILE_ENV = 'ROBOCODE_READY_FILE'
+PORT = 5001
+HEALTH_PATH = '/robot.RobotService/Health'
 
 
 class RobotServiceServicer(robot.RobotServiceBase):
-    def __init__(self) -> None:
-        self.writer: SummaryWriter = SummaryWriter('train-logs')
-        self.env: RobocodeEnv = RobocodeEnv(writer=self.writer)
+    """
+    With defer_loading the constructor only sets up what is cheap, so serve() can open the port first;
+    the agent (torch, checkpoint, replay buffer) is built by load() and every RPC but Health waits for it.
+    """
+
+    def __init__(self, background_learning: bool = True, session_timeout: float = 600.0,
+                 inference_batch_size: int = 32, inference_max_delay: float = 0.001,
+                 prioritized_replay: bool = False, replay_path: Optional[str] = None,
+                 latency_snapshot_path: Optional[str] = 'logs/latency.json', instrument: bool = True,
+                 updates_per_transition: float = 0.25, replay_batch_size: int = 128, max_updates_per_turn: int = 4,
+                 replay_latency_budget: float = 0.005, record_path: Optional[str] = None,
+                 action_repeat: int = 0, policy_precision: str = 'fp32', eval_refresh_idle: Optional[float] = 30.0,
+                 defer_loading: bool = False) -> None:
+        self.latency = LatencyRecorder(snapshot_path=latency_snapshot_path, enabled=instrument)
+        # The SummaryWriter (and the TensorBoard import) is only created at the first metrics flush
+        self.metrics: MetricsAggregator = MetricsAggregator(TensorBoardSink(log_dir='train-logs'), flush_interval=10.0)
+        self.env: RobocodeEnv = RobocodeEnv(metrics=self.metrics)
         action_size = len(RobocodeEnv.ActionType)
-        self.agent: DQNAgent = DQNAgent(state_size=17, action_size=action_size, env=self.env, writer=self.writer)
-        self.previous_state: Optional[RobocodeGameState] = None
-        self.previous_action: Optional[int] = None
+        # Inline updates run on the request path, so only they are held to the per-turn latency budget
+        self.scheduler = ReplayScheduler(updates_per_transition=updates_per_transition, batch_size=replay_batch_size,
+                                         max_updates_per_slot=max_updates_per_turn,
+                                         latency_budget=None if background_learning else replay_latency_budget,
+                                         metrics=self.metrics)
+        self.background_learning = background_learning
+        self.prioritized_replay = prioritized_replay
+        self.replay_path = replay_path
+        self.replay_batch_size = replay_batch_size
+        self.policy_precision = policy_precision
+        self.record_path = record_path
+        self.inference_batch_size = inference_batch_size
+        self.inference_max_delay = inference_max_delay
+        # Set by load()
+        self.agent: Optional['DQNAgent'] = None
+        self.learner: Optional[BackgroundLearner] = None
+        self.recorder: Optional[TrajectoryRecorder] = None
+        self.batcher: Optional[InferenceBatcher] = None
+        self.ready = asyncio.Event()
+        self.startup_seconds = 0.0
+        # Every connected robot gets its own trajectory; all of them feed the shared agent and replay buffer
+        self.sessions: Dict[str, Session] = {}
+        self.session_timeout = session_timeout
+        # Robots re-apply each decision at this many further scans before asking again. One transition then
+        # spans the whole window: its events accumulate on the previous state and its reward is computed once
+        self.action_repeat = action_repeat
+        # Robocode action behind each output index, shipped with GetPolicy so actors can act on their own
+        self.policy_actions = [self.env.action_to_robocode(i) for i in range(action_size)]
+        # Evaluation clients (x-eval metadata) play greedily against this frozen snapshot. It is only replaced
+        # once evaluation traffic has been idle for eval_refresh_idle seconds (never when None) or by
+        # refresh_evaluation_policy(), so one sweep of back-to-back games sees one version
+        self.eval_policy: Optional['NumpyPolicy'] = None
+        self.eval_last_used = 0.0
+        self.eval_refresh_idle = eval_refresh_idle
 
-        self.episode_reward: float = 0
-        self.episode_step: int = 0
         self.episodes: int = 0
         self.update_target_every_n_episodes: int = 5
+        if not defer_loading:
+            self.load()
+            self.ready.set()
         logger.info("RobotServiceServicer initialized")
-        logger.info("TensorBoard writer initialized")
+
+    def load(self) -> None:
+        """Build the agent and what depends on it; blocking, serve() runs it on a worker thread."""
+        start = time.perf_counter()
+        from dqn_agent import DQNAgent  # imports torch, the bulk of startup
+        imported = time.perf_counter()
+        self.agent = DQNAgent(state_size=17, action_size=len(RobocodeEnv.ActionType), env=self.env,
+                              metrics=self.metrics, prioritized_replay=self.prioritized_replay,
+                              memory_path=self.replay_path, latency=self.latency,
+                              policy_precision=self.policy_precision)
+        built = time.perf_counter()
+        if self.background_learning:
+            self.learner = BackgroundLearner(self.agent, batch_size=self.replay_batch_size,
+                                             min_memory=self.scheduler.min_memory, scheduler=self.scheduler,
+                                             metrics=self.metrics)
+            self.learner.start()
+        # Opt-in: keeps every live transition on disk for train_offline.py, not just the last 50k in replay
+        if self.record_path is not None:
+            self.recorder = TrajectoryRecorder(self.record_path, state_size=17)
+        self.batcher = InferenceBatcher(self.agent, max_batch_size=self.inference_batch_size,
+                                        max_delay=self.inference_max_delay)
+        logger.info(f"Loaded in {time.perf_counter() - start:.2f}s: torch import {imported - start:.2f}s, "
+                    f"agent (model, checkpoint, replay buffer) {built - imported:.2f}s")
+
+    def __mapping__(self):
+        mapping = {path: handler if path == HEALTH_PATH else handler._replace(func=self.when_ready(handler.func))
+                   for path, handler in super().__mapping__().items()}
+        mapping = {path: handler._replace(func=with_session(handler.func)) for path, handler in mapping.items()}
+        return timed_handlers(mapping, self.latency)
+
+    def when_ready(self, func):
+        """Hold an RPC that arrives while load() is still running instead of failing it."""
+        async def wrapper(stream):
+            if not self.ready.is_set():
+                await self.ready.wait()
+            await func(stream)
+        return wrapper
+
+    async def health(self, _: BetterProtoEmpty) -> robot.HealthStatus:
+        return robot.HealthStatus(ready=self.ready.is_set(), startup_seconds=self.startup_seconds)
+
+    def session(self) -> Session:
+        session_id = current_session_id.get()
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, evaluation=current_evaluation.get())
+            self.sessions[session_id] = session
+            logger.info(f"New session {session_id}. Active sessions: {len(self.sessions)}")
+        session.last_seen = time.monotonic()
+        return session
 
     async def on_event(self, event_wrapper: robot.Event) -> BetterProtoEmpty:
+        self.attach_events(self.session(), (event_wrapper,))
+        return EMPTY
 
-        event_type, actual_event = betterproto.which_one_of(event_wrapper, "eventType")
-        if event_type:
-            if self.previous_state is not None:
-                self.previous_state.events.append(actual_event)
-                logger.debug(f"Received event: {event_type}")
+    def attach_events(self, session: Session, event_wrappers: Sequence[robot.Event]) -> None:
+        """Add events to the previous state, whether they came one per OnEvent or batched in a GameState/RoundResult."""
+        if not event_wrappers:
+            return
+        if session.previous_state is None:
+            logger.warning(f"Received {len(event_wrappers)} event(s) but previous_state is None")
+            return
+        events = session.previous_state.events
+        for event_wrapper in event_wrappers:
+            event_type, actual_event = betterproto.which_one_of(event_wrapper, "eventType")
+            if event_type:
+                events.append(actual_event)
+                if logger_config.HOT_PATH_DEBUG:
+                    logger.debug(f"Received event: {event_type}")
             else:
-                logger.warning(f"Received event {event_type} but previous_state is None")
-        else:
-            logger.warning("Received empty event wrapper")
-        return EMPTY
+                logger.warning("Received empty event wrapper")
 
     async def start_round(self, _: BetterProtoEmpty) -> BetterProtoEmpty:
-        self.handle_new_round()
+        self.handle_new_round(self.session())
         return EMPTY
 
     async def act(self, game_state: robot.GameState) -> robot.Actions:
         current_state = RobocodeGameState(robot_state=game_state.robot_state, enemy=game_state.enemy, events=[])
-        action = self.agent.act(current_state)
+        if current_evaluation.get():
+            start = now()
+            action = self.evaluation_policy().act(self.env.encode_observation(current_state))
+            self.latency.record('eval/act', now() - start)
+            return robot.Actions(actions=[self.policy_actions[action]], repeat=self.action_repeat,
+                                 sequence=game_state.sequence)
+        action = await self.choose_action(current_state)
         robocode_action = self.env.action_to_robocode(action)
-        return robot.Actions(actions=[robocode_action])
+        return robot.Actions(actions=[robocode_action], repeat=self.action_repeat, sequence=game_state.sequence)
 
     async def send_state(self, game_state: robot.GameState) -> robot.Actions:
-        self.episode_step += 1
-        logger.debug(f"Received game state. Episode step: {self.episode_step}")
+        start = now()
+        session = self.session()
+        session.episode_step += 1
+        if session.evaluation:
+            return self.evaluate_state(session, game_state, start)
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Received game state. Session: {session.session_id}, episode step: {session.episode_step}")
 
         current_state = RobocodeGameState(robot_state=game_state.robot_state, enemy=game_state.enemy, events=[])
+        # Events raised since the last state ride along with this one; they belong to the previous state
+        self.attach_events(session, game_state.events)
 
-        if self.previous_state is not None and self.previous_action is not None:
-            reward = self.env.calculate_reward(self.previous_state, self.previous_action, current_state)
-            self.episode_reward += reward
-            self.agent.remember(self.previous_state, self.previous_action, reward, current_state, done=False)
-            logger.debug(f"Calculated reward: {reward}. Total episode reward: {self.episode_reward}")
+        if session.previous_state is not None and session.previous_action is not None \
+                and not self.previous_action_executed(session, game_state.executed_sequence):
+            session.previous_action = None  # nothing to learn: the robot never ran it
+        if session.previous_state is not None and session.previous_action is not None:
+            stage_start = now()
+            # Keep the reward inputs next to the transition so its reward can be recomputed later
+            reward_inputs = self.env.reward_inputs(session.previous_state, current_state)
+            reward = self.env.reward_from_inputs(reward_inputs, session.previous_action)
+            self.latency.record('send_state/calculate_reward', now() - stage_start)
+            session.episode_reward += reward
+            stage_start = now()
+            encoded = self.agent.remember(session.previous_state, session.previous_action, reward, current_state,
+                                          done=False, reward_inputs=reward_inputs)
+            if self.recorder is not None:
+                self.recorder.record(encoded[0], session.previous_action, reward, encoded[1], False,
+                                     session.previous_state.events, reward_inputs)
+            self.latency.record('send_state/remember', now() - stage_start)
+            if logger_config.HOT_PATH_DEBUG:
+                logger.debug(f"Calculated reward: {reward}. Total episode reward: {session.episode_reward}")
 
-            if self.episode_step % 4 == 0 and len(self.agent.memory) > 1000:
-                self.agent.replay(128)
-                logger.debug("Performed replay")
+            updates = self.scheduler.due(1, len(self.agent.memory))
+            if updates:
+                stage_start = now()
+                self.train(updates)
+                self.latency.record('send_state/train', now() - stage_start)
 
-        action = self.agent.act(current_state)
-        logger.debug(f"Chosen action: {action}")
+        local_action = game_state.local_action
+        if local_action is not None and not 0 <= local_action < len(self.policy_actions):
+            logger.warning(f"Ignoring invalid local action {local_action}. Session: {session.session_id}")
+            local_action = None
+        if local_action is not None:
+            # The robot already acted on its copy of the policy; only the transition is needed from it
+            session.previous_state = current_state
+            session.previous_action = local_action
+            session.previous_sequence = game_state.sequence
+            self.latency.record('send_state/total', now() - start)
+            return robot.Actions(sequence=game_state.sequence)
 
-        self.previous_state = current_state
-        self.previous_action = action
+        stage_start = now()
+        action = await self.choose_action(current_state)
+        self.latency.record('send_state/choose_action', now() - stage_start)
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Chosen action: {action}")
+
+        session.previous_state = current_state
+        session.previous_action = action
+        session.previous_sequence = game_state.sequence
 
         robocode_action = self.env.action_to_robocode(action)
-        logger.debug(f"Converted to Robocode action: {robocode_action}")
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Converted to Robocode action: {robocode_action}")
+
+        self.latency.record('send_state/total', now() - start)
+        return robot.Actions(actions=[robocode_action], repeat=self.action_repeat, sequence=game_state.sequence)
+
+    def previous_action_executed(self, session: Session, executed_sequence: int) -> bool:
+        """
+        Whether the robot ran the action last chosen for this session. A Play reply that arrives after the
+        robot stopped waiting is never executed, so its transition would be stored with an action that
+        never happened. Unnumbered clients send 0 for both and are always trusted.
+        """
+        if executed_sequence == session.previous_sequence:
+            return True
+        self.metrics.increment('Play/UnexecutedActions')
+        if logger_config.HOT_PATH_DEBUG:
+            logger.debug(f"Dropping transition of state {session.previous_sequence}: robot last executed "
+                         f"{executed_sequence}. Session: {session.session_id}")
+        return False
+
+    def evaluate_state(self, session: Session, game_state: robot.GameState, start: int) -> robot.Actions:
+        """Greedy action from the frozen snapshot; nothing is remembered, trained on or recorded."""
+        current_state = RobocodeGameState(robot_state=game_state.robot_state, enemy=game_state.enemy, events=[])
+        action = self.evaluation_policy().act(self.env.encode_observation(current_state))
+        session.previous_state = current_state
+        session.previous_action = action
+        self.latency.record('eval/send_state', now() - start)
+        return robot.Actions(actions=[self.policy_actions[action]], repeat=self.action_repeat,
+                             sequence=game_state.sequence)
+
+    def evaluation_policy(self) -> 'NumpyPolicy':
+        used = time.monotonic()
+        if self.eval_policy is None or (self.eval_refresh_idle is not None
+                                        and used - self.eval_last_used > self.eval_refresh_idle):
+            self.refresh_evaluation_policy()
+        self.eval_last_used = used
+        return self.eval_policy
 
-        return robot.Actions(actions=[robocode_action])
+    def refresh_evaluation_policy(self) -> 'NumpyPolicy':
+        """Freeze the current policy for evaluation games, e.g. before starting a new sweep."""
+        # agent.policy is never mutated, only replaced, so holding on to it is safe while training goes on
+        self.eval_policy = self.agent.policy
+        logger.info(f"Evaluation policy frozen at version {self.eval_policy.version}")
+        return self.eval_policy
 
     async def end_round(self, request: robot.RoundResult) -> BetterProtoEmpty:
-        if self.previous_state is None or self.previous_action is None:
+        session = self.session()
+        if session.evaluation:
+            # Own metric, and no episode count: target updates and checkpoints stay tied to training games
+            self.metrics.record('Eval/WinRate', 1 if request.reason == robot.RoundResultReason.WIN else 0)
+            logger.info(f"Evaluation round ended: {request.reason.name} after {session.episode_step} steps, "
+                        f"policy version {self.eval_policy.version if self.eval_policy else None}")
+            self.close_session(session)
+            return EMPTY
+        self.attach_events(session, request.events)
+        if session.previous_state is None or session.previous_action is None:
             logger.info(
                 "Round ended without receiving any state or action. Skipping reward calculation and episode update")
+            self.close_session(session)
             return EMPTY
 
-        if self.previous_state is not None and self.previous_action is not None:
-            reward = self.env.calculate_reward(self.previous_state, self.previous_action, self.previous_state)
+        if self.previous_action_executed(session, request.executed_sequence):
+            # The win/loss bonus is part of the reward inputs (awardByWinning / penaltyByDying)
+            reward_inputs = self.env.reward_inputs(session.previous_state, session.previous_state, request.reason)
+            reward = self.env.reward_from_inputs(reward_inputs, session.previous_action)
             if request.reason == robot.RoundResultReason.WIN:
-                reward += 50
                 logger.info(f"Round won with reward: {reward}")
             elif request.reason == robot.RoundResultReason.LOSS:
-                reward -= 50
                 logger.info(f"Round lost with reward: {reward}")
             else:
                 logger.info(f"Round ended with unknown reason. Skipping win/loss calculation")
-            self.episode_reward += reward
+            session.episode_reward += reward
 
-            self.agent.remember(self.previous_state, self.previous_action, reward, self.previous_state, done=True)
-            logger.info(f"Calculated reward: {reward}. Total episode reward: {self.episode_reward}")
-            self.writer.add_scalar('Episode_Total_Reward', self.episode_reward, self.episodes)
+            encoded = self.agent.remember(session.previous_state, session.previous_action, reward,
+                                          session.previous_state, done=True, reward_inputs=reward_inputs)
+            if self.recorder is not None:
+                self.recorder.record(encoded[0], session.previous_action, reward, encoded[1], True,
+                                     session.previous_state.events, reward_inputs)
+            logger.info(f"Calculated reward: {reward}. Total episode reward: {session.episode_reward}")
+            self.metrics.record('Episode_Total_Reward', session.episode_reward)
 
-            if self.episode_step % 4 == 0 and len(self.agent.memory) > 1000:
-                self.agent.replay(128)
-                logger.debug("Performed replay")
+            updates = self.scheduler.due(1, len(self.agent.memory))
+            if updates:
+                self.train(updates)
 
-        if request.reason == robot.RoundResultReason.WIN:
-            self.writer.add_scalar('WinRate', 1, self.episodes)
-        else:
-            self.writer.add_scalar('WinRate', 0, self.episodes)
+        self.metrics.record('WinRate', 1 if request.reason == robot.RoundResultReason.WIN else 0)
 
         self.episodes += 1
         if self.episodes % self.update_target_every_n_episodes == 0:
-            self.agent.update_target_model()
+            if self.learner is not None:
+                self.learner.request_target_update()
+            else:
+                self.agent.update_target_model()
             logger.info(f"Updated target model at episode {self.episodes}")
-        self.handle_new_round()
+        self.close_session(session)
         return EMPTY
 
-    def handle_new_round(self) -> None:
+    async def get_policy(self, request: robot.PolicyRequest) -> robot.Policy:
+        policy = self.agent.policy
+        if request.version == policy.version:
+            return robot.Policy(version=policy.version, not_modified=True)
+        return robot.Policy(version=policy.version, layer_sizes=policy.layer_sizes, weights=policy.to_bytes(),
+                            epsilon=self.agent.epsilon, actions=self.policy_actions)
+
+    async def play(self, robot_message_iterator: AsyncIterator[robot.RobotMessage]) -> AsyncIterator[robot.Actions]:
+        # Same handlers as the unary RPCs, but one HTTP/2 stream per robot instead of one per call
+        async for message in robot_message_iterator:
+            payload_type, payload = betterproto.which_one_of(message, "payload")
+            if payload_type == "state":
+                yield await self.send_state(payload)
+            elif payload_type == "event":
+                await self.on_event(payload)
+            elif payload_type == "round_result":
+                await self.end_round(payload)
+            elif payload_type == "start_round":
+                await self.start_round(payload)
+            else:
+                logger.warning("Received empty robot message")
+        logger.info(f"Play stream closed. Session: {current_session_id.get()}")
+
+    async def choose_action(self, state: RobocodeGameState) -> int:
+        # A lone robot gains nothing from waiting for company, so only batch when several are training.
+        # Evaluation games act on their own snapshot, never through the batcher, so they do not count
+        if sum(not session.evaluation for session in self.sessions.values()) > 1:
+            return await self.batcher.act(state)
+        return self.agent.act(state)
+
+    def train(self, updates: int = 1) -> None:
+        if self.learner is not None:
+            self.learner.request_updates(updates)
+            if logger_config.HOT_PATH_DEBUG:
+                logger.debug(f"Requested {updates} background replays")
+        else:
+            for _ in range(updates):
+                start = time.perf_counter()
+                self.agent.replay(self.scheduler.batch_size)
+                self.scheduler.record_update(time.perf_counter() - start)
+            if logger_config.HOT_PATH_DEBUG:
+                logger.debug(f"Performed {updates} replays")
+
+    def close(self) -> None:
+        if self.learner is not None:
+            self.learner.stop()
+        if self.agent is not None:
+            self.agent.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.metrics.close()
+        self.latency.close()
+
+    def handle_new_round(self, session: Session) -> None:
         self.env.reset()
-        self.previous_state = None
-        self.previous_action = None
-        self.episode_reward = 0
-        self.episode_step = 0
-        logger.info("New round started")
+        session.reset()
+        self.prune_idle_sessions()
+        logger.info(f"New round started. Session: {session.session_id}")
+
+    def close_session(self, session: Session) -> None:
+        self.sessions.pop(session.session_id, None)
+        logger.info(f"Session {session.session_id} closed. Active sessions: {len(self.sessions)}")
+
+    def prune_idle_sessions(self) -> None:
+        # Robots whose JVM died never call EndRound; drop their half-finished trajectories
+        deadline = time.monotonic() - self.session_timeout
+        for session_id in [sid for sid, s in self.sessions.items() if s.last_seen < deadline]:
+            del self.sessions[session_id]
+            logger.info(f"Session {session_id} expired after {self.session_timeout}s idle")
+
+
+def write_ready_file(path: str, startup_seconds: float) -> None:
+    # Written whole and renamed into place, so a watcher never reads a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'pid': os.getpid(), 'port': PORT, 'startup_seconds': round(startup_seconds, 3)}, f)
+    os.replace(tmp_path, path)
 
 
 async def serve() -> None:
-    servicer = RobotServiceServicer()
+    start = time.perf_counter()
+    servicer = RobotServiceServicer(record_path=os.environ.get(RECORD_PATH_ENV),
+                                    replay_path=os.environ.get(REPLAY_PATH_ENV) or None,
+                                    action_repeat=int(os.environ.get(ACTION_REPEAT_ENV, '0')),
+                                    policy_precision=os.environ.get(POLICY_PRECISION_ENV, 'fp32'),
+                                    eval_refresh_idle=float(os.environ.get(EVAL_REFRESH_IDLE_ENV, '30')),
+                                    defer_loading=True)
+    ready_file = os.environ.get(READY_FILE_ENV)
     server = Server([servicer])
     with graceful_exit([server]):
-        await server.start(port=5001)
+        # Bind before loading the model, so clients connecting early queue up instead of being refused
+        await server.start(port=PORT)
+        logger.info(f"Listening on port {PORT} after {time.perf_counter() - start:.2f}s, loading the agent")
 
         try:
+            await asyncio.to_thread(servicer.load)
+            servicer.startup_seconds = time.perf_counter() - start
+            servicer.ready.set()
+            if ready_file:
+                write_ready_file(ready_file, servicer.startup_seconds)
+            logger.info(f"Ready after {servicer.startup_seconds:.2f}s")
             await server.wait_closed()
         finally:
-            servicer.writer.close()
+            if ready_file and os.path.exists(ready_file):
+                os.remove(ready_file)
+            servicer.close()
 
 if __name__ == '__main__':
-    import asyncio
-
     asyncio.run(serve())
@@ -0,0 +1,196 @@
+import csv
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+MEAN = 0
+SUM = 1
+
+
+class TensorBoardSink:
+    """
+    Writes to a SummaryWriter. Given a log_dir instead of a writer, TensorBoard (and torch with it) is
+    imported and the writer opened on first use, normally on the flusher thread, so it costs startup nothing.
+    """
+
+    def __init__(self, writer=None, log_dir: Optional[str] = None):
+        self._writer = writer
+        self.log_dir = log_dir
+
+    @property
+    def writer(self):
+        if self._writer is None:
+            from torch.utils.tensorboard import SummaryWriter
+            self._writer = SummaryWriter(self.log_dir)
+        return self._writer
+
+    def write_scalar(self, name: str, value: float, step: int) -> None:
+        self.writer.add_scalar(name, value, step)
+
+    def write_histogram(self, name: str, values: np.ndarray, step: int) -> None:
+        self.writer.add_histogram(name, values, step)
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class CsvSink:
+    """Appends step,wall_time,name,value rows; histograms are written as their mean and max."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', newline='')
+        self._csv = csv.writer(self._file)
+
+    def write_scalar(self, name: str, value: float, step: int) -> None:
+        self._csv.writerow((step, f"{time.time():.3f}", name, value))
+
+    def write_histogram(self, name: str, values: np.ndarray, step: int) -> None:
+        self.write_scalar(f"{name}/mean", float(values.mean()), step)
+        self.write_scalar(f"{name}/max", float(values.max()), step)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class MetricsAggregator:
+    """
+    In-process metrics buffer for the per-turn hot path.
+
+    record()/record_many() only touch preallocated NumPy slots under a lock; a background thread
+    swaps the slots out every flush_interval seconds (or every flush_every_steps ticks) and writes
+    one mean (or sum, for counters) per metric to the sink. Histograms keep a fixed-size sample
+    window per name. The step written with each summary is the tick() count at flush time.
+    """
+
+    def __init__(self, sink, flush_interval: float = 10.0, flush_every_steps: int = 0,
+                 max_metrics: int = 256, histogram_window: int = 4096):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.flush_every_steps = flush_every_steps
+        self.max_metrics = max_metrics
+        self.histogram_window = histogram_window
+        self.step = 0
+
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._kinds = np.zeros(max_metrics, dtype=np.int8)
+        self._sums = np.zeros(max_metrics, dtype=np.float64)
+        self._counts = np.zeros(max_metrics, dtype=np.int64)
+        self._group_index: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = {}
+
+        self._histograms: Dict[str, np.ndarray] = {}
+        self._histogram_counts: Dict[str, int] = {}
+
+        self._lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+        self._thread.start()
+
+    def _slot(self, name: str, kind: int) -> int:
+        index = self._index.get(name)
+        if index is None:
+            if len(self._names) >= self.max_metrics:
+                raise ValueError(f"Too many metrics (max {self.max_metrics}); cannot register {name}")
+            index = len(self._names)
+            self._names.append(name)
+            self._kinds[index] = kind
+            self._index[name] = index
+        return index
+
+    def record(self, name: str, value: float, count: int = 1) -> None:
+        """With count > 1, value is the sum of that many observations."""
+        with self._lock:
+            index = self._slot(name, MEAN)
+            self._sums[index] += value
+            self._counts[index] += count
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            index = self._slot(name, SUM)
+            self._sums[index] += amount
+            self._counts[index] += 1
+
+    def record_many(self, prefix: str, names: Sequence[str], values: np.ndarray, count: int = 1) -> None:
+        """Record one value per name under prefix/name in a single vector update; count as in record()."""
+        key = (prefix, tuple(names))
+        with self._lock:
+            indices = self._group_index.get(key)
+            if indices is None:
+                indices = np.array([self._slot(f"{prefix}/{name}", MEAN) for name in names], dtype=np.int64)
+                self._group_index[key] = indices
+            self._sums[indices] += values
+            self._counts[indices] += count
+
+    def record_histogram(self, name: str, value: float) -> None:
+        with self._lock:
+            window = self._histograms.get(name)
+            if window is None:
+                window = np.empty(self.histogram_window, dtype=np.float64)
+                self._histograms[name] = window
+                self._histogram_counts[name] = 0
+            count = self._histogram_counts[name]
+            window[count % self.histogram_window] = value
+            self._histogram_counts[name] = count + 1
+
+    def tick(self, steps: int = 1) -> None:
+        self.step += steps
+        if self.flush_every_steps and self.step % self.flush_every_steps < steps:
+            self._flush_requested.set()
+
+    def flush(self) -> None:
+        with self._lock:
+            active = np.flatnonzero(self._counts[:len(self._names)])
+            sums = self._sums[active].copy()
+            counts = self._counts[active].copy()
+            kinds = self._kinds[active].copy()
+            names = [self._names[i] for i in active]
+            self._sums[:] = 0
+            self._counts[:] = 0
+
+            histograms = {}
+            for name, count in self._histogram_counts.items():
+                if count:
+                    histograms[name] = self._histograms[name][:min(count, self.histogram_window)].copy()
+                    self._histogram_counts[name] = 0
+            step = self.step
+
+        # Sink I/O happens outside the lock so recorders never wait on the disk
+        values = np.where(kinds == SUM, sums, sums / np.maximum(counts, 1))
+        for name, value in zip(names, values.tolist()):
+            self.sink.write_scalar(name, value, step)
+        for name, window in histograms.items():
+            self.sink.write_histogram(name, window, step)
+        self.sink.flush()
+
+    def close(self) -> None:
+        self._running = False
+        self._flush_requested.set()
+        self._thread.join(self.flush_interval + 5)
+        self.flush()
+
+    def _run(self) -> None:
+        while self._running:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            if not self._running:
+                return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Metrics flush failed")
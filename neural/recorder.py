@@ -0,0 +1,171 @@
+import glob
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import betterproto
+import numpy as np
+
+import robot
+from logger_config import get_logger
+from reward_engine import REWARD_INPUT_FIELDS
+
+logger = get_logger(__name__)
+
+RECORDING_FORMAT_VERSION = 2  # 2: reward_inputs column
+
+# robot.Event oneof field for every event message the servicer keeps on a state
+EVENT_FIELDS = {
+    robot.BulletHitEvent: 'bullet_hit',
+    robot.BulletHitBulletEvent: 'bullet_hit_bullet',
+    robot.BulletMissedEvent: 'bullet_missed',
+    robot.HitByBulletEvent: 'hit_by_bullet',
+    robot.HitRobotEvent: 'hit_robot',
+    robot.HitWallEvent: 'hit_wall',
+    robot.RobotDeathEvent: 'robot_death',
+}
+
+
+class TrajectoryRecorder:
+    """
+    Streams encoded transitions and their raw events to compressed columnar chunks on disk.
+
+    record() only copies into preallocated arrays; every chunk_size transitions the filled chunk is
+    handed to a background thread that writes recording-<seq>.npz (np.savez_compressed, temp file then
+    rename). Columns match ReplayBuffer's plus wall_time; reward_inputs rows are NaN where none were
+    given. Events are stored as serialized robot.Event bytes, sliced per event by event_offsets and per
+    transition by event_index. If the disk falls behind by max_pending_chunks, whole chunks are dropped
+    rather than blocking the caller.
+    """
+
+    def __init__(self, directory: str, state_size: int, chunk_size: int = 10000, max_pending_chunks: int = 4):
+        self.directory = directory
+        self.state_size = state_size
+        self.chunk_size = chunk_size
+        self.dropped_chunks = 0
+        os.makedirs(directory, exist_ok=True)
+        # Continue numbering after existing files so a restarted server never overwrites a recording
+        existing = chunk_paths(directory)
+        self._sequence = int(os.path.basename(existing[-1])[len('recording-'):-len('.npz')]) + 1 if existing else 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending_chunks)
+        self._thread = threading.Thread(target=self._run, name="trajectory-writer", daemon=True)
+        self._thread.start()
+        self._new_chunk()
+
+    def _new_chunk(self) -> None:
+        size = self.chunk_size
+        self._columns = {
+            'states': np.zeros((size, self.state_size), dtype=np.float32),
+            'next_states': np.zeros((size, self.state_size), dtype=np.float32),
+            'actions': np.zeros(size, dtype=np.int64),
+            'rewards': np.zeros(size, dtype=np.float32),
+            'dones': np.zeros(size, dtype=np.float32),
+            'wall_time': np.zeros(size, dtype=np.float64),
+            'reward_inputs': np.zeros((size, len(REWARD_INPUT_FIELDS)), dtype=np.float64),
+        }
+        self._event_blobs: List[bytes] = []
+        self._event_counts = np.zeros(size, dtype=np.int64)
+        self._count = 0
+
+    def record(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray, done: bool,
+               events: Sequence = (), reward_inputs: Optional[np.ndarray] = None) -> None:
+        i = self._count
+        columns = self._columns
+        columns['states'][i] = state
+        columns['next_states'][i] = next_state
+        columns['actions'][i] = action
+        columns['rewards'][i] = reward
+        columns['dones'][i] = done
+        columns['wall_time'][i] = time.time()
+        columns['reward_inputs'][i] = np.nan if reward_inputs is None else reward_inputs
+        for event in events:
+            self._event_blobs.append(bytes(robot.Event(**{EVENT_FIELDS[type(event)]: event})))
+        self._event_counts[i] = len(events)
+        self._count = i + 1
+        if self._count == self.chunk_size:
+            self._submit()
+
+    def _submit(self) -> None:
+        count = self._count
+        if not count:
+            return
+        chunk = {name: column[:count] for name, column in self._columns.items()}
+        lengths = np.fromiter((len(blob) for blob in self._event_blobs), dtype=np.int64, count=len(self._event_blobs))
+        chunk['event_bytes'] = np.frombuffer(b''.join(self._event_blobs), dtype=np.uint8)
+        chunk['event_offsets'] = np.concatenate(([0], np.cumsum(lengths)))
+        chunk['event_index'] = np.concatenate(([0], np.cumsum(self._event_counts[:count])))
+        chunk['format_version'] = np.array(RECORDING_FORMAT_VERSION)
+        try:
+            self._queue.put_nowait((chunk, self._sequence))
+            self._sequence += 1
+        except queue.Full:
+            self.dropped_chunks += 1
+            logger.warning(f"Trajectory writer busy, dropped a chunk of {count} transitions "
+                           f"({self.dropped_chunks} dropped so far)")
+        self._new_chunk()
+
+    def close(self, timeout: float = 30.0) -> None:
+        self._submit()
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            chunk, sequence = self._queue.get()
+            if chunk is None:
+                return
+            try:
+                self._write(chunk, sequence)
+            except Exception:
+                logger.exception(f"Failed to write trajectory chunk {sequence}")
+
+    def _write(self, chunk: Dict[str, np.ndarray], sequence: int) -> None:
+        path = os.path.join(self.directory, f"recording-{sequence:06d}.npz")
+        tmp_path = f"{path}.tmp"
+        # A file object keeps savez from appending its own .npz suffix to the temp name
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **chunk)
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote {len(chunk['actions'])} transitions to {path}")
+
+
+def chunk_paths(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, 'recording-*.npz')))
+
+
+def read_chunk(path: str) -> Dict[str, np.ndarray]:
+    # Decompress every column while the archive is open; NpzFile members are read lazily otherwise
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def iter_chunks(paths: Sequence[str], prefetch: int = 2) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+    """Yield (path, columns) in order while a reader thread decompresses up to prefetch chunks ahead."""
+    chunks: queue.Queue = queue.Queue(maxsize=prefetch)
+
+    def read_all() -> None:
+        for path in paths:
+            try:
+                chunks.put((path, read_chunk(path)))
+            except Exception:
+                logger.exception(f"Skipping unreadable trajectory chunk {path}")
+        chunks.put((None, None))
+
+    threading.Thread(target=read_all, name="trajectory-reader", daemon=True).start()
+    while True:
+        path, chunk = chunks.get()
+        if path is None:
+            return
+        yield path, chunk
+
+
+def decode_events(chunk: Dict[str, np.ndarray], i: int) -> List[object]:
+    """The event messages recorded with transition i, as the servicer had them on the state."""
+    offsets, data = chunk['event_offsets'], chunk['event_bytes']
+    events = []
+    for e in range(chunk['event_index'][i], chunk['event_index'][i + 1]):
+        wrapper = robot.Event().parse(data[offsets[e]:offsets[e + 1]].tobytes())
+        events.append(betterproto.which_one_of(wrapper, "eventType")[1])
+    return events
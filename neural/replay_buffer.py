@@ -0,0 +1,325 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReplayBuffer:
+    """
+    Fixed-size ring buffer of encoded transitions kept in preallocated NumPy arrays.
+
+    With a path, every column is a memory-mapped .npy file under that directory and the ring
+    position is recorded in meta.json every flush_interval adds. Reopening the same path maps the
+    existing files directly, so a restarted server resumes with the transitions it had.
+
+    With reward_input_size, each transition also keeps the reward_engine input row its reward was
+    computed from (NaN when none was given), so relabel() can recompute every stored reward after the
+    reward constants change.
+    """
+
+    META_FILE = 'meta.json'
+    # Added after buffers were first persisted; a missing or mismatched file is recreated without losing the rest
+    OPTIONAL_COLUMNS = ('reward_inputs',)
+    RELABEL_CHUNK = 65536
+
+    def __init__(self, capacity: int, state_size: int, path: Optional[str] = None, flush_interval: int = 1000,
+                 reward_input_size: int = 0):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.reward_input_size = reward_input_size
+        self.path = path
+        self.flush_interval = flush_interval
+        self.position = 0
+        self.size = 0
+        self._adds_since_flush = 0
+        # add() runs on the event loop while sample() may run on the background learner
+        self._lock = threading.RLock()
+        # Generator.choice draws without replacement in O(batch); np.random.choice permutes the whole buffer
+        self._rng = np.random.default_rng()
+
+        if path is None:
+            for name, (shape, dtype) in self._column_specs().items():
+                setattr(self, name, np.full(shape, np.nan, dtype=dtype) if name in self.OPTIONAL_COLUMNS
+                        else np.zeros(shape, dtype=dtype))
+            logger.debug(f"Replay buffer allocated. Capacity: {capacity}, state size: {state_size}")
+        else:
+            self._open_memmaps(path)
+
+    def _column_specs(self) -> Dict[str, Tuple[Tuple[int, ...], type]]:
+        specs = {
+            'states': ((self.capacity, self.state_size), np.float32),
+            'next_states': ((self.capacity, self.state_size), np.float32),
+            'actions': ((self.capacity,), np.int64),
+            'rewards': ((self.capacity,), np.float32),
+            'dones': ((self.capacity,), np.float32),
+        }
+        if self.reward_input_size:
+            specs['reward_inputs'] = ((self.capacity, self.reward_input_size), np.float64)
+        return specs
+
+    def _open_memmaps(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        specs = self._column_specs()
+        meta = self._read_meta()
+        resumable = (meta is not None
+                     and meta.get('capacity') == self.capacity
+                     and meta.get('state_size') == self.state_size
+                     and all(self._column_matches(name, shape, dtype) for name, (shape, dtype) in specs.items()
+                             if name not in self.OPTIONAL_COLUMNS))
+
+        for name, (shape, dtype) in specs.items():
+            if resumable and (name not in self.OPTIONAL_COLUMNS or self._column_matches(name, shape, dtype)):
+                # np.load only parses the .npy header; the data stays on disk until touched
+                column = np.load(self._column_file(name), mmap_mode='r+')
+            else:
+                column = np.lib.format.open_memmap(self._column_file(name), mode='w+', dtype=dtype, shape=shape)
+                if name in self.OPTIONAL_COLUMNS:
+                    column[:] = np.nan
+            setattr(self, name, column)
+
+        if resumable:
+            self.position = meta['position']
+            self.size = meta['size']
+            logger.info(f"Replay buffer reopened from {path}. Size: {self.size}, position: {self.position}")
+        else:
+            self._write_meta()
+            logger.info(f"Replay buffer created at {path}. Capacity: {self.capacity}")
+
+    def _column_matches(self, name: str, shape: Tuple[int, ...], dtype: type) -> bool:
+        try:
+            column = np.load(self._column_file(name), mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        return column.shape == shape and column.dtype == dtype
+
+    def _column_file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.npy")
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.path, self.META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self) -> None:
+        meta_path = os.path.join(self.path, self.META_FILE)
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'capacity': self.capacity, 'state_size': self.state_size,
+                       'position': self.position, 'size': self.size}, f)
+        os.replace(tmp_path, meta_path)
+
+    def flush(self, sync: bool = False) -> None:
+        """
+        Record the ring position. Rows written through the memmaps already live in the page cache,
+        so they survive a process crash without msync; sync=True also forces them to disk.
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            if sync:
+                for name in self._column_specs():
+                    getattr(self, name).flush()
+            self._write_meta()
+            self._adds_since_flush = 0
+
+    def close(self) -> None:
+        self.flush(sync=True)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray, done: bool,
+            reward_inputs: Optional[np.ndarray] = None) -> int:
+        with self._lock:
+            index = self.position
+            self.states[index] = state
+            self.next_states[index] = next_state
+            self.actions[index] = action
+            self.rewards[index] = reward
+            self.dones[index] = done
+            if self.reward_input_size:
+                self.reward_inputs[index] = np.nan if reward_inputs is None else reward_inputs
+            self.position = (index + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            if self.path is not None:
+                self._adds_since_flush += 1
+                if self._adds_since_flush >= self.flush_interval:
+                    self.flush()
+        return index
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray,
+                  dones: np.ndarray, reward_inputs: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write len(actions) transitions with one fancy-indexed store per column; returns their slots."""
+        count = len(actions)
+        with self._lock:
+            indices = (self.position + np.arange(count)) % self.capacity
+            self.states[indices] = states
+            self.next_states[indices] = next_states
+            self.actions[indices] = actions
+            self.rewards[indices] = rewards
+            self.dones[indices] = dones
+            if self.reward_input_size:
+                self.reward_inputs[indices] = np.nan if reward_inputs is None else reward_inputs
+            self.position = (self.position + count) % self.capacity
+            self.size = min(self.size + count, self.capacity)
+            if self.path is not None:
+                self._adds_since_flush += count
+                if self._adds_since_flush >= self.flush_interval:
+                    self.flush()
+        return indices
+
+    def relabel(self, engine) -> int:
+        """
+        Recompute the reward of every stored transition that kept its reward inputs with engine
+        (a reward_engine.RewardEngine). Works through the buffer in chunks, taking the lock per chunk so
+        add() and sample() are never held up for the whole pass. Returns how many rewards were rewritten.
+        """
+        if not self.reward_input_size:
+            return 0
+        relabelled = 0
+        for start in range(0, self.size, self.RELABEL_CHUNK):
+            with self._lock:
+                stop = min(start + self.RELABEL_CHUNK, self.size)
+                rows = start + np.flatnonzero(~np.isnan(self.reward_inputs[start:stop]).any(axis=1))
+                if rows.size:
+                    rewards, _ = engine.rewards(self.reward_inputs[rows], self.actions[rows])
+                    self.rewards[rows] = rewards
+                relabelled += rows.size
+        logger.info(f"Relabelled {relabelled} of {self.size} stored rewards")
+        return relabelled
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, ...]:
+        """Returns (states, actions, rewards, next_states, dones, indices, importance_weights)."""
+        with self._lock:
+            # Without replacement, like the random.sample the deque-based memory used: no duplicates in a batch
+            indices = self._rng.choice(self.size, size=batch_size, replace=False)
+            return self._gather(indices) + (indices, np.ones(batch_size, dtype=np.float32))
+
+    def sample_states(self, batch_size: int) -> np.ndarray:
+        """Uniformly drawn stored states, e.g. to compare two policies on; never touches priorities."""
+        with self._lock:
+            return self.states[self._rng.choice(self.size, size=batch_size, replace=False)]
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        # Uniform sampling ignores TD errors
+        pass
+
+    def _gather(self, indices: np.ndarray) -> Tuple[np.ndarray, ...]:
+        return (self.states[indices],
+                self.actions[indices],
+                self.rewards[indices],
+                self.next_states[indices],
+                self.dones[indices])
+
+
+class SumTree:
+    """
+    Array-backed binary sum-tree over `capacity` leaves.
+
+    Node i has children 2i and 2i+1, the root is node 1 and leaves start at leaf_offset. Both
+    update() and find() walk the tree one level at a time for the whole batch, so a batch costs
+    O(batch * log n) NumPy work instead of a Python loop per sample.
+    """
+
+    def __init__(self, capacity: int):
+        leaf_offset = 1
+        while leaf_offset < capacity:
+            leaf_offset *= 2
+        self.leaf_offset = leaf_offset
+        self.tree = np.zeros(2 * leaf_offset, dtype=np.float64)
+
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray) -> None:
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaf_offset
+        if nodes.size == 0:
+            return
+        self.tree[nodes] = priorities
+        while True:
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Leaf index whose cumulative priority range contains each value."""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).copy()
+        while nodes[0] < self.leaf_offset:
+            left = 2 * nodes
+            left_sums = self.tree[left]
+            go_right = values > left_sums
+            values = np.where(go_right, values - left_sums, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaf_offset
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        return self.tree[np.asarray(indices, dtype=np.int64) + self.leaf_offset]
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """Proportional prioritized replay (Schaul et al.) on top of the ring buffer."""
+
+    def __init__(self, capacity: int, state_size: int, path: Optional[str] = None, flush_interval: int = 1000,
+                 reward_input_size: int = 0, alpha: float = 0.6, beta_start: float = 0.4, beta_steps: int = 100000,
+                 epsilon: float = 1e-6):
+        super().__init__(capacity, state_size, path=path, flush_interval=flush_interval,
+                         reward_input_size=reward_input_size)
+        self.alpha = alpha
+        self.beta_start = beta_start
+        self.beta_steps = beta_steps
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.sample_count = 0
+        self.tree = SumTree(capacity)
+        # Priorities are not persisted; transitions reopened from disk start at max priority
+        self.tree.update(np.arange(self.size), np.full(self.size, self.max_priority ** self.alpha))
+
+    @property
+    def beta(self) -> float:
+        fraction = min(1.0, self.sample_count / self.beta_steps)
+        return self.beta_start + fraction * (1.0 - self.beta_start)
+
+    def add(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray, done: bool,
+            reward_inputs: Optional[np.ndarray] = None) -> int:
+        with self._lock:
+            index = super().add(state, action, reward, next_state, done, reward_inputs)
+            # New transitions get the highest priority seen so far so they are replayed at least once
+            self.tree.update(np.array([index]), np.array([self.max_priority ** self.alpha]))
+        return index
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_states: np.ndarray,
+                  dones: np.ndarray, reward_inputs: Optional[np.ndarray] = None) -> np.ndarray:
+        with self._lock:
+            indices = super().add_batch(states, actions, rewards, next_states, dones, reward_inputs)
+            self.tree.update(indices, np.full(len(indices), self.max_priority ** self.alpha))
+        return indices
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, ...]:
+        with self._lock:
+            total = self.tree.total()
+            # Stratified: one uniform draw from each of batch_size equal slices of the total mass
+            segment = total / batch_size
+            values = (np.arange(batch_size) + np.random.rand(batch_size)) * segment
+            indices = np.minimum(self.tree.find(values), self.size - 1)
+
+            probabilities = self.tree.get(indices) / total
+            weights = (self.size * probabilities) ** -self.beta
+            weights = (weights / weights.max()).astype(np.float32)
+            self.sample_count += 1
+            return self._gather(indices) + (indices, weights)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        priorities = np.abs(td_errors).astype(np.float64) + self.epsilon
+        with self._lock:
+            self.max_priority = max(self.max_priority, float(priorities.max()))
+            self.tree.update(indices, priorities ** self.alpha)
@@ -0,0 +1,137 @@
+from dataclasses import dataclass, fields, replace
+from typing import Tuple
+
+import numpy as np
+
+# Columns of a reward-input row; enough to recompute every component of a transition's reward later
+REWARD_INPUT_FIELDS = (
+    'previous_heading', 'previous_gun_heading', 'previous_enemy_bearing',
+    'heading', 'gun_heading', 'enemy_bearing', 'enemy_distance',
+    'hit_by_bullet_power', 'bullet_hit_power', 'wall_hits', 'bullet_missed_power',
+    'collisions', 'collisions_at_fault',
+    'round_result',  # +1 won, -1 lost, 0 round still running or unknown
+)
+INPUT_INDEX = {name: i for i, name in enumerate(REWARD_INPUT_FIELDS)}
+EVENT_COLUMNS = slice(INPUT_INDEX['hit_by_bullet_power'], INPUT_INDEX['collisions_at_fault'] + 1)
+# Before / after pairs, so both gun bearings come out of one vector expression
+HEADING_COLUMNS = [INPUT_INDEX['previous_heading'], INPUT_INDEX['heading']]
+GUN_HEADING_COLUMNS = [INPUT_INDEX['previous_gun_heading'], INPUT_INDEX['gun_heading']]
+BEARING_COLUMNS = [INPUT_INDEX['previous_enemy_bearing'], INPUT_INDEX['enemy_bearing']]
+
+# Same names and order as the reward breakdown calculate_reward has always logged
+REWARD_COMPONENTS = (
+    'penaltyByHitByBullet', 'awardByBulletHit', 'penaltyByHitWall', 'awardByWinning', 'penaltyByDying',
+    'gunTurnReward', 'penaltyByBulletMissed', 'penaltyByCollision', 'stepPenalty',
+    'firingAccuracyReward', 'firingPowerReward', 'firingPenalty',
+)
+COMPONENT_INDEX = {name: i for i, name in enumerate(REWARD_COMPONENTS)}
+
+
+@dataclass(frozen=True)
+class RewardConstants:
+    damage_dealt_scale: float = 15
+    damage_taken_scale: float = 7
+    gun_turn_improvement_scale: float = 0.1
+    gun_turn_penalty_scale: float = 0.15
+    accuracy_reward_scale: float = 5.0
+    step_penalty: float = 0.1
+    robot_size: float = 36
+    missing_bearing: float = 360
+    bullet_miss_penalty: float = 5
+    collision_penalty: float = 5
+    firing_accuracy_reward: float = 10.0
+    firing_power_reward_scale: float = 5.0
+    firing_penalty: float = -2.0
+    wall_hit_penalty: float = 10
+    round_result_reward: float = 50
+
+    @classmethod
+    def from_env(cls, env) -> 'RewardConstants':
+        """Read the upper-case constants of RobocodeEnv (class or instance), e.g. DAMAGE_DEALT_SCALE."""
+        return cls(**{field.name: getattr(env, field.name.upper()) for field in fields(cls)})
+
+
+class RewardEngine:
+    """
+    Computes every reward component for arrays of transitions at once.
+
+    Inputs are (n, len(REWARD_INPUT_FIELDS)) rows, as built by RobocodeEnv.reward_inputs or straight
+    from simulator columns; the result is (n, len(REWARD_COMPONENTS)). Because the rows keep the raw
+    quantities rather than the reward, stored experience can be relabelled with different constants.
+    fire_scales holds, per action, the relative bullet power of fire actions and NaN for the rest.
+    """
+
+    def __init__(self, constants: RewardConstants, fire_scales: np.ndarray):
+        self.constants = constants
+        self.fire_scales = np.asarray(fire_scales, dtype=np.float64)
+        c = constants
+        # Event sums map linearly onto their components, so they cost one matmul however many there are
+        self._event_weights = np.zeros((EVENT_COLUMNS.stop - EVENT_COLUMNS.start, len(REWARD_COMPONENTS)))
+        for field, component, weight in (
+                ('hit_by_bullet_power', 'penaltyByHitByBullet', -c.damage_taken_scale),
+                ('bullet_hit_power', 'awardByBulletHit', c.damage_dealt_scale),
+                ('wall_hits', 'penaltyByHitWall', -c.wall_hit_penalty),
+                ('bullet_missed_power', 'penaltyByBulletMissed', -c.bullet_miss_penalty),
+                ('collisions', 'penaltyByCollision', -c.collision_penalty),
+                ('collisions_at_fault', 'penaltyByCollision', -c.collision_penalty)):  # an at-fault collision costs double
+            self._event_weights[INPUT_INDEX[field] - EVENT_COLUMNS.start, COMPONENT_INDEX[component]] = weight
+        self._step_bias = np.zeros(len(REWARD_COMPONENTS))
+        self._step_bias[COMPONENT_INDEX['stepPenalty']] = -c.step_penalty
+
+    def with_constants(self, **changes) -> 'RewardEngine':
+        """A copy with some constants replaced, e.g. engine.with_constants(damage_dealt_scale=20)."""
+        return RewardEngine(replace(self.constants, **changes), self.fire_scales)
+
+    def components(self, inputs: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        c = self.constants
+        inputs = np.asarray(inputs, dtype=np.float64)
+        actions = np.asarray(actions, dtype=np.int64)
+        out = inputs[:, EVENT_COLUMNS] @ self._event_weights
+        out += self._step_bias
+        round_result = inputs[:, INPUT_INDEX['round_result']]
+        out[:, COMPONENT_INDEX['awardByWinning']] = np.maximum(round_result, 0) * c.round_result_reward
+        out[:, COMPONENT_INDEX['penaltyByDying']] = np.minimum(round_result, 0) * c.round_result_reward
+
+        # Aim terms need a bearing on both sides of the transition; column 0 is before, column 1 after
+        bearings = inputs[:, BEARING_COLUMNS]
+        aimed = (bearings != c.missing_bearing).all(axis=1)
+        if not aimed.any():
+            return out
+        errors = np.abs(self.gun_bearing(inputs[:, HEADING_COLUMNS], bearings, inputs[:, GUN_HEADING_COLUMNS]))
+        last_error, error = errors[:, 0], errors[:, 1]
+        tolerance = np.degrees(np.arctan2(c.robot_size / 2, inputs[:, INPUT_INDEX['enemy_distance']]))
+        on_target = error <= tolerance
+
+        improvement = last_error - error
+        base = np.where(improvement > 0, improvement * c.gun_turn_improvement_scale,
+                        np.where(improvement < 0, improvement * c.gun_turn_penalty_scale,
+                                 np.where(on_target, c.accuracy_reward_scale, -c.gun_turn_penalty_scale * 5)))
+        accuracy = np.where(on_target, (tolerance - error) * c.accuracy_reward_scale, 0)
+        out[:, COMPONENT_INDEX['gunTurnReward']] = np.where(aimed, base + accuracy, 0)
+
+        valid_action = (actions >= 0) & (actions < len(self.fire_scales))
+        fire_scale = self.fire_scales[np.where(valid_action, actions, 0)]
+        fired = aimed & valid_action & ~np.isnan(fire_scale)
+        hit = fired & on_target
+        out[:, COMPONENT_INDEX['firingAccuracyReward']] = np.where(hit, c.firing_accuracy_reward, 0)
+        out[:, COMPONENT_INDEX['firingPowerReward']] = np.where(hit, c.firing_power_reward_scale * fire_scale, 0)
+        out[:, COMPONENT_INDEX['firingPenalty']] = np.where(fired & ~on_target, c.firing_penalty, 0)
+        return out
+
+    @staticmethod
+    def gun_bearing(heading: np.ndarray, enemy_bearing: np.ndarray, gun_heading: np.ndarray) -> np.ndarray:
+        """Enemy bearing relative to the gun, normalized to [-180, 180)."""
+        return ((heading + enemy_bearing) % 360 - gun_heading + 180) % 360 - 180
+
+    @staticmethod
+    def totals(components: np.ndarray) -> np.ndarray:
+        # Column by column, in breakdown order, like summing the breakdown dict
+        total = components[:, 0].copy()
+        for j in range(1, components.shape[1]):
+            total += components[:, j]
+        return total
+
+    def rewards(self, inputs: np.ndarray, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(totals, components) for each row."""
+        components = self.components(inputs, actions)
+        return self.totals(components), components
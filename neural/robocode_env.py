@@ -1,13 +1,17 @@
 import math
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, List, Dict
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple
 
 import numpy as np
-import torch
 
 import robot  # This should be your gRPC generated module
+import logger_config
 from logger_config import get_logger, get_reward_logger
+from reward_engine import REWARD_COMPONENTS, REWARD_INPUT_FIELDS, RewardConstants, RewardEngine
+
+if TYPE_CHECKING:
+    import torch
 
 
 @dataclass
@@ -39,7 +43,14 @@ class RobocodeEnv:
     FIRING_POWER_REWARD_SCALE = 5.0
     FIRING_PENALTY = -2.0
     WALL_HIT_PENALTY = 10
+    ROUND_RESULT_REWARD = 50  # added on a win, subtracted on a loss
 
+    # Raw field order used by the columnar observation encoder
+    ROBOT_FIELDS = ('x', 'y', 'velocity', 'heading', 'gun_heading', 'radar_heading', 'gun_heat',
+                    'gun_turn_remaining', 'radar_turn_remaining', 'energy',
+                    'battle_field_width', 'battle_field_height')
+    ENEMY_FIELDS = ('x', 'y', 'velocity', 'heading', 'bearing', 'distance', 'energy')
+    MISSING_ENEMY_FEATURES = (-1, -1, 0, -1, MISSING_BEARING, -1, -1)
 
     class ActionType(Enum):
         MOVE_FORWARD = 0
@@ -53,11 +64,19 @@ class RobocodeEnv:
         FIRE = 8
         DO_NOTHING = 9
 
+        def is_fire_action(self) -> bool:
+            return self.name.startswith('FIRE')
 
+    # Relative bullet power of each fire action, used to scale firingPowerReward
+    FIRING_REWARD_SCALE = {ActionType.FIRE: 1.0}
+    ROUND_RESULT_SIGNS = {robot.RoundResultReason.WIN: 1, robot.RoundResultReason.LOSS: -1}
 
-    def __init__(self, writer):
-        self.writer = writer
+    def __init__(self, metrics=None):
+        self.metrics = metrics
         self.step_count = 0
+        self._max_distance_cache: Dict[Tuple[float, float], float] = {}
+        # Change the constants above (or build another RewardEngine) and DQNAgent.relabel_rewards can rewrite old experience
+        self.reward_engine = RewardEngine(RewardConstants.from_env(self), self.fire_scales())
 
         # self.action_map = {
         #     self.ActionType.MOVE_FORWARD_SMALL: (robot.ActionActionType.MOVE_FORWARD, 25),
@@ -89,17 +108,33 @@ class RobocodeEnv:
         #     self.ActionType.ROTATE_RADAR_RIGHT_LARGE: (robot.ActionActionType.ROTATE_RADAR_RIGHT, 45),
         #     self.ActionType.DO_NOTHING: (robot.ActionActionType.DO_NOTHING, 0),
         # }
+        self.action_map = {
+            self.ActionType.MOVE_FORWARD: (robot.ActionActionType.MOVE_FORWARD, 50),
+            self.ActionType.MOVE_BACKWARD: (robot.ActionActionType.MOVE_BACKWARD, 50),
+            self.ActionType.TURN_LEFT: (robot.ActionActionType.TURN_LEFT, 15),
+            self.ActionType.TURN_RIGHT: (robot.ActionActionType.TURN_RIGHT, 15),
+            self.ActionType.TURN_GUN_LEFT: (robot.ActionActionType.TURN_GUN_LEFT, 15),
+            self.ActionType.TURN_GUN_RIGHT: (robot.ActionActionType.TURN_GUN_RIGHT, 15),
+            self.ActionType.TURN_RADAR_LEFT: (robot.ActionActionType.ROTATE_RADAR_LEFT, 15),
+            self.ActionType.TURN_RADAR_RIGHT: (robot.ActionActionType.ROTATE_RADAR_RIGHT, 15),
+            self.ActionType.FIRE: (robot.ActionActionType.FIRE, 1),
+            self.ActionType.DO_NOTHING: (robot.ActionActionType.DO_NOTHING, 0),
+        }
 
     #keep this method for compatibility
     def reset(self):
         pass
 
-    def process_observation(self, game_state: RobocodeGameState) -> torch.Tensor:
+    def process_observation(self, game_state: RobocodeGameState) -> 'torch.Tensor':
+        import torch  # only the tensor helpers need it; the server imports torch once the port is open
+        return torch.from_numpy(self.encode_observation(game_state))
+
+    def encode_observation(self, game_state: RobocodeGameState) -> np.ndarray:
         robot_state = game_state.robot_state
         enemy_state = game_state.enemy
-        max_distance = np.sqrt(robot_state.battle_field_width ** 2 + robot_state.battle_field_height ** 2)
-        # Robot state tensor
-        robot_tensor = torch.tensor([
+        max_distance = self._max_distance(robot_state.battle_field_width, robot_state.battle_field_height)
+        # Robot state features
+        features = [
             robot_state.x / robot_state.battle_field_width,
             robot_state.y / robot_state.battle_field_height,
             robot_state.velocity / self.MAX_VELOCITY,
@@ -110,20 +145,13 @@ class RobocodeEnv:
             robot_state.gun_turn_remaining / (2 * math.pi),  # Normalize gun turn remaining (radians)
             robot_state.radar_turn_remaining / (2 * math.pi),  # Normalize radar turn remaining (radians)
             robot_state.energy / self.MAX_ENERGY,
-        ], dtype=torch.float32)
+        ]
 
-        # Enemy state tensor
+        # Enemy state features
         if enemy_state is None:
-            enemy_tensor = torch.tensor([
-                -1, -1,  # x, y
-                0,  # velocity
-                -1,  # heading
-                self.MISSING_BEARING,  # bearing
-                -1,  # distance
-                -1,  # energy
-            ], dtype=torch.float32)
+            features.extend(self.MISSING_ENEMY_FEATURES)
         else:
-            enemy_tensor = torch.tensor([
+            features.extend((
                 enemy_state.x / robot_state.battle_field_width,
                 enemy_state.y / robot_state.battle_field_height,
                 enemy_state.velocity / self.MAX_VELOCITY,
@@ -131,188 +159,201 @@ class RobocodeEnv:
                 self._normalize_bearing(enemy_state.bearing),
                 enemy_state.distance / max_distance,
                 enemy_state.energy / self.MAX_ENERGY,
-            ], dtype=torch.float32)
+            ))
 
-        # Combine robot and enemy tensors
-        return torch.cat([robot_tensor, enemy_tensor])
+        # A single float64 -> float32 rounding, same as encode_columns
+        return np.array(features, dtype=np.float32)
 
     def _normalize_bearing(self, bearing):
         if bearing == self.MISSING_BEARING:
             return 2  # Use a value outside the normal range (-1 to 1)
         return bearing / 180.0  # This will keep the range between -1 and 1
 
-    def process_observation_batch(self, game_states: List[RobocodeGameState]) -> torch.Tensor:
-        # Assuming game_states is a list of game state objects
-        return torch.stack([self.process_observation(state) for state in game_states])
+    def _max_distance(self, width: float, height: float) -> float:
+        key = (width, height)
+        max_distance = self._max_distance_cache.get(key)
+        if max_distance is None:
+            max_distance = np.sqrt(width ** 2 + height ** 2)
+            self._max_distance_cache[key] = max_distance
+        return max_distance
+
+    def process_observation_batch(self, game_states: List[RobocodeGameState]) -> 'torch.Tensor':
+        import torch
+        return torch.from_numpy(self.encode_observation_batch(game_states))
+
+    def encode_observation_batch(self, game_states: List[RobocodeGameState]) -> np.ndarray:
+        robot_columns, enemy_columns, enemy_mask = self.observation_columns(game_states)
+        return self.encode_columns(robot_columns, enemy_columns, enemy_mask)
+
+    def observation_columns(self, game_states: List[RobocodeGameState]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gather the raw proto fields of a batch into float64 columns (ROBOT_FIELDS / ENEMY_FIELDS order)."""
+        robot_columns = np.array([
+            (rs.x, rs.y, rs.velocity, rs.heading, rs.gun_heading, rs.radar_heading, rs.gun_heat,
+             rs.gun_turn_remaining, rs.radar_turn_remaining, rs.energy,
+             rs.battle_field_width, rs.battle_field_height)
+            for rs in (state.robot_state for state in game_states)
+        ], dtype=np.float64).reshape(-1, len(self.ROBOT_FIELDS))
+
+        enemy_mask = np.array([state.enemy is not None for state in game_states], dtype=bool)
+        enemy_columns = np.zeros((len(game_states), len(self.ENEMY_FIELDS)), dtype=np.float64)
+        if enemy_mask.any():
+            enemy_columns[enemy_mask] = [
+                (es.x, es.y, es.velocity, es.heading, es.bearing, es.distance, es.energy)
+                for es in (state.enemy for state in game_states if state.enemy is not None)
+            ]
+        return robot_columns, enemy_columns, enemy_mask
+
+    def encode_columns(self, robot_columns: np.ndarray, enemy_columns: np.ndarray,
+                       enemy_mask: np.ndarray) -> np.ndarray:
+        """
+        Vectorized equivalent of process_observation for a whole batch of raw field columns.
+
+        All arithmetic is done in float64 and rounded to float32 once at the end, exactly like the
+        per-state path, so the result is bit-identical to stacking encode_observation outputs.
+        Rows where enemy_mask is False get MISSING_ENEMY_FEATURES.
+        """
+        width = robot_columns[:, 10]
+        height = robot_columns[:, 11]
+        two_pi = 2 * math.pi
+
+        features = np.empty((robot_columns.shape[0], 17), dtype=np.float64)
+        features[:, 0] = robot_columns[:, 0] / width
+        features[:, 1] = robot_columns[:, 1] / height
+        features[:, 2] = robot_columns[:, 2] / self.MAX_VELOCITY
+        features[:, 3:6] = robot_columns[:, 3:6] / two_pi
+        features[:, 6] = robot_columns[:, 6] / self.MAX_GUN_HEAT
+        features[:, 7:9] = robot_columns[:, 7:9] / two_pi
+        features[:, 9] = robot_columns[:, 9] / self.MAX_ENERGY
+
+        bearing = enemy_columns[:, 4]
+        features[:, 10] = enemy_columns[:, 0] / width
+        features[:, 11] = enemy_columns[:, 1] / height
+        features[:, 12] = enemy_columns[:, 2] / self.MAX_VELOCITY
+        features[:, 13] = enemy_columns[:, 3] / two_pi
+        features[:, 14] = np.where(bearing == self.MISSING_BEARING, 2.0, bearing / 180.0)
+        features[:, 15] = enemy_columns[:, 5] / self._max_distances(width, height)
+        features[:, 16] = enemy_columns[:, 6] / self.MAX_ENERGY
+        features[~enemy_mask, 10:] = self.MISSING_ENEMY_FEATURES
+
+        return features.astype(np.float32)
+
+    def _max_distances(self, widths: np.ndarray, heights: np.ndarray):
+        # Battles almost always share one battlefield, so reuse the cached scalar when we can
+        if widths.size == 0:
+            return 1.0
+        if (widths == widths[0]).all() and (heights == heights[0]).all():
+            return self._max_distance(float(widths[0]), float(heights[0]))
+        return np.array([self._max_distance(w, h) for w, h in zip(widths.tolist(), heights.tolist())])
 
     def calculate_reward(self, previous_state: RobocodeGameState, previous_action: int,
-                         current_state: RobocodeGameState) -> float:
+                         current_state: RobocodeGameState,
+                         round_result: robot.RoundResultReason = robot.RoundResultReason.UNKNOWN) -> float:
         if previous_state is None or previous_action is None or current_state is None:
             return 0
-
-        reward_breakdown = {
-            'penaltyByHitByBullet': 0,
-            'awardByBulletHit': 0,
-            'penaltyByHitWall': 0,
-            'awardByWinning': 0,
-            'penaltyByDying': 0,
-            'gunTurnReward': 0,
-            'penaltyByBulletMissed': 0,
-            'penaltyByCollision': 0,
-            'stepPenalty': -self.STEP_PENALTY,
-            'firingAccuracyReward': 0,
-            'firingPowerReward': 0,
-            'firingPenalty': 0
-        }
-
-        # Extract robot states
-        prev_robot_state = previous_state.robot_state
-        curr_robot_state = current_state.robot_state
-
-        # Handle enemy information
-        prev_enemy_state = previous_state.enemy
-        curr_enemy_state = current_state.enemy
-
-        # Calculate gun bearings
-        previous_gun_bearing = self._calculate_gun_bearing(prev_robot_state, prev_enemy_state)
-        current_gun_bearing = self._calculate_gun_bearing(curr_robot_state, curr_enemy_state)
-
-        # Calculate gun turn reward
-        if previous_gun_bearing is not None and current_gun_bearing is not None and curr_enemy_state is not None:
-            reward_breakdown['gunTurnReward'] = self._calculate_gun_turn_reward(
-                previous_gun_bearing,
-                current_gun_bearing,
-                curr_enemy_state.distance
-            )
-
-            firing_rewards = self._calculate_firing_reward(
-                current_gun_bearing,
-                curr_enemy_state.distance,
-                previous_action
-            )
-            for award, value in firing_rewards.items():
-                reward_breakdown[award] += value
-
-        # Process events
+        return self.reward_from_inputs(self.reward_inputs(previous_state, current_state, round_result), previous_action)
+
+    def reward_inputs(self, previous_state: RobocodeGameState, current_state: RobocodeGameState,
+                      round_result: robot.RoundResultReason = robot.RoundResultReason.UNKNOWN) -> np.ndarray:
+        """
+        The REWARD_INPUT_FIELDS row for one transition: both robot headings, the enemy bearings
+        (MISSING_BEARING without a scan), the current enemy distance, the events attached to
+        previous_state summed per kind, and the round result (+1 win, -1 loss) on the last transition.
+        """
+        hit_by_bullet = bullet_hit = wall_hits = bullet_missed = collisions = at_fault = 0.0
         for event in previous_state.events:
             if isinstance(event, robot.HitByBulletEvent):
-                bullet_power = event.bullet.power
-                reward_breakdown['penaltyByHitByBullet'] -= self.DAMAGE_TAKEN_SCALE * bullet_power
+                hit_by_bullet += event.bullet.power
             elif isinstance(event, robot.BulletHitEvent):
-                bullet_power = event.bullet.power
-                reward_breakdown['awardByBulletHit'] += self.DAMAGE_DEALT_SCALE * bullet_power
+                bullet_hit += event.bullet.power
             elif isinstance(event, robot.HitWallEvent):
-                reward_breakdown['penaltyByHitWall'] -= self.WALL_HIT_PENALTY
+                wall_hits += 1
             elif isinstance(event, robot.BulletMissedEvent):
-                bullet_power = event.bullet.power
-                reward_breakdown['penaltyByBulletMissed'] -= self.BULLET_MISS_PENALTY * bullet_power
+                bullet_missed += event.bullet.power
             elif isinstance(event, robot.HitRobotEvent):
-                # Add penalty for collision
-                collision_penalty = self.COLLISION_PENALTY
-                if event.at_fault:
-                    # If the robot is at fault, increase the penalty
-                    collision_penalty *= 2
-                reward_breakdown['penaltyByCollision'] -= collision_penalty
+                collisions += 1
+                at_fault += event.at_fault
             else:
                 logger.warning(f"Unhandled event: {event}")
 
-        total_reward = sum(reward_breakdown.values())
-
-        # Log reward components
-        self.log_reward_components(reward_breakdown, total_reward)
-
+        prev_robot_state = previous_state.robot_state
+        curr_robot_state = current_state.robot_state
+        curr_enemy_state = current_state.enemy
+        return np.array([
+            prev_robot_state.heading, prev_robot_state.gun_heading, self._enemy_bearing(previous_state.enemy),
+            curr_robot_state.heading, curr_robot_state.gun_heading, self._enemy_bearing(curr_enemy_state),
+            curr_enemy_state.distance if curr_enemy_state is not None else 0.0,
+            hit_by_bullet, bullet_hit, wall_hits, bullet_missed, collisions, at_fault,
+            self.ROUND_RESULT_SIGNS.get(round_result, 0),
+        ], dtype=np.float64)
+
+    def _enemy_bearing(self, enemy_state: Optional[robot.ScannedRobotEvent]) -> float:
+        # Truthiness, as the scalar reward always tested it: a scan with every field at its default counts as
+        # no scan here, although the observation encoders (which test for None) still encode it as an enemy
+        return enemy_state.bearing if enemy_state else self.MISSING_BEARING
+
+    def reward_input_columns(self, previous_columns: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                             current_columns: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                             event_columns: np.ndarray, round_results: np.ndarray) -> np.ndarray:
+        """
+        reward_inputs for a batch straight from observation columns, without building messages.
+
+        previous_columns and current_columns are (robot_columns, enemy_columns, enemy_mask) as
+        observation_columns returns them; event_columns holds the six event sums in REWARD_INPUT_FIELDS
+        order and round_results the RoundResultReason of each transition (UNKNOWN while running).
+        Like _enemy_bearing, a scan whose columns are all zero has no bearing; the columns leave out
+        ScannedRobotEvent.time, which cannot matter since a real scan always has a positive distance.
+        """
+        (prev_robot, prev_enemy, prev_mask), (curr_robot, curr_enemy, curr_mask) = previous_columns, current_columns
+        prev_mask = prev_mask & prev_enemy.any(axis=1)
+        curr_mask = curr_mask & curr_enemy.any(axis=1)
+        inputs = np.empty((len(curr_robot), len(REWARD_INPUT_FIELDS)), dtype=np.float64)
+        inputs[:, 0:2] = prev_robot[:, 3:5]
+        inputs[:, 2] = np.where(prev_mask, prev_enemy[:, 4], self.MISSING_BEARING)
+        inputs[:, 3:5] = curr_robot[:, 3:5]
+        inputs[:, 5] = np.where(curr_mask, curr_enemy[:, 4], self.MISSING_BEARING)
+        inputs[:, 6] = np.where(curr_mask, curr_enemy[:, 5], 0.0)
+        inputs[:, 7:13] = event_columns
+        inputs[:, 13] = np.select([round_results == robot.RoundResultReason.WIN,
+                                   round_results == robot.RoundResultReason.LOSS], [1, -1], default=0)
+        return inputs
+
+    def reward_from_inputs(self, inputs: np.ndarray, action: int) -> float:
+        """Total reward of one reward_inputs row, logging its components like every live step."""
+        if not 0 <= action < len(self.ActionType):
+            logger.warning(f"Invalid action {action} passed to the reward engine")
+        totals, components = self.reward_engine.rewards(inputs[None], np.array([action]))
+        total_reward = float(totals[0])
+        self.log_reward_components(components[0], total_reward)
         return total_reward
 
-    def _calculate_gun_bearing(self, robot_state: robot.RobotState, enemy_state: Optional[robot.ScannedRobotEvent]) -> \
-    Optional[float]:
-        if enemy_state and enemy_state.bearing != self.MISSING_BEARING:
-            return self.calculate_bearing_from_gun(
-                robot_state.heading,
-                enemy_state.bearing,
-                robot_state.gun_heading
-            )
-        return None
-
-    def log_reward_components(self, reward_breakdown, total_reward):
-        self.writer.add_scalars('Reward_Components', reward_breakdown, self.step_count)
-        self.writer.add_scalar('Total_Reward', total_reward, self.step_count)
+    def rewards_from_inputs(self, inputs: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """Total rewards of a batch of reward_inputs rows; the components are logged as per-step means."""
+        totals, components = self.reward_engine.rewards(inputs, actions)
+        count = len(totals)
+        if count and self.metrics is not None:
+            self.metrics.record_many('Reward_Components', REWARD_COMPONENTS, components.sum(axis=0), count=count)
+            self.metrics.record('Total_Reward', float(totals.sum()), count=count)
+            self.metrics.tick(count)
+        self.step_count += count
+        return totals
+
+    def log_reward_components(self, components: np.ndarray, total_reward: float) -> None:
+        if self.metrics is not None:
+            self.metrics.record_many('Reward_Components', REWARD_COMPONENTS, components)
+            self.metrics.record('Total_Reward', total_reward)
+            self.metrics.tick()
 
         self.step_count += 1
 
-        reward_logger.debug(f"Step: {self.step_count}, Reward breakdown - " +
-                            ", ".join([f"{k}: {v:.2f}" for k, v in reward_breakdown.items()]) +
-                            f", total: {total_reward:.2f}")
-
-    def _calculate_gun_turn_reward(self, last_gun_bearing, current_gun_bearing, enemy_distance):
-        last_aim_error = abs(last_gun_bearing)
-        current_aim_error = abs(current_gun_bearing)
-
-        # Calculate the angle tolerance based on robot size and enemy distance
-        angle_tolerance = math.degrees(math.atan2(self.ROBOT_SIZE / 2, enemy_distance))
-
-        # Calculate the improvement in aiming
-        aim_improvement = last_aim_error - current_aim_error
-
-        # Base reward for improvement
-        if aim_improvement > 0:
-            # Reward for turning towards the enemy
-            base_reward = aim_improvement * self.GUN_TURN_IMPROVEMENT_SCALE
-        elif aim_improvement < 0:
-            # Penalty for turning away from the enemy
-            base_reward = aim_improvement * self.GUN_TURN_PENALTY_SCALE
-        else:
-            # No movement
-            if current_aim_error <= angle_tolerance:
-                # Reward for maintaining good aim
-                base_reward = self.ACCURACY_REWARD_SCALE
-            else:
-                # Penalty for not improving when aim is poor
-                base_reward = -self.GUN_TURN_PENALTY_SCALE * 5
-
-        # Additional reward for accuracy
-        if current_aim_error <= angle_tolerance:
-            accuracy_reward = (angle_tolerance - current_aim_error) * self.ACCURACY_REWARD_SCALE
-        else:
-            accuracy_reward = 0
-
-        total_reward = base_reward + accuracy_reward
-
-        return total_reward
-
-    def _calculate_firing_reward(self, current_gun_bearing, enemy_distance, action) -> Dict[str, float]:
-        firing_reward = {
-            'firingAccuracyReward': 0,
-            'firingPowerReward': 0,
-            'firingPenalty': 0
-        }
-
-        try:
-            action_type: RobocodeEnv.ActionType = self.ActionType(action)
-        except ValueError:
-            logger.warning(f"Invalid action {action} passed to _calculate_firing_reward")
-            return firing_reward  # Return default rewards
-
-        if action_type.is_fire_action():
-            current_aim_error = abs(current_gun_bearing)
-            angle_tolerance = math.degrees(math.atan2(self.ROBOT_SIZE / 2, enemy_distance))
-            if current_aim_error <= angle_tolerance:
-                # Reward for firing accurately
-                firing_reward['firingAccuracyReward'] = self.FIRING_ACCURACY_REWARD
-                # Additional reward based on firing power
-                firing_reward['firingPowerReward'] = self.FIRING_POWER_REWARD_SCALE * RobocodeEnv.FIRING_REWARD_SCALE[action_type]
-            else:
-                # Penalty for firing inaccurately
-                firing_reward['firingPenalty'] = self.FIRING_PENALTY
-
-        return firing_reward
-
-    def calculate_bearing_from_gun(self, robot_heading, enemy_bearing, gun_heading):
-        absolute_bearing = (robot_heading + enemy_bearing) % 360
-        bearing_from_gun = self._normalize_angle(absolute_bearing - gun_heading)
-        return bearing_from_gun
+        if logger_config.HOT_PATH_DEBUG:
+            reward_logger.debug(f"Step: {self.step_count}, Reward breakdown - " +
+                                ", ".join([f"{k}: {v:.2f}" for k, v in zip(REWARD_COMPONENTS, components.tolist())]) +
+                                f", total: {total_reward:.2f}")
 
-    def _normalize_angle(self, angle):
-        return ((angle + 180) % 360) - 180
+    def fire_scales(self) -> np.ndarray:
+        """FIRING_REWARD_SCALE per action index, NaN for actions that do not fire."""
+        return np.array([self.FIRING_REWARD_SCALE[action] if action.is_fire_action() else np.nan
+                         for action in self.ActionType], dtype=np.float64)
 
     def action_to_robocode(self, action: int) -> robot.Action:
         try:
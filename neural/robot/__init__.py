@@ -6,9 +6,13 @@
 from dataclasses import dataclass
 from typing import (
     TYPE_CHECKING,
+    AsyncIterable,
+    AsyncIterator,
     Dict,
+    Iterable,
     List,
     Optional,
+    Union,
 )
 
 import betterproto
@@ -42,15 +46,56 @@ class ActionActionType(betterproto.Enum):
     DO_NOTHING = 9
 
 
+@dataclass(eq=False, repr=False)
+class RobotMessage(betterproto.Message):
+    state: "GameState" = betterproto.message_field(1, group="payload")
+    event: "Event" = betterproto.message_field(2, group="payload")
+    round_result: "RoundResult" = betterproto.message_field(3, group="payload")
+    start_round: "betterproto_lib_google_protobuf.Empty" = betterproto.message_field(
+        4, group="payload"
+    )
+
+
 @dataclass(eq=False, repr=False)
 class GameState(betterproto.Message):
     robot_state: "RobotState" = betterproto.message_field(1)
     enemy: "ScannedRobotEvent" = betterproto.message_field(2)
+    events: List["Event"] = betterproto.message_field(3)
+    """
+    Events raised since the previous GameState, in arrival order; replaces one
+    OnEvent call per event
+    """
+
+    local_action: Optional[int] = betterproto.int32_field(4, optional=True)
+    """
+    Action index the robot already took with its local copy of the policy
+    (GetPolicy); the server then only learns from the transition and answers
+    with empty Actions
+    """
+
+    sequence: int = betterproto.int64_field(5)
+    """
+    Numbers the states of one robot (1, 2, ...) so a late Play reply cannot be
+    taken for the answer to a newer state; echoed in Actions.sequence. 0:
+    unnumbered, every reply is assumed to have been executed
+    """
+
+    executed_sequence: int = betterproto.int64_field(6)
+    """
+    Sequence of the last state whose Actions (or localAction) the robot
+    actually executed. The server only learns from the previous transition
+    when this is the state it answered last
+    """
 
 
 @dataclass(eq=False, repr=False)
 class RoundResult(betterproto.Message):
     reason: "RoundResultReason" = betterproto.enum_field(1)
+    events: List["Event"] = betterproto.message_field(2)
+    """Events raised since the last GameState of the round"""
+
+    executed_sequence: int = betterproto.int64_field(3)
+    """as in GameState"""
 
 
 @dataclass(eq=False, repr=False)
@@ -169,6 +214,54 @@ class Action(betterproto.Message):
 @dataclass(eq=False, repr=False)
 class Actions(betterproto.Message):
     actions: List["Action"] = betterproto.message_field(1)
+    repeat: int = betterproto.int32_field(2)
+    """
+    Action plan: re-apply these actions at the next `repeat` decision points
+    (scans or periodic updates) without asking the server; the next GameState
+    then covers the whole window
+    """
+
+    sequence: int = betterproto.int64_field(3)
+    """GameState.sequence of the state this answers"""
+
+
+@dataclass(eq=False, repr=False)
+class PolicyRequest(betterproto.Message):
+    version: int = betterproto.int64_field(1)
+    """version the caller already holds, 0 for none"""
+
+
+@dataclass(eq=False, repr=False)
+class Policy(betterproto.Message):
+    version: int = betterproto.int64_field(1)
+    """increases with every published snapshot, also across server restarts"""
+
+    not_modified: bool = betterproto.bool_field(2)
+    """the caller's version is current; nothing else is set"""
+
+    layer_sizes: List[int] = betterproto.int32_field(3)
+    """Units per layer of the ReLU MLP, input first, e.g. [17, 32, 32, 10]"""
+
+    weights: bytes = betterproto.bytes_field(4)
+    """
+    Little-endian float32; per layer the [in][out] weight matrix (q = x * W +
+    b) followed by the bias
+    """
+
+    epsilon: float = betterproto.double_field(5)
+    """exploration rate the server would use"""
+
+    actions: List["Action"] = betterproto.message_field(6)
+    """Robocode action for each output index"""
+
+
+@dataclass(eq=False, repr=False)
+class HealthStatus(betterproto.Message):
+    ready: bool = betterproto.bool_field(1)
+    """model, replay buffer and learner are loaded"""
+
+    startup_seconds: float = betterproto.double_field(2)
+    """from serve() to ready; 0 while still loading"""
 
 
 class RobotServiceStub(betterproto.ServiceStub):
@@ -257,6 +350,61 @@ class RobotServiceStub(betterproto.ServiceStub):
             metadata=metadata,
         )
 
+    async def play(
+        self,
+        robot_message_iterator: Union[
+            AsyncIterable["RobotMessage"], Iterable["RobotMessage"]
+        ],
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> AsyncIterator["Actions"]:
+        async for response in self._stream_stream(
+            "/robot.RobotService/Play",
+            robot_message_iterator,
+            RobotMessage,
+            Actions,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        ):
+            yield response
+
+    async def get_policy(
+        self,
+        policy_request: "PolicyRequest",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> "Policy":
+        return await self._unary_unary(
+            "/robot.RobotService/GetPolicy",
+            policy_request,
+            Policy,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        )
+
+    async def health(
+        self,
+        betterproto_lib_google_protobuf_empty: "betterproto_lib_google_protobuf.Empty",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> "HealthStatus":
+        return await self._unary_unary(
+            "/robot.RobotService/Health",
+            betterproto_lib_google_protobuf_empty,
+            HealthStatus,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        )
+
 
 class RobotServiceBase(ServiceBase):
 
@@ -280,6 +428,21 @@ class RobotServiceBase(ServiceBase):
     ) -> "betterproto_lib_google_protobuf.Empty":
         raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
 
+    async def play(
+        self, robot_message_iterator: AsyncIterator["RobotMessage"]
+    ) -> AsyncIterator["Actions"]:
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+        yield Actions()
+
+    async def get_policy(self, policy_request: "PolicyRequest") -> "Policy":
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+
+    async def health(
+        self,
+        betterproto_lib_google_protobuf_empty: "betterproto_lib_google_protobuf.Empty",
+    ) -> "HealthStatus":
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+
     async def __rpc_send_state(
         self, stream: "grpclib.server.Stream[GameState, Actions]"
     ) -> None:
@@ -318,6 +481,31 @@ class RobotServiceBase(ServiceBase):
         response = await self.start_round(request)
         await stream.send_message(response)
 
+    async def __rpc_play(
+        self, stream: "grpclib.server.Stream[RobotMessage, Actions]"
+    ) -> None:
+        request = stream.__aiter__()
+        await self._call_rpc_handler_server_stream(
+            self.play,
+            stream,
+            request,
+        )
+
+    async def __rpc_get_policy(
+        self, stream: "grpclib.server.Stream[PolicyRequest, Policy]"
+    ) -> None:
+        request = await stream.recv_message()
+        response = await self.get_policy(request)
+        await stream.send_message(response)
+
+    async def __rpc_health(
+        self,
+        stream: "grpclib.server.Stream[betterproto_lib_google_protobuf.Empty, HealthStatus]",
+    ) -> None:
+        request = await stream.recv_message()
+        response = await self.health(request)
+        await stream.send_message(response)
+
     def __mapping__(self) -> Dict[str, grpclib.const.Handler]:
         return {
             "/robot.RobotService/SendState": grpclib.const.Handler(
@@ -350,4 +538,22 @@ class RobotServiceBase(ServiceBase):
                 betterproto_lib_google_protobuf.Empty,
                 betterproto_lib_google_protobuf.Empty,
             ),
+            "/robot.RobotService/Play": grpclib.const.Handler(
+                self.__rpc_play,
+                grpclib.const.Cardinality.STREAM_STREAM,
+                RobotMessage,
+                Actions,
+            ),
+            "/robot.RobotService/GetPolicy": grpclib.const.Handler(
+                self.__rpc_get_policy,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                PolicyRequest,
+                Policy,
+            ),
+            "/robot.RobotService/Health": grpclib.const.Handler(
+                self.__rpc_health,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                betterproto_lib_google_protobuf.Empty,
+                HealthStatus,
+            ),
         }
@@ -0,0 +1,86 @@
+import threading
+from typing import Optional
+
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReplayScheduler:
+    """
+    Decides how many replay updates to run, from global transition counts rather than per-episode steps.
+
+    Every transition adds updates_per_transition of credit; a slot (one call to due()) hands out the whole
+    part of the credit, at most max_updates_per_slot. With a latency_budget (seconds) the slot is further
+    capped to the number of updates whose measured duration (an EMA of record_update) fits the budget,
+    so an inline learner never stretches a turn past it. If a single update takes longer than the budget,
+    the budget of each slot is banked instead and one update runs every ceil(update_time / latency_budget)
+    slots, so training slows down but never stalls. Credit beyond one full slot is dropped rather
+    than owed, which is why the effective ratio can fall below the target; it is reported as
+    Replay/EffectiveRatio every report_interval transitions.
+    """
+
+    def __init__(self, updates_per_transition: float = 0.25, batch_size: int = 128, min_memory: int = 1000,
+                 max_updates_per_slot: Optional[int] = 4, latency_budget: Optional[float] = None,
+                 metrics=None, report_interval: int = 1000, ema_weight: float = 0.1):
+        self.updates_per_transition = updates_per_transition
+        self.batch_size = batch_size
+        self.min_memory = min_memory
+        self.max_updates_per_slot = max_updates_per_slot
+        self.latency_budget = latency_budget
+        self.metrics = metrics
+        self.report_interval = report_interval
+        self.ema_weight = ema_weight
+
+        self.update_time: Optional[float] = None  # EMA of one update, seconds
+        self._credit = 0.0
+        self._banked_time = 0.0  # latency budget saved up while one update is longer than a slot
+        self._transitions = 0
+        self._updates = 0
+        self._lock = threading.Lock()
+
+    def due(self, transitions: int, memory_size: int) -> int:
+        """Account for new transitions and return how many updates to run now."""
+        with self._lock:
+            self._transitions += transitions
+            if self._transitions >= self.report_interval:
+                self._report()
+            if memory_size <= self.min_memory:
+                return 0
+            self._credit += transitions * self.updates_per_transition
+            updates = int(self._credit)
+            if self.max_updates_per_slot is not None:
+                updates = min(updates, self.max_updates_per_slot)
+            if self.latency_budget is not None and self.update_time:
+                affordable = int(self.latency_budget / self.update_time)
+                if affordable == 0 and updates > 0:
+                    self._banked_time += self.latency_budget
+                    if self._banked_time >= self.update_time:
+                        self._banked_time = 0.0
+                        affordable = 1
+                updates = min(updates, affordable)
+            self._credit -= updates
+            # Never carry more than one slot of debt; a slow learner lowers the ratio instead of falling behind
+            ceiling = self.max_updates_per_slot if self.max_updates_per_slot is not None else max(updates, 1)
+            self._credit = min(self._credit, ceiling)
+            return updates
+
+    def record_update(self, seconds: float) -> None:
+        """Called after each replay update actually ran, from whichever thread ran it."""
+        with self._lock:
+            self._updates += 1
+            if self.update_time is None:
+                self.update_time = seconds
+            else:
+                self.update_time += self.ema_weight * (seconds - self.update_time)
+
+    def _report(self) -> None:
+        ratio = self._updates / self._transitions
+        if self.metrics is not None:
+            self.metrics.record('Replay/EffectiveRatio', ratio)
+            if self.update_time is not None:
+                self.metrics.record('Replay/UpdateTimeMs', self.update_time * 1e3)
+        logger.debug(f"Replay ratio {ratio:.3f} (target {self.updates_per_transition}) "
+                     f"over {self._transitions} transitions")
+        self._transitions = 0
+        self._updates = 0
@@ -0,0 +1,62 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from robocode_env import RobocodeGameState
+
+SESSION_METADATA_KEY = 'x-session-id'
+DEFAULT_SESSION_ID = 'default'
+# 'true' marks an evaluation client: greedy actions from a frozen policy, nothing learned from its games
+EVAL_METADATA_KEY = 'x-eval'
+
+# Set per RPC from the request metadata before the servicer method runs
+current_session_id: ContextVar[str] = ContextVar('current_session_id', default=DEFAULT_SESSION_ID)
+current_evaluation: ContextVar[bool] = ContextVar('current_evaluation', default=False)
+
+
+@dataclass
+class Session:
+    session_id: str
+    evaluation: bool = False
+    previous_state: Optional[RobocodeGameState] = None
+    previous_action: Optional[int] = None
+    # GameState.sequence previous_action answered; 0 for clients that do not number their states
+    previous_sequence: int = 0
+    episode_reward: float = 0
+    episode_step: int = 0
+    last_seen: float = field(default_factory=time.monotonic)
+
+    def reset(self) -> None:
+        self.previous_state = None
+        self.previous_action = None
+        self.previous_sequence = 0
+        self.episode_reward = 0
+        self.episode_step = 0
+
+
+def session_id_from_metadata(metadata) -> str:
+    if metadata is None:
+        return DEFAULT_SESSION_ID
+    return metadata.get(SESSION_METADATA_KEY) or DEFAULT_SESSION_ID
+
+
+def evaluation_from_metadata(metadata) -> bool:
+    if metadata is None:
+        return False
+    return (metadata.get(EVAL_METADATA_KEY) or '').lower() in ('1', 'true')
+
+
+def with_session(func):
+    """Wrap a grpclib stream handler so the servicer sees the caller's session id and evaluation flag."""
+
+    async def handler(stream) -> None:
+        token = current_session_id.set(session_id_from_metadata(stream.metadata))
+        evaluation_token = current_evaluation.set(evaluation_from_metadata(stream.metadata))
+        try:
+            await func(stream)
+        finally:
+            current_evaluation.reset(evaluation_token)
+            current_session_id.reset(token)
+
+    return handler
@@ -0,0 +1,509 @@
+"""
+Headless 1v1 Robocode-like arena for pretraining without the JVM or the network.
+
+The physics follow the Robocode rules that matter to NeuralRobot: acceleration 1 / deceleration 2 up to
+8 px/turn, body turn rate 10 - 0.75 * |velocity|, gun 20 and radar 45 deg/turn, gun heat 1 + power / 5
+cooling 0.1 per turn, bullet speed 20 - 3 * power, bullet damage 4 * power (+ 2 * (power - 1) above 1),
+3 * power energy returned to the shooter, wall damage |velocity| / 2 - 1 and 0.6 per robot collision.
+
+Everything the robot receives mirrors RobotMapper: angles in degrees (0 = north, clockwise), bearings in
+[-180, 180) relative to the body heading, the scanned enemy's x/y left at zero, Bullet.heading_radians in
+radians. As in NeuralRobot the radar spins continuously and a state is produced whenever the enemy is
+scanned, or without an enemy after UPDATE_INTERVAL_TURNS turns; events raised in between belong to the
+previous state, exactly like OnEvent calls between two SendState calls.
+
+VectorArena steps n independent battles with NumPy arrays; Simulator wraps a single arena in the
+RobocodeGameState objects RobocodeEnv.calculate_reward and DQNAgent expect. Batched training can skip
+the messages: robot_columns, scan and reward_event_columns feed RobocodeEnv.reward_input_columns.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import robot
+from reward_engine import EVENT_COLUMNS, INPUT_INDEX
+from robocode_env import RobocodeEnv, RobocodeGameState
+
+AGENT = 0
+OPPONENT = 1
+AGENT_NAME = 'NeuralRobot'
+OPPONENT_NAME = 'SimBot'
+
+MAX_VELOCITY = 8.0
+ACCELERATION = 1.0
+DECELERATION = 2.0
+MAX_TURN_RATE = 10.0
+GUN_TURN_RATE = 20.0
+RADAR_TURN_RATE = 45.0
+GUN_COOLING_RATE = 0.1
+INITIAL_GUN_HEAT = 3.0
+ROBOT_HALF_SIZE = 18.0
+RADAR_RANGE = 1200.0
+ROBOT_HIT_DAMAGE = 0.6
+MIN_BULLET_POWER = 0.1
+MAX_BULLET_POWER = 3.0
+UPDATE_INTERVAL_TURNS = 100  # NeuralRobot sends a state without an enemy after this many turns
+
+BULLET_HIT, BULLET_MISSED, HIT_BY_BULLET, HIT_WALL, HIT_ROBOT, ROBOT_DEATH = range(6)
+REWARD_EVENT_COLUMN = {name: INPUT_INDEX[name] - EVENT_COLUMNS.start for name in (
+    'hit_by_bullet_power', 'bullet_hit_power', 'wall_hits', 'bullet_missed_power', 'collisions', 'collisions_at_fault')}
+
+
+@dataclass
+class ArenaConfig:
+    width: float = 800.0
+    height: float = 600.0
+    max_turns: int = 10000  # rounds still running after this many turns end with UNKNOWN
+    max_bullets: int = 16  # per arena, both robots together
+    opponent_fire_rate: float = 0.5  # chance per turn to fire once the gun is cool and on target
+    opponent_aim_error: float = 10.0  # std dev of the opponent's aim in degrees
+
+
+def normalize_bearing(angle):
+    return (angle + 180) % 360 - 180
+
+
+def absolute_angle(dx, dy):
+    # Robocode angles: 0 is north (+y), 90 is east (+x)
+    return np.degrees(np.arctan2(dx, dy)) % 360
+
+
+def bullet_speed(power):
+    return 20 - 3 * power
+
+
+def bullet_damage(power):
+    return 4 * power + 2 * np.maximum(power - 1, 0)
+
+
+def action_tables(action_map: Dict) -> Dict[str, np.ndarray]:
+    """
+    Translate RobocodeEnv.action_map into per-action command arrays, NaN meaning "leave unchanged".
+
+    Mirrors NeuralRobot.executeAction: ahead/back set the distance, turns set the remaining angle
+    (left is negative), fire is clamped to [0.1, 3]; radar rotations are ignored there, so they are here.
+    """
+    size = max(action.value for action in action_map) + 1
+    tables = {name: np.full(size, np.nan) for name in ('distance', 'turn', 'gun_turn', 'fire')}
+    for action, (action_type, value) in action_map.items():
+        i = action.value
+        if action_type == robot.ActionActionType.MOVE_FORWARD:
+            tables['distance'][i] = value
+        elif action_type == robot.ActionActionType.MOVE_BACKWARD:
+            tables['distance'][i] = -value
+        elif action_type == robot.ActionActionType.TURN_RIGHT:
+            tables['turn'][i] = value
+        elif action_type == robot.ActionActionType.TURN_LEFT:
+            tables['turn'][i] = -value
+        elif action_type == robot.ActionActionType.TURN_GUN_RIGHT:
+            tables['gun_turn'][i] = value
+        elif action_type == robot.ActionActionType.TURN_GUN_LEFT:
+            tables['gun_turn'][i] = -value
+        elif action_type == robot.ActionActionType.FIRE:
+            tables['fire'][i] = min(MAX_BULLET_POWER, max(MIN_BULLET_POWER, value))
+    return tables
+
+
+class VectorArena:
+    """
+    n independent 1v1 battles stepped in lock-step; robot arrays are (n, 2) with AGENT and OPPONENT columns.
+
+    step(actions) applies one agent action per arena and runs turns until every live arena has its next
+    state. Arenas that finish stay done until reset(mask) starts their next round.
+    """
+
+    def __init__(self, n: int, action_map: Dict, config: Optional[ArenaConfig] = None, seed: Optional[int] = None):
+        self.n = n
+        self.config = config or ArenaConfig()
+        self.rng = np.random.default_rng(seed)
+        self.actions = action_tables(action_map)
+
+        shape = (n, 2)
+        self.x = np.zeros(shape)
+        self.y = np.zeros(shape)
+        self.heading = np.zeros(shape)
+        self.velocity = np.zeros(shape)
+        self.gun_heading = np.zeros(shape)
+        self.radar_heading = np.zeros(shape)
+        self.gun_heat = np.zeros(shape)
+        self.energy = np.zeros(shape)
+        self.distance_remaining = np.zeros(shape)
+        self.turn_remaining = np.zeros(shape)
+        self.gun_turn_remaining = np.zeros(shape)
+        self.radar_turn_remaining = np.zeros(shape)
+        self.fire_power = np.zeros(shape)  # pending setFire; like Robocode it only applies to the next turn
+
+        bullets = (n, self.config.max_bullets)
+        self.bullet_active = np.zeros(bullets, dtype=bool)
+        self.bullet_owner = np.zeros(bullets, dtype=np.int64)
+        self.bullet_x = np.zeros(bullets)
+        self.bullet_y = np.zeros(bullets)
+        self.bullet_heading = np.zeros(bullets)
+        self.bullet_power = np.zeros(bullets)
+
+        self.time = np.zeros(n, dtype=np.int64)
+        self.round_num = np.full(n, -1, dtype=np.int64)
+        self.last_state_time = np.zeros(n, dtype=np.int64)
+        self.scanned = np.zeros(n, dtype=bool)
+        # Enemy as last scanned, in RobocodeEnv.ENEMY_FIELDS order (x and y stay zero, as RobotMapper sends them)
+        self.scan = np.zeros((n, len(RobocodeEnv.ENEMY_FIELDS)))
+        self.done = np.zeros(n, dtype=bool)
+        self.result = np.zeros(n, dtype=np.int64)
+        # (kind, arena indices, field arrays) raised since the last state
+        self.events: List[Tuple[int, np.ndarray, Dict[str, np.ndarray]]] = []
+
+        self.reset()
+
+    def reset(self, mask: Optional[np.ndarray] = None) -> None:
+        """Start a new round in the masked arenas and run them up to their first state."""
+        mask = np.ones(self.n, dtype=bool) if mask is None else mask
+        count = int(mask.sum())
+        if not count:
+            return
+        config = self.config
+
+        x = self.rng.uniform(ROBOT_HALF_SIZE, config.width - ROBOT_HALF_SIZE, (count, 2))
+        y = self.rng.uniform(ROBOT_HALF_SIZE, config.height - ROBOT_HALF_SIZE, (count, 2))
+        # Re-draw the opponent wherever the two robots would start overlapping
+        while True:
+            overlap = (np.abs(x[:, 0] - x[:, 1]) < 4 * ROBOT_HALF_SIZE) & (np.abs(y[:, 0] - y[:, 1]) < 4 * ROBOT_HALF_SIZE)
+            if not overlap.any():
+                break
+            x[overlap, 1] = self.rng.uniform(ROBOT_HALF_SIZE, config.width - ROBOT_HALF_SIZE, overlap.sum())
+            y[overlap, 1] = self.rng.uniform(ROBOT_HALF_SIZE, config.height - ROBOT_HALF_SIZE, overlap.sum())
+        heading = self.rng.uniform(0, 360, (count, 2))
+
+        self.x[mask], self.y[mask] = x, y
+        self.heading[mask] = heading
+        self.gun_heading[mask] = heading
+        self.radar_heading[mask] = heading
+        for array in (self.velocity, self.distance_remaining, self.turn_remaining, self.gun_turn_remaining,
+                      self.radar_turn_remaining, self.fire_power):
+            array[mask] = 0
+        self.gun_heat[mask] = INITIAL_GUN_HEAT
+        self.energy[mask] = 100.0
+        self.bullet_active[mask] = False
+
+        self.time[mask] = 0
+        self.round_num[mask] += 1
+        self.last_state_time[mask] = 0
+        self.done[mask] = False
+        self.result[mask] = robot.RoundResultReason.UNKNOWN
+        self.events = []
+        self._advance(mask)
+
+    def step(self, actions: np.ndarray, repeat: int = 0) -> np.ndarray:
+        """
+        Apply one action per arena (ignored for done arenas), run to the next states and return done.
+        With repeat, the actions are applied again at that many further states, as a robot following an
+        Actions.repeat plan does; events of the whole window are kept.
+        """
+        self.events = []
+        actions = np.asarray(actions)
+        for _ in range(repeat + 1):
+            live = ~self.done
+            if not live.any():
+                break
+            for name, target in (('distance', self.distance_remaining), ('turn', self.turn_remaining),
+                                 ('gun_turn', self.gun_turn_remaining), ('fire', self.fire_power)):
+                command = self.actions[name][actions]
+                given = live & ~np.isnan(command)
+                target[given, AGENT] = command[given]
+            self._advance(live)
+        return self.done.copy()
+
+    def _advance(self, waiting: np.ndarray) -> None:
+        waiting = waiting.copy()
+        self.scanned[waiting] = False
+        while waiting.any():
+            self._tick(waiting)
+            ready = self.scanned | self.done | (self.time - self.last_state_time >= UPDATE_INTERVAL_TURNS)
+            self.last_state_time[waiting & ready] = self.time[waiting & ready]
+            waiting &= ~ready
+
+    def _tick(self, active: np.ndarray) -> None:
+        a2 = np.repeat(active[:, None], 2, axis=1)
+        self._opponent_commands(active)
+
+        # Fire: a pending shot leaves only if the gun is cool, and is dropped either way
+        can_fire = a2 & (self.fire_power > 0) & (self.gun_heat <= 1e-9) & (self.energy > self.fire_power)
+        for owner in (AGENT, OPPONENT):
+            arenas = np.flatnonzero(can_fire[:, owner])
+            if arenas.size:
+                self._spawn_bullets(arenas, owner)
+        self.fire_power[a2] = 0
+
+        self._move_bullets(active)
+        self.gun_heat[a2] = np.maximum(self.gun_heat[a2] - GUN_COOLING_RATE, 0)
+
+        # Body and gun turn independently (setAdjustGunForRobotTurn), the agent's radar spins continuously
+        rate = MAX_TURN_RATE - 0.75 * np.abs(self.velocity)
+        turn = np.where(a2, np.clip(self.turn_remaining, -rate, rate), 0)
+        self.heading = (self.heading + turn) % 360
+        self.turn_remaining -= turn
+        gun_turn = np.where(a2, np.clip(self.gun_turn_remaining, -GUN_TURN_RATE, GUN_TURN_RATE), 0)
+        self.gun_heading = (self.gun_heading + gun_turn) % 360
+        self.gun_turn_remaining -= gun_turn
+        previous_radar = self.radar_heading[:, AGENT].copy()
+        self.radar_heading[active, AGENT] = (previous_radar[active] + RADAR_TURN_RATE) % 360
+        self.radar_turn_remaining[active, AGENT] = 360 - RADAR_TURN_RATE
+        self.radar_heading[:, OPPONENT] = self.gun_heading[:, OPPONENT]
+
+        # Accelerate by 1, brake by 2, never faster than still allows stopping on the remaining distance
+        distance = self.distance_remaining
+        target = np.sign(distance) * np.minimum(MAX_VELOCITY,
+                                                np.minimum(np.abs(distance), np.sqrt(1 + 4 * np.abs(distance)) - 1))
+        change = target - self.velocity
+        accelerating = (self.velocity * target >= 0) & (np.abs(target) > np.abs(self.velocity))
+        velocity = self.velocity + np.where(accelerating, np.clip(change, -ACCELERATION, ACCELERATION),
+                                            np.clip(change, -DECELERATION, DECELERATION))
+        self.velocity = np.where(a2, velocity, self.velocity)
+        previous_x, previous_y = self.x.copy(), self.y.copy()
+        radians = np.radians(self.heading)
+        self.x += np.where(a2, self.velocity * np.sin(radians), 0)
+        self.y += np.where(a2, self.velocity * np.cos(radians), 0)
+        self.distance_remaining = np.where(a2, distance - self.velocity, distance)
+        self.distance_remaining[np.abs(self.distance_remaining) < 1e-9] = 0
+
+        self._collide_walls(a2)
+        self._collide_robots(active, previous_x, previous_y)
+        self._scan(active, previous_radar)
+
+        self.time[active] += 1
+        self._finish_rounds(active)
+
+    def _opponent_commands(self, active: np.ndarray) -> None:
+        config = self.config
+        idle = active & (self.distance_remaining[:, OPPONENT] == 0) & (self.turn_remaining[:, OPPONENT] == 0)
+        count = int(idle.sum())
+        if count:
+            self.distance_remaining[idle, OPPONENT] = self.rng.choice((-1, 1), count) * self.rng.uniform(40, 200, count)
+            self.turn_remaining[idle, OPPONENT] = self.rng.uniform(-90, 90, count)
+
+        dx = self.x[:, AGENT] - self.x[:, OPPONENT]
+        dy = self.y[:, AGENT] - self.y[:, OPPONENT]
+        aim = absolute_angle(dx, dy) + self.rng.normal(0, config.opponent_aim_error, self.n)
+        gun_turn = normalize_bearing(aim - self.gun_heading[:, OPPONENT])
+        self.gun_turn_remaining[active, OPPONENT] = gun_turn[active]
+
+        distance = np.hypot(dx, dy)
+        fire = (active & (self.gun_heat[:, OPPONENT] <= 1e-9) & (np.abs(gun_turn) < 10)
+                & (self.rng.random(self.n) < config.opponent_fire_rate))
+        self.fire_power[fire, OPPONENT] = np.where(distance[fire] < 200, 3.0, np.where(distance[fire] < 500, 2.0, 1.0))
+
+    def _spawn_bullets(self, arenas: np.ndarray, owner: int) -> None:
+        slots = np.argmin(self.bullet_active[arenas], axis=1)
+        free = ~self.bullet_active[arenas, slots]
+        arenas, slots = arenas[free], slots[free]
+        power = self.fire_power[arenas, owner]
+        self.bullet_active[arenas, slots] = True
+        self.bullet_owner[arenas, slots] = owner
+        self.bullet_x[arenas, slots] = self.x[arenas, owner]
+        self.bullet_y[arenas, slots] = self.y[arenas, owner]
+        self.bullet_heading[arenas, slots] = self.gun_heading[arenas, owner]
+        self.bullet_power[arenas, slots] = power
+        self.energy[arenas, owner] -= power
+        self.gun_heat[arenas, owner] = 1 + power / 5
+
+    def _move_bullets(self, active: np.ndarray) -> None:
+        config = self.config
+        moving = self.bullet_active & active[:, None]
+        if not moving.any():
+            return
+        radians = np.radians(self.bullet_heading)
+        speed = bullet_speed(self.bullet_power)
+        self.bullet_x += np.where(moving, speed * np.sin(radians), 0)
+        self.bullet_y += np.where(moving, speed * np.cos(radians), 0)
+
+        by_agent = self.bullet_owner == AGENT
+        victim_x = np.where(by_agent, self.x[:, OPPONENT, None], self.x[:, AGENT, None])
+        victim_y = np.where(by_agent, self.y[:, OPPONENT, None], self.y[:, AGENT, None])
+        victim_alive = np.where(by_agent, self.energy[:, OPPONENT, None], self.energy[:, AGENT, None]) > 0
+        hit = (moving & victim_alive & (np.abs(self.bullet_x - victim_x) <= ROBOT_HALF_SIZE)
+               & (np.abs(self.bullet_y - victim_y) <= ROBOT_HALF_SIZE))
+        missed = moving & ~hit & ((self.bullet_x < 0) | (self.bullet_x > config.width)
+                                  | (self.bullet_y < 0) | (self.bullet_y > config.height))
+
+        arenas, slots = np.nonzero(hit)
+        if arenas.size:
+            owners = self.bullet_owner[arenas, slots]
+            power = self.bullet_power[arenas, slots]
+            np.subtract.at(self.energy, (arenas, 1 - owners), bullet_damage(power))
+            np.add.at(self.energy, (arenas, owners), 3 * power)
+            by_agent = owners == AGENT
+            self._record_bullet_event(BULLET_HIT, arenas[by_agent], slots[by_agent],
+                                      energy=np.maximum(self.energy[arenas[by_agent], OPPONENT], 0))
+            by_opponent = ~by_agent
+            bearing = normalize_bearing(self.bullet_heading[arenas[by_opponent], slots[by_opponent]] + 180
+                                        - self.heading[arenas[by_opponent], AGENT])
+            self._record_bullet_event(HIT_BY_BULLET, arenas[by_opponent], slots[by_opponent], bearing=bearing)
+
+        arenas, slots = np.nonzero(missed & (self.bullet_owner == AGENT))
+        self._record_bullet_event(BULLET_MISSED, arenas, slots)
+        self.bullet_active[hit | missed] = False
+
+    def _collide_walls(self, a2: np.ndarray) -> None:
+        config = self.config
+        low, high_x, high_y = ROBOT_HALF_SIZE, config.width - ROBOT_HALF_SIZE, config.height - ROBOT_HALF_SIZE
+        hit = a2 & ((self.x < low) | (self.x > high_x) | (self.y < low) | (self.y > high_y))
+        if not hit.any():
+            return
+        wall_angle = np.select([self.x < low, self.x > high_x, self.y < low], [270.0, 90.0, 180.0], default=0.0)
+        self.x = np.clip(self.x, low, high_x)
+        self.y = np.clip(self.y, low, high_y)
+        self.energy[hit] -= np.maximum(np.abs(self.velocity[hit]) / 2 - 1, 0)
+        self.velocity[hit] = 0
+        self.distance_remaining[hit] = 0
+        arenas = np.flatnonzero(hit[:, AGENT])
+        if arenas.size:
+            self._record(HIT_WALL, arenas, bearing=normalize_bearing(wall_angle[arenas, AGENT] - self.heading[arenas, AGENT]))
+
+    def _collide_robots(self, active: np.ndarray, previous_x: np.ndarray, previous_y: np.ndarray) -> None:
+        dx = self.x[:, OPPONENT] - self.x[:, AGENT]
+        dy = self.y[:, OPPONENT] - self.y[:, AGENT]
+        overlap = (active & (self.energy > 0).all(axis=1)
+                   & (np.abs(dx) < 2 * ROBOT_HALF_SIZE) & (np.abs(dy) < 2 * ROBOT_HALF_SIZE))
+        if not overlap.any():
+            return
+        angle = np.stack([absolute_angle(dx, dy), absolute_angle(-dx, -dy)], axis=1)
+        # A robot is at fault when it was driving towards the other one; only it is pushed back and stopped
+        at_fault = overlap[:, None] & (self.velocity * np.cos(np.radians(angle - self.heading)) > 0)
+        self.x = np.where(at_fault, previous_x, self.x)
+        self.y = np.where(at_fault, previous_y, self.y)
+        self.velocity[at_fault] = 0
+        self.distance_remaining[at_fault] = 0
+        self.energy[overlap] -= ROBOT_HIT_DAMAGE
+        arenas = np.flatnonzero(overlap)
+        self._record(HIT_ROBOT, arenas, bearing=normalize_bearing(angle[arenas, AGENT] - self.heading[arenas, AGENT]),
+                     energy=np.maximum(self.energy[arenas, OPPONENT], 0), at_fault=at_fault[arenas, AGENT])
+
+    def _scan(self, active: np.ndarray, previous_radar: np.ndarray) -> None:
+        dx = self.x[:, OPPONENT] - self.x[:, AGENT]
+        dy = self.y[:, OPPONENT] - self.y[:, AGENT]
+        angle = absolute_angle(dx, dy)
+        distance = np.hypot(dx, dy)
+        swept = (angle - previous_radar) % 360 <= RADAR_TURN_RATE
+        scanned = active & swept & (distance <= RADAR_RANGE) & (self.energy > 0).all(axis=1)
+        if not scanned.any():
+            return
+        self.scanned |= scanned
+        # RobocodeEnv.ENEMY_FIELDS: x, y, velocity, heading, bearing, distance, energy
+        self.scan[scanned] = np.stack([
+            np.zeros(self.n), np.zeros(self.n), self.velocity[:, OPPONENT], self.heading[:, OPPONENT],
+            normalize_bearing(angle - self.heading[:, AGENT]), distance, self.energy[:, OPPONENT],
+        ], axis=1)[scanned]
+
+    def _finish_rounds(self, active: np.ndarray) -> None:
+        dead = self.energy <= 0
+        finished = active & (dead.any(axis=1) | (self.time >= self.config.max_turns))
+        if not finished.any():
+            return
+        self.energy = np.maximum(self.energy, 0)
+        opponent_died = finished & dead[:, OPPONENT]
+        if opponent_died.any():
+            self._record(ROBOT_DEATH, np.flatnonzero(opponent_died))
+        # The agent's own death wins over a simultaneous kill, as onDeath fires before onWin would
+        self.result[finished] = np.select([dead[finished, AGENT], dead[finished, OPPONENT]],
+                                          [robot.RoundResultReason.LOSS, robot.RoundResultReason.WIN],
+                                          default=robot.RoundResultReason.UNKNOWN)
+        self.done |= finished
+
+    def _record(self, kind: int, arenas: np.ndarray, **fields: np.ndarray) -> None:
+        if arenas.size:
+            self.events.append((kind, arenas, fields))
+
+    def _record_bullet_event(self, kind: int, arenas: np.ndarray, slots: np.ndarray, **fields: np.ndarray) -> None:
+        self._record(kind, arenas, heading=self.bullet_heading[arenas, slots], x=self.bullet_x[arenas, slots],
+                     y=self.bullet_y[arenas, slots], power=self.bullet_power[arenas, slots], **fields)
+
+    def robot_columns(self) -> np.ndarray:
+        """The agent's state in RobocodeEnv.ROBOT_FIELDS order."""
+        n = self.n
+        return np.stack([
+            self.x[:, AGENT], self.y[:, AGENT], self.velocity[:, AGENT], self.heading[:, AGENT],
+            self.gun_heading[:, AGENT], self.radar_heading[:, AGENT], self.gun_heat[:, AGENT],
+            self.gun_turn_remaining[:, AGENT], self.radar_turn_remaining[:, AGENT], self.energy[:, AGENT],
+            np.full(n, self.config.width), np.full(n, self.config.height),
+        ], axis=1)
+
+    def reward_event_columns(self) -> np.ndarray:
+        """Events since the last state summed per arena, as the event columns of reward_engine's inputs."""
+        sums = np.zeros((self.n, EVENT_COLUMNS.stop - EVENT_COLUMNS.start))
+        for kind, arenas, fields in self.events:
+            if kind == HIT_BY_BULLET:
+                np.add.at(sums[:, REWARD_EVENT_COLUMN['hit_by_bullet_power']], arenas, fields['power'])
+            elif kind == BULLET_HIT:
+                np.add.at(sums[:, REWARD_EVENT_COLUMN['bullet_hit_power']], arenas, fields['power'])
+            elif kind == BULLET_MISSED:
+                np.add.at(sums[:, REWARD_EVENT_COLUMN['bullet_missed_power']], arenas, fields['power'])
+            elif kind == HIT_WALL:
+                np.add.at(sums[:, REWARD_EVENT_COLUMN['wall_hits']], arenas, 1)
+            elif kind == HIT_ROBOT:
+                np.add.at(sums[:, REWARD_EVENT_COLUMN['collisions']], arenas, 1)
+                np.add.at(sums[:, REWARD_EVENT_COLUMN['collisions_at_fault']], arenas, fields['at_fault'])
+        return sums
+
+    def game_states(self, indices: Optional[np.ndarray] = None) -> List[RobocodeGameState]:
+        """The current state of every arena (or of the given ones) as the servicer would build it from SendState."""
+        indices = np.arange(self.n) if indices is None else indices
+        states = []
+        for row, scan, scanned, round_num, time in zip(self.robot_columns()[indices].tolist(), self.scan[indices].tolist(),
+                                                       self.scanned[indices].tolist(), self.round_num[indices].tolist(),
+                                                       self.time[indices].tolist()):
+            robot_state = robot.RobotState(**dict(zip(RobocodeEnv.ROBOT_FIELDS, row)), round_num=round_num, time=time)
+            enemy = robot.ScannedRobotEvent(**dict(zip(RobocodeEnv.ENEMY_FIELDS, scan)), time=time) if scanned else None
+            states.append(RobocodeGameState(robot_state=robot_state, enemy=enemy, events=[]))
+        return states
+
+    def event_messages(self) -> List[List[object]]:
+        """Events since the last state as the robot.* messages OnEvent would deliver, one list per arena."""
+        messages: List[List[object]] = [[] for _ in range(self.n)]
+        for kind, arenas, fields in self.events:
+            columns = {name: values.tolist() for name, values in fields.items()}
+            for k, arena in enumerate(arenas.tolist()):
+                messages[arena].append(self._event_message(kind, {name: values[k] for name, values in columns.items()}))
+        return messages
+
+    @staticmethod
+    def _event_message(kind: int, fields: Dict) -> object:
+        if kind == BULLET_HIT:
+            return robot.BulletHitEvent(name=OPPONENT_NAME, energy=fields['energy'],
+                                        bullet=_bullet(fields, AGENT_NAME, OPPONENT_NAME))
+        if kind == BULLET_MISSED:
+            return robot.BulletMissedEvent(bullet=_bullet(fields, AGENT_NAME, ''))
+        if kind == HIT_BY_BULLET:
+            return robot.HitByBulletEvent(bearing=fields['bearing'], bullet=_bullet(fields, OPPONENT_NAME, AGENT_NAME))
+        if kind == HIT_WALL:
+            return robot.HitWallEvent(bearing=fields['bearing'])
+        if kind == HIT_ROBOT:
+            return robot.HitRobotEvent(robot_name=OPPONENT_NAME, bearing=fields['bearing'], energy=fields['energy'],
+                                       at_fault=fields['at_fault'])
+        return robot.RobotDeathEvent(robot_name=OPPONENT_NAME)
+
+
+def _bullet(fields: Dict, owner: str, victim: str) -> robot.Bullet:
+    return robot.Bullet(heading_radians=float(np.radians(fields['heading'])), x=fields['x'], y=fields['y'],
+                        power=fields['power'], owner_name=owner, victim_name=victim, is_active=False)
+
+
+class Simulator:
+    """
+    One simulated battle behind the same objects the servicer builds from gRPC messages.
+
+    reset() returns the first state of a new round; step(action) returns the next state, the events that
+    happened while the action played out (they belong on the previous state's events, as OnEvent puts
+    them), whether the round ended and the RoundResultReason NeuralRobot would report.
+    """
+
+    def __init__(self, env: RobocodeEnv, config: Optional[ArenaConfig] = None, seed: Optional[int] = None):
+        self.arena = VectorArena(1, env.action_map, config=config, seed=seed)
+
+    def reset(self) -> RobocodeGameState:
+        self.arena.reset()
+        return self.arena.game_states()[0]
+
+    def step(self, action: int, repeat: int = 0) -> Tuple[RobocodeGameState, List[object], bool, robot.RoundResultReason]:
+        done = bool(self.arena.step(np.array([action]), repeat=repeat)[0])
+        events = self.arena.event_messages()[0]
+        return self.arena.game_states()[0], events, done, robot.RoundResultReason(int(self.arena.result[0]))
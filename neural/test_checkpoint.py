@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from checkpoint import CheckpointManager
+from dqn_agent import DQNAgent
+from inference import NumpyPolicy
+from robocode_env import RobocodeEnv
+
+
+def state(step: int) -> dict:
+    return {'step': step, 'weights': torch.full((2,), float(step))}
+
+
+def test_keeps_last_n_history_files(tmp_path):
+    manager = CheckpointManager(str(tmp_path / 'dqn_model.pth'), keep_last=2)
+    for step in (1, 2, 3, 4):
+        manager.write(state(step), step)
+    assert [os.path.basename(p) for p in manager.history()] == ['dqn-000000003.pth', 'dqn-000000004.pth']
+    assert manager.load_latest()['step'] == 4
+
+
+def test_keep_last_zero_keeps_no_history(tmp_path):
+    manager = CheckpointManager(str(tmp_path / 'dqn_model.pth'), keep_last=0)
+    for step in (1, 2):
+        manager.write(state(step), step)
+    assert manager.history() == []
+    assert manager.load_latest()['step'] == 2
+
+
+def test_negative_keep_last_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        CheckpointManager(str(tmp_path / 'dqn_model.pth'), keep_last=-1)
+
+
+def test_falls_back_through_history_when_newest_is_unreadable(tmp_path):
+    model_path = tmp_path / 'dqn_model.pth'
+    manager = CheckpointManager(str(model_path), keep_last=3)
+    for step in (1, 2, 3):
+        manager.write(state(step), step)
+    model_path.write_bytes(b'truncated')
+    with open(manager.history()[-1], 'wb') as f:
+        f.write(b'also truncated')
+    assert manager.load_latest()['step'] == 2
+
+
+def test_restarted_step_count_keeps_the_newest_checkpoints(tmp_path):
+    model_path = tmp_path / 'dqn_model.pth'
+    manager = CheckpointManager(str(model_path), keep_last=2)
+    for step in (5, 6, 7):
+        manager.write(state(step), step)
+    # A fresh run counts from 1 again while the previous run's files are still there
+    manager.write(state(1), 1)
+    assert [os.path.basename(p) for p in manager.history()] == ['dqn-000000007.pth', 'dqn-000000001.pth']
+    model_path.write_bytes(b'truncated')
+    assert manager.load_latest()['step'] == 1
+
+
+def test_async_save_is_written_by_close(tmp_path):
+    manager = CheckpointManager(str(tmp_path / 'dqn_model.pth'))
+    assert manager.save_async(state(7), 7)
+    manager.close()
+    assert manager.load_latest()['step'] == 7
+
+
+def test_agent_resumes_training_state(tmp_path):
+    model_path = str(tmp_path / 'dqn_model.pth')
+    env = RobocodeEnv()
+    agent = DQNAgent(17, len(RobocodeEnv.ActionType), env, metrics=None, model_path=model_path)
+    with torch.no_grad():
+        agent.model.fc1.weight.add_(1.0)
+    agent.epsilon, agent.train_step, agent.episodes = 0.25, 42, 3
+    agent.close()
+
+    resumed = DQNAgent(17, len(RobocodeEnv.ActionType), env, metrics=None, model_path=model_path)
+    assert (resumed.epsilon, resumed.train_step, resumed.episodes) == (0.25, 42, 3)
+    assert torch.equal(resumed.model.fc1.weight, agent.model.fc1.weight)
+    # The act() snapshot is rebuilt from the restored weights
+    states = np.random.default_rng(0).random((8, 17), dtype=np.float32)
+    assert np.array_equal(resumed.policy.q_values(states), NumpyPolicy.from_model(agent.model).q_values(states))
+    resumed.close()
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+import torch
+
+from dqn_agent import DQN, DQNAgent
+from inference import NumpyPolicy, QuantizedPolicy, agreement
+from robocode_env import RobocodeEnv
+
+STATE_SIZE = 17
+ACTION_SIZE = len(RobocodeEnv.ActionType)
+
+
+class RecordedMetrics:
+    def __init__(self):
+        self.values = {}
+
+    def record(self, name, value, count=1):
+        self.values.setdefault(name, []).append(value)
+
+
+def random_states(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-1, 1, size=(count, STATE_SIZE)).astype(np.float32)
+
+
+def test_numpy_policy_matches_torch_model():
+    torch.manual_seed(0)
+    model = DQN(STATE_SIZE, ACTION_SIZE).eval()
+    states = random_states(256)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(states)).numpy()
+    policy = NumpyPolicy.from_model(model)
+    assert np.allclose(policy.q_values(states), expected, atol=1e-5)
+    assert np.array_equal(policy.act_batch(states), expected.argmax(axis=1))
+
+
+def test_policy_bytes_round_trip_exactly():
+    torch.manual_seed(1)
+    policy = NumpyPolicy.from_model(DQN(STATE_SIZE, ACTION_SIZE), version=7)
+    copy = NumpyPolicy.from_bytes(policy.layer_sizes, policy.to_bytes(), version=policy.version)
+    assert copy.version == 7
+    for (weight, bias), (copy_weight, copy_bias) in zip(policy.layers, copy.layers):
+        assert np.array_equal(weight, copy_weight) and np.array_equal(bias, copy_bias)
+    with pytest.raises(ValueError):
+        NumpyPolicy.from_bytes(policy.layer_sizes, policy.to_bytes()[:-4])
+
+
+def test_quantized_policies_mostly_agree_with_fp32():
+    torch.manual_seed(2)
+    model = DQN(STATE_SIZE, ACTION_SIZE)
+    reference = NumpyPolicy.from_model(model)
+    states = random_states(1024)
+    for precision in ('fp16', 'int8'):
+        assert agreement(QuantizedPolicy.from_model(model, precision), reference, states) > 0.9
+    with pytest.raises(ValueError):
+        QuantizedPolicy.from_model(model, 'int4')
+
+
+@pytest.mark.parametrize('min_policy_agreement, quantized', [(0.0, True), (1.01, False)])
+def test_agent_serves_quantized_policy_only_while_it_agrees(tmp_path, min_policy_agreement, quantized):
+    metrics = RecordedMetrics()
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, RobocodeEnv(), metrics, model_path=str(tmp_path / 'dqn_model.pth'),
+                     policy_precision='int8', min_policy_agreement=min_policy_agreement, agreement_sample_size=64)
+    # Too few stored states to check a copy against: stay on fp32
+    assert agent.act_policy is agent.policy
+
+    states = random_states(64)
+    agent.memory.add_batch(states, np.zeros(64, dtype=np.int64), np.zeros(64, dtype=np.float32), states,
+                           np.zeros(64, dtype=bool))
+    agent.publish_policy()
+    assert isinstance(agent.act_policy, QuantizedPolicy) == quantized
+    assert agent.act_policy.version == agent.policy.version
+    assert len(metrics.values['Policy/QuantizedAgreement']) == 1
+    agent.close()
+
+
+def test_precision_switches_are_logged_once_each(tmp_path, caplog):
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, RobocodeEnv(), RecordedMetrics(), model_path=str(tmp_path / 'dqn_model.pth'),
+                     policy_precision='int8', min_policy_agreement=0.0, agreement_sample_size=64)
+    states = random_states(64)
+    agent.memory.add_batch(states, np.zeros(64, dtype=np.int64), np.zeros(64, dtype=np.float32), states,
+                           np.zeros(64, dtype=bool))
+
+    def switches():
+        messages = [record.getMessage() for record in caplog.records if record.name == 'dqn_agent']
+        return [m.split(' policy')[0] for m in messages if m.startswith(('Serving', 'Falling back'))]
+
+    with caplog.at_level('INFO', logger='dqn_agent'):
+        for _ in range(3):
+            agent.publish_policy()
+        agent.min_policy_agreement = 1.01
+        for _ in range(3):
+            agent.publish_policy()
+    assert switches() == ['Serving int8', 'Falling back to fp32 from int8']
+    agent.close()
+
+
+def test_fp32_agent_never_builds_a_reduced_copy(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("QuantizedPolicy built for an fp32 agent")
+    monkeypatch.setattr(QuantizedPolicy, 'from_model', fail)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, RobocodeEnv(), RecordedMetrics(), model_path=str(tmp_path / 'dqn_model.pth'),
+                     agreement_sample_size=64)
+    states = random_states(64)
+    agent.memory.add_batch(states, np.zeros(64, dtype=np.int64), np.zeros(64, dtype=np.float32), states,
+                           np.zeros(64, dtype=bool))
+    agent.publish_policy()
+    assert agent.act_policy is agent.policy
+    agent.close()
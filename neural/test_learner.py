@@ -0,0 +1,21 @@
+from learner import BackgroundLearner
+
+
+class CountedMetrics:
+    def __init__(self):
+        self.sums = {}
+
+    def increment(self, name, amount=1):
+        self.sums[name] = self.sums.get(name, 0) + amount
+
+
+def test_updates_beyond_the_pending_cap_are_reported():
+    metrics = CountedMetrics()
+    # Never started, so nothing drains the pending updates
+    learner = BackgroundLearner(agent=None, max_pending_updates=8, metrics=metrics)
+    learner.request_updates(5)
+    assert metrics.sums == {}
+    learner.request_updates(5)
+    learner.request_updates(3)
+    assert (learner.pending_updates, learner.dropped_updates) == (8, 5)
+    assert metrics.sums == {'Learner/DroppedUpdates': 5}
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from main import RobotServiceServicer
+from session import Session
+
+
+@pytest.fixture
+def servicer(tmp_path, monkeypatch):
+    # The agent saves its model and checkpoints next to the working directory
+    monkeypatch.chdir(tmp_path)
+    servicer = RobotServiceServicer(background_learning=False, latency_snapshot_path=None, instrument=False,
+                                    eval_refresh_idle=30.0)
+    yield servicer
+    servicer.close()
+
+
+def test_evaluation_policy_stays_frozen_until_refreshed(servicer):
+    frozen = servicer.evaluation_policy()
+    servicer.agent.publish_policy()
+    assert servicer.evaluation_policy() is frozen
+
+    assert servicer.refresh_evaluation_policy() is servicer.agent.policy
+    assert servicer.evaluation_policy() is servicer.agent.policy
+
+
+def test_evaluation_policy_refreshes_after_idle_gap(servicer, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('main.time.monotonic', lambda: clock[0])
+    frozen = servicer.evaluation_policy()
+    servicer.agent.publish_policy()
+
+    clock[0] += 29
+    assert servicer.evaluation_policy() is frozen
+    clock[0] += 31
+    assert servicer.evaluation_policy() is servicer.agent.policy
+
+    servicer.eval_refresh_idle = None
+    servicer.agent.publish_policy()
+    clock[0] += 10_000
+    assert servicer.evaluation_policy() is not servicer.agent.policy
+
+
+def test_only_training_sessions_turn_on_batching(servicer, monkeypatch):
+    batched = []
+    monkeypatch.setattr(servicer.agent, 'act', lambda state: 0)
+
+    async def batcher_act(state):
+        batched.append(state)
+        return 0
+    monkeypatch.setattr(servicer.batcher, 'act', batcher_act)
+
+    servicer.sessions = {'train': Session('train'), 'eval': Session('eval', evaluation=True)}
+    asyncio.run(servicer.choose_action(None))
+    assert batched == []
+
+    servicer.sessions['train-2'] = Session('train-2')
+    asyncio.run(servicer.choose_action(None))
+    assert len(batched) == 1
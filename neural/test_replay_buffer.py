@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer, SumTree
+
+STATE_SIZE = 4
+
+
+def fill(buffer: ReplayBuffer, count: int, start: int = 0) -> None:
+    for i in range(start, start + count):
+        buffer.add(np.full(STATE_SIZE, i, dtype=np.float32), i % 3, float(i), np.full(STATE_SIZE, -i, dtype=np.float32),
+                   i % 5 == 0)
+
+
+def test_memmap_buffer_resumes_after_reopen(tmp_path):
+    path = str(tmp_path / 'replay')
+    buffer = ReplayBuffer(50, STATE_SIZE, path=path)
+    fill(buffer, 30)
+    buffer.close()
+
+    reopened = ReplayBuffer(50, STATE_SIZE, path=path)
+    assert (len(reopened), reopened.position) == (30, 30)
+    assert np.array_equal(reopened.states[:30, 0], np.arange(30, dtype=np.float32))
+    assert np.array_equal(reopened.rewards[:30], np.arange(30, dtype=np.float32))
+    assert np.array_equal(reopened.dones[:30], (np.arange(30) % 5 == 0).astype(np.float32))
+    fill(reopened, 1, start=30)
+    assert reopened.states[30, 0] == 30
+    reopened.close()
+
+
+def test_memmap_buffer_resumes_wrapped_ring(tmp_path):
+    path = str(tmp_path / 'replay')
+    buffer = ReplayBuffer(8, STATE_SIZE, path=path)
+    fill(buffer, 12)
+    buffer.close()
+
+    reopened = ReplayBuffer(8, STATE_SIZE, path=path)
+    assert (len(reopened), reopened.position) == (8, 4)
+    # Slots 0..3 were overwritten by transitions 8..11
+    assert np.array_equal(reopened.states[:, 0], np.array([8, 9, 10, 11, 4, 5, 6, 7], dtype=np.float32))
+
+
+def test_changed_capacity_starts_fresh(tmp_path):
+    path = str(tmp_path / 'replay')
+    buffer = ReplayBuffer(16, STATE_SIZE, path=path)
+    fill(buffer, 10)
+    buffer.close()
+
+    assert len(ReplayBuffer(32, STATE_SIZE, path=path)) == 0
+
+
+def test_missing_optional_column_is_recreated_without_losing_transitions(tmp_path):
+    path = str(tmp_path / 'replay')
+    buffer = ReplayBuffer(16, STATE_SIZE, path=path)
+    fill(buffer, 10)
+    buffer.close()
+    assert not os.path.exists(os.path.join(path, 'reward_inputs.npy'))
+
+    reopened = ReplayBuffer(16, STATE_SIZE, path=path, reward_input_size=3)
+    assert len(reopened) == 10
+    assert np.array_equal(reopened.rewards[:10], np.arange(10, dtype=np.float32))
+    assert np.isnan(reopened.reward_inputs).all()
+
+
+def test_sum_tree_matches_cumulative_sums():
+    rng = np.random.default_rng(0)
+    tree = SumTree(37)  # not a power of two, so some leaves are padding
+    priorities = np.zeros(37)
+    for _ in range(20):
+        # Whole numbers keep every partial sum exact, whatever order the tree adds them in
+        indices = rng.integers(0, 37, size=rng.integers(1, 10))
+        values = rng.integers(0, 5, size=len(indices)).astype(np.float64)
+        tree.update(indices, values)
+        priorities[indices] = values  # last write wins for repeated indices, as in the tree
+
+        cumulative = np.cumsum(priorities)
+        assert tree.total() == cumulative[-1]
+        assert np.array_equal(tree.get(np.arange(37)), priorities)
+        if cumulative[-1] > 0:
+            samples = rng.uniform(0, cumulative[-1], size=200)
+            assert np.array_equal(tree.find(samples), np.searchsorted(cumulative, samples))
+
+
+def test_prioritized_sampling_follows_priorities():
+    np.random.seed(0)
+    buffer = PrioritizedReplayBuffer(4, STATE_SIZE, alpha=1.0, beta_start=1.0, epsilon=0.0)
+    fill(buffer, 4)
+    buffer.update_priorities(np.arange(4), np.array([1.0, 2.0, 3.0, -4.0]))
+
+    counts = np.zeros(4)
+    for _ in range(2000):
+        *_, indices, weights = buffer.sample(10)
+        counts += np.bincount(indices, minlength=4)
+        # With beta=1 the importance weights are inverse to priority, scaled so the rarest sample gets 1
+        assert np.allclose(weights, (indices.min() + 1) / (indices + 1))
+    assert np.allclose(counts / counts.sum(), [0.1, 0.2, 0.3, 0.4], atol=0.01)
+
+
+def test_new_transitions_get_the_highest_priority_seen():
+    buffer = PrioritizedReplayBuffer(8, STATE_SIZE, alpha=1.0, epsilon=0.0)
+    fill(buffer, 2)
+    buffer.update_priorities(np.array([0, 1]), np.array([5.0, 0.5]))
+    fill(buffer, 1, start=2)
+    assert np.array_equal(buffer.tree.get(np.arange(3)), [5.0, 0.5, 5.0])
+    assert buffer.tree.total() == 10.5
+
+
+def test_uniform_sampling_never_repeats_a_transition_in_a_batch():
+    buffer = ReplayBuffer(64, STATE_SIZE)
+    fill(buffer, 10)
+    for _ in range(50):
+        states, *_, indices, _ = buffer.sample(10)
+        assert sorted(indices.tolist()) == list(range(10))
+        assert np.array_equal(states[:, 0], indices.astype(np.float32))
+    assert len(np.unique(buffer.sample_states(10)[:, 0])) == 10
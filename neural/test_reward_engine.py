@@ -0,0 +1,125 @@
+import math
+import random
+
+import numpy as np
+
+import robot
+from reward_engine import REWARD_INPUT_FIELDS
+from robocode_env import RobocodeEnv, RobocodeGameState
+
+
+def baseline_reward(env: RobocodeEnv, previous_state: RobocodeGameState, action: int,
+                    current_state: RobocodeGameState) -> float:
+    """The scalar calculate_reward as it was before RewardEngine, without its logging."""
+    def gun_bearing(robot_state, enemy_state):
+        if enemy_state and enemy_state.bearing != env.MISSING_BEARING:
+            absolute_bearing = (robot_state.heading + enemy_state.bearing) % 360
+            return ((absolute_bearing - robot_state.gun_heading + 180) % 360) - 180
+        return None
+
+    total = -env.STEP_PENALTY
+    previous_gun_bearing = gun_bearing(previous_state.robot_state, previous_state.enemy)
+    current_gun_bearing = gun_bearing(current_state.robot_state, current_state.enemy)
+    enemy = current_state.enemy
+    if previous_gun_bearing is not None and current_gun_bearing is not None and enemy is not None:
+        last_error, error = abs(previous_gun_bearing), abs(current_gun_bearing)
+        tolerance = math.degrees(math.atan2(env.ROBOT_SIZE / 2, enemy.distance))
+        improvement = last_error - error
+        if improvement > 0:
+            total += improvement * env.GUN_TURN_IMPROVEMENT_SCALE
+        elif improvement < 0:
+            total += improvement * env.GUN_TURN_PENALTY_SCALE
+        elif error <= tolerance:
+            total += env.ACCURACY_REWARD_SCALE
+        else:
+            total += -env.GUN_TURN_PENALTY_SCALE * 5
+        if error <= tolerance:
+            total += (tolerance - error) * env.ACCURACY_REWARD_SCALE
+        action_type = env.ActionType(action)
+        if action_type.is_fire_action():
+            if error <= tolerance:
+                total += env.FIRING_ACCURACY_REWARD
+                total += env.FIRING_POWER_REWARD_SCALE * env.FIRING_REWARD_SCALE[action_type]
+            else:
+                total += env.FIRING_PENALTY
+
+    for event in previous_state.events:
+        if isinstance(event, robot.HitByBulletEvent):
+            total -= env.DAMAGE_TAKEN_SCALE * event.bullet.power
+        elif isinstance(event, robot.BulletHitEvent):
+            total += env.DAMAGE_DEALT_SCALE * event.bullet.power
+        elif isinstance(event, robot.HitWallEvent):
+            total -= env.WALL_HIT_PENALTY
+        elif isinstance(event, robot.BulletMissedEvent):
+            total -= env.BULLET_MISS_PENALTY * event.bullet.power
+        elif isinstance(event, robot.HitRobotEvent):
+            total -= env.COLLISION_PENALTY * (2 if event.at_fault else 1)
+    return total
+
+
+def random_enemy(rng: random.Random, aim_at: float):
+    kind = rng.random()
+    if kind < 0.15:
+        return None
+    if kind < 0.3:
+        return robot.ScannedRobotEvent()  # present but all defaults: no bearing for the reward
+    bearing = RobocodeEnv.MISSING_BEARING if kind < 0.4 else aim_at + rng.uniform(-3, 3)
+    return robot.ScannedRobotEvent(velocity=rng.uniform(-8, 8), heading=rng.uniform(0, 360), bearing=bearing,
+                                   distance=rng.uniform(36, 560), energy=rng.uniform(0, 100))
+
+
+def random_events(rng: random.Random) -> list:
+    def bullet():
+        return robot.Bullet(power=rng.uniform(0.1, 3))
+    makers = [lambda: robot.HitByBulletEvent(bullet=bullet()), lambda: robot.BulletHitEvent(bullet=bullet()),
+              robot.HitWallEvent, lambda: robot.BulletMissedEvent(bullet=bullet()),
+              lambda: robot.HitRobotEvent(at_fault=rng.random() < 0.5)]
+    return [rng.choice(makers)() for _ in range(rng.randrange(3))]
+
+
+def random_transition(rng: random.Random):
+    states = []
+    for _ in range(2):
+        heading, gun_heading = rng.uniform(0, 360), rng.uniform(0, 360)
+        robot_state = robot.RobotState(x=rng.uniform(18, 382), y=rng.uniform(18, 382), heading=heading,
+                                       gun_heading=gun_heading, energy=rng.uniform(0, 100),
+                                       battle_field_width=400, battle_field_height=400)
+        # Mostly near the gun, so the on-target and firing branches are exercised too
+        states.append(RobocodeGameState(robot_state=robot_state, enemy=random_enemy(rng, gun_heading - heading),
+                                        events=random_events(rng)))
+    return states[0], rng.randrange(len(RobocodeEnv.ActionType)), states[1]
+
+
+def test_engine_matches_original_scalar_reward():
+    env = RobocodeEnv()
+    rng = random.Random(0)
+    for _ in range(2000):
+        previous_state, action, current_state = random_transition(rng)
+        expected = baseline_reward(env, previous_state, action, current_state)
+        assert abs(env.calculate_reward(previous_state, action, current_state) - expected) <= 1e-9
+
+
+def test_default_enemy_scan_has_no_bearing():
+    env = RobocodeEnv()
+    robot_state = robot.RobotState(x=100, y=100, battle_field_width=400, battle_field_height=400)
+    state = RobocodeGameState(robot_state=robot_state, enemy=robot.ScannedRobotEvent(), events=[])
+    inputs = env.reward_inputs(state, state)
+    bearings = inputs[[REWARD_INPUT_FIELDS.index('previous_enemy_bearing'), REWARD_INPUT_FIELDS.index('enemy_bearing')]]
+    assert (bearings == env.MISSING_BEARING).all()
+    # The observation encoders still see an enemy, as they always have
+    assert env.encode_observation(state)[14] == 0
+
+
+def test_reward_input_columns_match_reward_inputs():
+    env = RobocodeEnv()
+    rng = random.Random(1)
+    transitions = [random_transition(rng) for _ in range(500)]
+    for previous_state, _, current_state in transitions:
+        previous_state.events.clear()
+    expected = np.stack([env.reward_inputs(previous_state, current_state)
+                         for previous_state, _, current_state in transitions])
+    events = np.zeros((len(transitions), 6))
+    round_results = np.full(len(transitions), robot.RoundResultReason.UNKNOWN)
+    inputs = env.reward_input_columns(env.observation_columns([t[0] for t in transitions]),
+                                      env.observation_columns([t[2] for t in transitions]), events, round_results)
+    assert np.array_equal(inputs, expected)
@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+
+import robot
+from bench_act import baseline_process_observation
+from robocode_env import RobocodeEnv, RobocodeGameState
+
+
+def random_states(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    states = []
+    for _ in range(count):
+        # Mostly one battlefield, like real battles, with a few others to cover per-row max distances
+        width, height = (400.0, 400.0) if rng.random() < 0.8 else (rng.choice([600.0, 800.0]), 600.0)
+        robot_state = robot.RobotState(x=rng.uniform(18, width - 18), y=rng.uniform(18, height - 18),
+                                       velocity=rng.uniform(-8, 8), heading=rng.uniform(0, 6.3),
+                                       gun_heading=rng.uniform(0, 6.3), radar_heading=rng.uniform(0, 6.3),
+                                       gun_heat=rng.uniform(0, 1.6), gun_turn_remaining=rng.uniform(-1, 1),
+                                       radar_turn_remaining=rng.uniform(-1, 1), energy=rng.uniform(0, 100),
+                                       battle_field_width=width, battle_field_height=height)
+        kind = rng.random()
+        if kind < 0.2:
+            enemy = None
+        elif kind < 0.3:
+            enemy = robot.ScannedRobotEvent()
+        else:
+            bearing = RobocodeEnv.MISSING_BEARING if kind < 0.4 else rng.uniform(-180, 180)
+            enemy = robot.ScannedRobotEvent(velocity=rng.uniform(-8, 8), heading=rng.uniform(0, 6.3), bearing=bearing,
+                                            distance=rng.uniform(36, 1000), energy=rng.uniform(0, 100))
+        states.append(RobocodeGameState(robot_state=robot_state, enemy=enemy, events=[]))
+    return states
+
+
+def test_batch_encoding_is_bit_identical_to_single_states():
+    env = RobocodeEnv()
+    states = random_states(1000)
+    batch = env.encode_observation_batch(states)
+    assert batch.dtype == np.float32 and batch.shape == (1000, 17)
+    assert np.array_equal(batch, np.stack([env.encode_observation(state) for state in states]))
+    assert env.encode_observation_batch([]).shape == (0, 17)
+
+
+def test_encoding_is_bit_identical_to_the_original_torch_encoder():
+    env = RobocodeEnv()
+    for state in random_states(500, seed=1):
+        assert np.array_equal(env.encode_observation(state), baseline_process_observation(env, state).numpy())
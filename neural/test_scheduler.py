@@ -0,0 +1,39 @@
+from scheduler import ReplayScheduler
+
+
+def run_slots(scheduler: ReplayScheduler, slots: int, update_seconds: float) -> list:
+    counts = []
+    for _ in range(slots):
+        updates = scheduler.due(1, memory_size=10_000)
+        for _ in range(updates):
+            scheduler.record_update(update_seconds)
+        counts.append(updates)
+    return counts
+
+
+def test_no_updates_before_min_memory():
+    scheduler = ReplayScheduler(updates_per_transition=1.0, min_memory=100)
+    assert scheduler.due(10, memory_size=100) == 0
+    assert scheduler.due(10, memory_size=101) == 4
+
+
+def test_ratio_hands_out_whole_updates():
+    scheduler = ReplayScheduler(updates_per_transition=0.25, min_memory=0)
+    assert run_slots(scheduler, 8, 0.001) == [0, 0, 0, 1, 0, 0, 0, 1]
+
+
+def test_latency_budget_caps_updates_per_slot():
+    scheduler = ReplayScheduler(updates_per_transition=4.0, max_updates_per_slot=None, latency_budget=0.005, min_memory=0)
+    scheduler.record_update(0.002)
+    assert scheduler.due(1, memory_size=10_000) == 2
+
+
+def test_update_slower_than_budget_still_trains():
+    scheduler = ReplayScheduler(updates_per_transition=1.0, latency_budget=0.005, min_memory=0)
+    scheduler.record_update(0.006)
+    # One update every ceil(0.006 / 0.005) = 2 slots instead of none ever again
+    assert run_slots(scheduler, 10, 0.006) == [0, 1] * 5
+
+    scheduler = ReplayScheduler(updates_per_transition=1.0, latency_budget=0.005, min_memory=0)
+    scheduler.record_update(0.012)
+    assert run_slots(scheduler, 9, 0.012) == [0, 0, 1] * 3
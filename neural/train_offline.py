@@ -0,0 +1,103 @@
+"""
+Train the DQN from trajectories recorded by a live server (ROBOCODE_RECORD_PATH), without any battle running.
+
+Chunks are decompressed by a reader thread a couple of files ahead while the main thread feeds their
+transitions into the replay buffer in slices and runs ReplayScheduler's share of updates after each
+slice, so the learner never waits on disk. The target network is refreshed every 5 recorded episodes,
+as on the live server, and the result is saved to the model the server loads. With --relabel the
+recorded rewards are recomputed from each transition's reward inputs with RobocodeEnv's current
+constants, so a recording stays usable after the reward shaping changes.
+
+    python train_offline.py --data recordings --epochs 3 --replay-ratio 1.0 --relabel
+"""
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+from torch.utils.tensorboard import SummaryWriter
+
+from dqn_agent import DQNAgent
+from logger_config import get_logger, setup_logger
+from metrics import MetricsAggregator, TensorBoardSink
+from recorder import chunk_paths, iter_chunks
+from reward_engine import RewardEngine
+from robocode_env import RobocodeEnv
+from scheduler import ReplayScheduler
+
+logger = get_logger(__name__)
+
+UPDATE_TARGET_EVERY_N_EPISODES = 5
+
+
+def relabel_chunk(engine: RewardEngine, chunk: Dict[str, np.ndarray]) -> int:
+    """Overwrite chunk['rewards'] wherever reward inputs were recorded; returns how many were rewritten."""
+    if 'reward_inputs' not in chunk:  # recorded before reward inputs were kept
+        return 0
+    rows = np.flatnonzero(~np.isnan(chunk['reward_inputs']).any(axis=1))
+    if rows.size:
+        rewards, _ = engine.rewards(chunk['reward_inputs'][rows], chunk['actions'][rows])
+        chunk['rewards'][rows] = rewards
+    return int(rows.size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help="directory of recording-*.npz chunks")
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--replay-ratio', type=float, default=0.25, help="replay updates per transition")
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--memory-size', type=int, default=50000)
+    parser.add_argument('--slice', type=int, default=256, help="transitions added between rounds of updates")
+    parser.add_argument('--model-path', default='dqn_model.pth')
+    parser.add_argument('--relabel', action='store_true', help="recompute rewards with the current reward constants")
+    args = parser.parse_args()
+
+    paths = chunk_paths(args.data)
+    if not paths:
+        parser.error(f"no recording-*.npz chunks in {args.data}")
+
+    setup_logger('train_offline.log')
+    writer = SummaryWriter('train-logs/offline')
+    metrics = MetricsAggregator(TensorBoardSink(writer))
+    env = RobocodeEnv(metrics=metrics)
+    agent = DQNAgent(state_size=17, action_size=len(RobocodeEnv.ActionType), env=env, metrics=metrics,
+                     model_path=args.model_path, memory_size=args.memory_size)
+    scheduler = ReplayScheduler(updates_per_transition=args.replay_ratio, batch_size=args.batch_size,
+                                max_updates_per_slot=None, metrics=metrics)
+
+    started, transitions, episodes = time.perf_counter(), 0, 0
+    try:
+        for epoch in range(1, args.epochs + 1):
+            for path, chunk in iter_chunks(paths):
+                if args.relabel:
+                    logger.info(f"Relabelled {relabel_chunk(env.reward_engine, chunk)} of "
+                                f"{len(chunk['actions'])} rewards in {path}")
+                reward_inputs = chunk.get('reward_inputs')
+                for start in range(0, len(chunk['actions']), args.slice):
+                    rows = slice(start, start + args.slice)
+                    dones = chunk['dones'][rows]
+                    agent.remember_batch(chunk['states'][rows], chunk['actions'][rows], chunk['rewards'][rows],
+                                         chunk['next_states'][rows], dones,
+                                         reward_inputs[rows] if reward_inputs is not None else None)
+                    transitions += len(dones)
+                    for _ in range(scheduler.due(len(dones), len(agent.memory))):
+                        update_start = time.perf_counter()
+                        agent.replay(scheduler.batch_size)
+                        scheduler.record_update(time.perf_counter() - update_start)
+
+                    finished = int(dones.sum())
+                    if (episodes + finished) // UPDATE_TARGET_EVERY_N_EPISODES > episodes // UPDATE_TARGET_EVERY_N_EPISODES:
+                        agent.update_target_model()
+                    episodes += finished
+                logger.info(f"Epoch {epoch}: trained on {path}. {transitions} transitions, {episodes} episodes, "
+                            f"{transitions / (time.perf_counter() - started):.0f} transitions/s")
+    finally:
+        agent.close()
+        metrics.close()
+        writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Pretrain the DQN against headless simulated battles instead of a live Robocode battle.
+
+--arenas battles run in lock-step in one VectorArena. Every decision picks all their actions with one
+DQNAgent.act_batch forward pass, rewards them with one RewardEngine pass over arena columns and
+writes all their transitions with one remember_batch insert. Per arena the loop replays what
+RobotServiceServicer does for a connected robot: events raised while an action plays out count
+towards the previous transition, a round ends with the win/loss bonus on the last state, and one replay
+runs per four transitions (ReplayScheduler's default ratio) once the buffer holds enough of them. The model is saved to the
+same dqn_model.pth the server loads, so the live path can continue from the pretrained weights.
+
+    python train_sim.py --arenas 256 --episodes 5000
+"""
+import argparse
+import time
+from typing import Tuple
+
+import numpy as np
+from torch.utils.tensorboard import SummaryWriter
+
+import robot
+from dqn_agent import DQNAgent
+from logger_config import get_logger, setup_logger
+from metrics import MetricsAggregator, TensorBoardSink
+from robocode_env import RobocodeEnv
+from scheduler import ReplayScheduler
+from simulator import ArenaConfig, VectorArena
+
+logger = get_logger(__name__)
+
+UPDATE_TARGET_EVERY_N_EPISODES = 5
+
+
+class VectorTrainer:
+    def __init__(self, agent: DQNAgent, env: RobocodeEnv, arena: VectorArena, metrics, scheduler: ReplayScheduler,
+                 action_repeat: int = 0):
+        self.agent = agent
+        self.env = env
+        self.arena = arena
+        self.metrics = metrics
+        self.scheduler = scheduler
+        self.action_repeat = action_repeat
+        self.episodes = 0
+        self.steps = 0
+        self.episode_rewards = np.zeros(arena.n)
+        self.columns = self.observation_columns()
+        self.observations = self.observe(self.columns)
+
+    def observation_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Copies: the arena updates scan and scanned in place
+        return self.arena.robot_columns(), self.arena.scan.copy(), self.arena.scanned.copy()
+
+    def observe(self, columns: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+        return self.env.encode_columns(*columns)
+
+    def step(self) -> None:
+        arena, env = self.arena, self.env
+        actions = self.agent.act_batch(self.observations)
+        done = arena.step(actions, repeat=self.action_repeat)
+        next_columns = self.observation_columns()
+        next_observations = self.observe(next_columns)
+
+        # Terminal transitions point back at the last state, as EndRound remembers them
+        end_columns = tuple(column.copy() for column in next_columns)
+        for end, previous in zip(end_columns, self.columns):
+            end[done] = previous[done]
+        round_results = np.where(done, arena.result, robot.RoundResultReason.UNKNOWN)
+        reward_inputs = env.reward_input_columns(self.columns, end_columns, arena.reward_event_columns(), round_results)
+        rewards = env.rewards_from_inputs(reward_inputs, actions).astype(np.float32)
+        stored_next = np.where(done[:, None], self.observations, next_observations)
+        self.agent.remember_batch(self.observations, actions, rewards, stored_next, done.astype(np.float32),
+                                  reward_inputs)
+        self.episode_rewards += rewards
+        self.steps += arena.n
+
+        if done.any():
+            self.finish_rounds(done)
+            arena.reset(done)
+            next_columns = self.observation_columns()
+            next_observations = self.observe(next_columns)
+        self.columns, self.observations = next_columns, next_observations
+        self.train(arena.n)
+
+    def finish_rounds(self, done: np.ndarray) -> None:
+        for i in np.flatnonzero(done).tolist():
+            self.metrics.record('Episode_Total_Reward', float(self.episode_rewards[i]))
+            self.metrics.record('WinRate', 1 if self.arena.result[i] == robot.RoundResultReason.WIN else 0)
+            self.episode_rewards[i] = 0
+            self.episodes += 1
+            if self.episodes % UPDATE_TARGET_EVERY_N_EPISODES == 0:
+                self.agent.update_target_model()
+
+    def train(self, transitions: int) -> None:
+        for _ in range(self.scheduler.due(transitions, len(self.agent.memory))):
+            start = time.perf_counter()
+            self.agent.replay(self.scheduler.batch_size)
+            self.scheduler.record_update(time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--episodes', type=int, default=5000)
+    parser.add_argument('--arenas', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--replay-ratio', type=float, default=0.25, help="replay updates per transition")
+    parser.add_argument('--width', type=float, default=800.0)
+    parser.add_argument('--height', type=float, default=600.0)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--action-repeat', type=int, default=0,
+                        help="further states each decision is held for, like the server's ROBOCODE_ACTION_REPEAT")
+    args = parser.parse_args()
+
+    setup_logger('train_sim.log')
+    writer = SummaryWriter('train-logs/sim')
+    metrics = MetricsAggregator(TensorBoardSink(writer))
+    env = RobocodeEnv(metrics=metrics)
+    agent = DQNAgent(state_size=17, action_size=len(RobocodeEnv.ActionType), env=env, metrics=metrics)
+    arena = VectorArena(args.arenas, env.action_map, ArenaConfig(width=args.width, height=args.height), seed=args.seed)
+    # Every arena's transitions arrive together, so one slot may owe many updates
+    scheduler = ReplayScheduler(updates_per_transition=args.replay_ratio, batch_size=args.batch_size,
+                                max_updates_per_slot=None, metrics=metrics)
+    trainer = VectorTrainer(agent, env, arena, metrics, scheduler, action_repeat=args.action_repeat)
+
+    started, last_report = time.perf_counter(), 0
+    try:
+        while trainer.episodes < args.episodes:
+            trainer.step()
+            if trainer.episodes - last_report >= 100:
+                last_report = trainer.episodes
+                logger.info(f"Episodes {trainer.episodes}, {trainer.steps} steps, "
+                            f"{trainer.steps / (time.perf_counter() - started):.0f} steps/s, epsilon {agent.epsilon:.3f}")
+    finally:
+        agent.close()
+        metrics.close()
+        writer.close()
+
+
+if __name__ == '__main__':
+    main()
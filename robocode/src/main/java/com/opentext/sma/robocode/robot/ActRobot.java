@@ -25,6 +25,9 @@ public   class ActRobot extends AdvancedRobot {
     private ManagedChannel channel;
 
     private long lastUpdateTime = 0;
+    // Action plan from the last reply: re-applied at the next repeatsLeft decision points without a round trip
+    private Robot.Actions plannedActions;
+    private int repeatsLeft = 0;
 
     @Override
     public void run() {
@@ -118,8 +121,15 @@ public   class ActRobot extends AdvancedRobot {
     private void act(ScannedRobotEvent enemy) {
         try {
             lastUpdateTime = getTime();
+            if (repeatsLeft > 0) {
+                repeatsLeft--;
+                performActions(plannedActions);
+                return;
+            }
             Robot.Actions actions = blockingStub.act(ROBOT_MAPPER.gameStateToProto(this, enemy));
             log.debug("Received actions from Python server: {}", actions);
+            plannedActions = actions;
+            repeatsLeft = actions.getRepeat();
             performActions(actions);
         } catch (StatusRuntimeException e) {
             log.error("gRPC error when sending state to Python: {} - {}", e.getStatus(), e.getMessage());
@@ -0,0 +1,130 @@
+package com.opentext.sma.robocode.robot;
+
+import robot.Robot;
+
+import java.nio.ByteOrder;
+import java.nio.FloatBuffer;
+import java.util.List;
+import java.util.Random;
+
+/**
+ * Copy of the server's policy network, fetched with GetPolicy, so the robot can pick its actions
+ * without a round trip. Observations are encoded exactly like RobocodeEnv.encode_observation.
+ */
+public class LocalPolicy {
+
+    private static final double TWO_PI = 2 * Math.PI;
+    private static final double MAX_VELOCITY = 8.0;
+    private static final double MAX_ENERGY = 100.0;
+    private static final double MAX_GUN_HEAT = 3.0;
+    private static final double MISSING_BEARING = 360;
+    private static final float[] MISSING_ENEMY_FEATURES = {-1, -1, 0, -1, (float) MISSING_BEARING, -1, -1};
+
+    private final long version;
+    private final double epsilon;
+    private final List<Robot.Action> actions;
+    private final int[] layerSizes;
+    // Per layer: [in][out] weights flattened row-major, then the bias
+    private final float[][] weights;
+    private final float[][] biases;
+    private final Random random = new Random();
+
+    public LocalPolicy(Robot.Policy policy) {
+        this.version = policy.getVersion();
+        this.epsilon = policy.getEpsilon();
+        this.actions = policy.getActionsList();
+        this.layerSizes = policy.getLayerSizesList().stream().mapToInt(Integer::intValue).toArray();
+        this.weights = new float[layerSizes.length - 1][];
+        this.biases = new float[layerSizes.length - 1][];
+        FloatBuffer values = policy.getWeights().asReadOnlyByteBuffer().order(ByteOrder.LITTLE_ENDIAN).asFloatBuffer();
+        for (int layer = 0; layer < weights.length; layer++) {
+            weights[layer] = new float[layerSizes[layer] * layerSizes[layer + 1]];
+            values.get(weights[layer]);
+            biases[layer] = new float[layerSizes[layer + 1]];
+            values.get(biases[layer]);
+        }
+        if (values.hasRemaining() || actions.size() != layerSizes[layerSizes.length - 1]) {
+            throw new IllegalArgumentException("Policy " + version + " does not match its layer sizes");
+        }
+    }
+
+    public long getVersion() {
+        return version;
+    }
+
+    /** Epsilon-greedy action index for the state, using the server's exploration rate. */
+    public int chooseAction(Robot.GameState state) {
+        if (random.nextDouble() < epsilon) {
+            return random.nextInt(actions.size());
+        }
+        float[] q = qValues(encode(state));
+        int best = 0;
+        for (int i = 1; i < q.length; i++) {
+            if (q[i] > q[best]) {
+                best = i;
+            }
+        }
+        return best;
+    }
+
+    public Robot.Action action(int index) {
+        return actions.get(index);
+    }
+
+    float[] qValues(float[] input) {
+        float[] x = input;
+        for (int layer = 0; layer < weights.length; layer++) {
+            int in = layerSizes[layer];
+            int out = layerSizes[layer + 1];
+            float[] y = biases[layer].clone();
+            float[] w = weights[layer];
+            for (int i = 0; i < in; i++) {
+                float xi = x[i];
+                if (xi == 0) {
+                    continue;
+                }
+                int row = i * out;
+                for (int j = 0; j < out; j++) {
+                    y[j] += xi * w[row + j];
+                }
+            }
+            if (layer < weights.length - 1) {
+                for (int j = 0; j < out; j++) {
+                    y[j] = Math.max(y[j], 0);
+                }
+            }
+            x = y;
+        }
+        return x;
+    }
+
+    static float[] encode(Robot.GameState state) {
+        Robot.RobotState robot = state.getRobotState();
+        double width = robot.getBattleFieldWidth();
+        double height = robot.getBattleFieldHeight();
+        float[] features = new float[17];
+        features[0] = (float) (robot.getX() / width);
+        features[1] = (float) (robot.getY() / height);
+        features[2] = (float) (robot.getVelocity() / MAX_VELOCITY);
+        features[3] = (float) (robot.getHeading() / TWO_PI);
+        features[4] = (float) (robot.getGunHeading() / TWO_PI);
+        features[5] = (float) (robot.getRadarHeading() / TWO_PI);
+        features[6] = (float) (robot.getGunHeat() / MAX_GUN_HEAT);
+        features[7] = (float) (robot.getGunTurnRemaining() / TWO_PI);
+        features[8] = (float) (robot.getRadarTurnRemaining() / TWO_PI);
+        features[9] = (float) (robot.getEnergy() / MAX_ENERGY);
+        if (!state.hasEnemy()) {
+            System.arraycopy(MISSING_ENEMY_FEATURES, 0, features, 10, MISSING_ENEMY_FEATURES.length);
+            return features;
+        }
+        Robot.ScannedRobotEvent enemy = state.getEnemy();
+        features[10] = (float) (enemy.getX() / width);
+        features[11] = (float) (enemy.getY() / height);
+        features[12] = (float) (enemy.getVelocity() / MAX_VELOCITY);
+        features[13] = (float) (enemy.getHeading() / TWO_PI);
+        features[14] = (float) (enemy.getBearing() == MISSING_BEARING ? 2 : enemy.getBearing() / 180.0);
+        features[15] = (float) (enemy.getDistance() / Math.sqrt(width * width + height * height));
+        features[16] = (float) (enemy.getEnergy() / MAX_ENERGY);
+        return features;
+    }
+}
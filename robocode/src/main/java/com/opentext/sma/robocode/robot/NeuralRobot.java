@@ -3,7 +3,10 @@ package com.opentext.sma.robocode.robot;
 import com.google.protobuf.Empty;
 import io.grpc.ManagedChannel;
 import io.grpc.ManagedChannelBuilder;
+import io.grpc.Metadata;
 import io.grpc.StatusRuntimeException;
+import io.grpc.stub.MetadataUtils;
+import io.grpc.stub.StreamObserver;
 import lombok.extern.slf4j.Slf4j;
 import robocode.AdvancedRobot;
 import robocode.BulletHitBulletEvent;
@@ -20,21 +23,68 @@ import robocode.WinEvent;
 import robot.Robot;
 import robot.RobotServiceGrpc;
 
+import java.util.ArrayList;
+import java.util.List;
+import java.util.UUID;
 import java.util.concurrent.TimeUnit;
 
 @Slf4j
 public class NeuralRobot extends AdvancedRobot {
 
     static final Empty EMPTY = Empty.newBuilder().build();
+    // Replies to locally chosen actions carry nothing, so fire-and-forget sends drop them
+    private static final StreamObserver<Robot.Actions> IGNORE_ACTIONS = new StreamObserver<Robot.Actions>() {
+        @Override
+        public void onNext(Robot.Actions actions) {
+        }
+
+        @Override
+        public void onError(Throwable t) {
+            log.debug("Transition not delivered: {}", t.getMessage());
+        }
+
+        @Override
+        public void onCompleted() {
+        }
+    };
     private static final double WALL_THRESHOLD = 50;
-    private static final String PYTHON_SERVER_HOST = "localhost";
-    private static final int PYTHON_SERVER_PORT = 5001;
+    public static final String PYTHON_SERVER_HOST = "localhost";
+    public static final int PYTHON_SERVER_PORT = 5001;
     public static final RobotMapper ROBOT_MAPPER = RobotMapper.INSTANCE;
     private static final long UPDATE_INTERVAL_TURNS = 100; // turns
+    // Lets one Python server keep separate trajectories for every robot connected to it
+    private static final Metadata.Key<String> SESSION_ID_KEY =
+            Metadata.Key.of("x-session-id", Metadata.ASCII_STRING_MARSHALLER);
+    // Evaluation games: greedy actions from a frozen server-side snapshot, never trained on
+    private static final Metadata.Key<String> EVAL_KEY = Metadata.Key.of("x-eval", Metadata.ASCII_STRING_MARSHALLER);
+    public static final boolean EVAL = Boolean.parseBoolean(System.getProperty("EVAL", "false"));
+
+    private static final boolean USE_PLAY_STREAM = Boolean.parseBoolean(System.getProperty("PLAY_STREAM", "false"));
+    private static final long STATE_REPLY_TIMEOUT_MILLIS = 200;
+    // Queue events and send them with the next GameState / RoundResult instead of one OnEvent call each
+    private static final boolean BATCH_EVENTS = Boolean.parseBoolean(System.getProperty("BATCH_EVENTS", "true"));
+    // Choose actions with a local copy of the policy (GetPolicy) and only report transitions to the server
+    private static final boolean LOCAL_POLICY = Boolean.parseBoolean(System.getProperty("LOCAL_POLICY", "false"));
+    private static final long POLICY_SYNC_INTERVAL_TURNS = 200; // turns
+
+    private final String sessionId = UUID.randomUUID().toString();
 
     private RobotServiceGrpc.RobotServiceBlockingStub blockingStub;
+    private RobotServiceGrpc.RobotServiceStub asyncStub;
+    private PlayStream playStream;
     private ManagedChannel channel;
 
+    private final List<Robot.Event> pendingEvents = new ArrayList<>();
+    // Action plan from the last reply: re-applied at the next repeatsLeft decision points without a round trip
+    private Robot.Actions plannedActions;
+    private int repeatsLeft = 0;
+    // Numbers the states sent this round; executedSequence is the last one whose actions were performed
+    private long stateSequence = 0;
+    private long executedSequence = 0;
+    // Survives the per-round reconnect, so a round starts with one cheap notModified check
+    private static LocalPolicy localPolicy;
+    private long lastPolicySyncTime = -POLICY_SYNC_INTERVAL_TURNS;
+
     private int skippedTurns = 0;
     private long lastUpdateTime = 0;
 
@@ -66,8 +116,16 @@ public class NeuralRobot extends AdvancedRobot {
             channel = ManagedChannelBuilder.forAddress(PYTHON_SERVER_HOST, PYTHON_SERVER_PORT)
                     .usePlaintext()
                     .build();
-            blockingStub = RobotServiceGrpc.newBlockingStub(channel);
-            log.debug("gRPC connection initialized");
+            Metadata headers = new Metadata();
+            headers.put(SESSION_ID_KEY, sessionId);
+            if (EVAL) {
+                headers.put(EVAL_KEY, "true");
+            }
+            blockingStub = RobotServiceGrpc.newBlockingStub(channel)
+                    .withInterceptors(MetadataUtils.newAttachHeadersInterceptor(headers));
+            asyncStub = RobotServiceGrpc.newStub(channel)
+                    .withInterceptors(MetadataUtils.newAttachHeadersInterceptor(headers));
+            log.debug("gRPC connection initialized with session id {}", sessionId);
         } else {
             log.debug("Using existing gRPC connection");
         }
@@ -77,7 +135,8 @@ public class NeuralRobot extends AdvancedRobot {
         log.debug("Initializing robot settings");
         setAdjustRadarForGunTurn(true);
         setAdjustGunForRobotTurn(true);
-        endRound(Robot.RoundResult.Reason.UNKNOWN);
+        // No endRound here: it closes the Play stream and the channel before the first state is sent.
+        // StartRound already gives the server a fresh trajectory for this session.
         log.debug("Robot initialization complete");
     }
 
@@ -175,7 +234,15 @@ public class NeuralRobot extends AdvancedRobot {
 
 
     private void sendEventToPython(Robot.Event event) {
+        if (BATCH_EVENTS) {
+            pendingEvents.add(event);
+            return;
+        }
         try {
+            if (playStream != null && playStream.isOpen()) {
+                playStream.sendEvent(event);
+                return;
+            }
             blockingStub.onEvent(event);
             log.debug("Sent event to Python server: {}", event.getEventTypeCase());
         } catch (StatusRuntimeException e) {
@@ -189,9 +256,37 @@ public class NeuralRobot extends AdvancedRobot {
     private void sendStateToPythonAndPerformAction(ScannedRobotEvent enemy) {
         try {
             lastUpdateTime = getTime();
-            Robot.Actions actions = blockingStub.sendState(ROBOT_MAPPER.gameStateToProto(this, enemy));
+            if (repeatsLeft > 0) {
+                // Events keep accumulating and go out with the state that closes the window
+                repeatsLeft--;
+                performActions(plannedActions);
+                return;
+            }
+            Robot.GameState state = ROBOT_MAPPER.gameStateToProto(this, enemy).toBuilder()
+                    .setSequence(++stateSequence)
+                    .setExecutedSequence(executedSequence)
+                    .addAllEvents(pendingEvents)
+                    .build();
+            pendingEvents.clear();
+            // The local copy explores with the server's epsilon, so evaluation always asks the server
+            if (LOCAL_POLICY && !EVAL && actLocally(state)) {
+                return;
+            }
+            Robot.Actions actions;
+            if (playStream != null && playStream.isOpen()) {
+                actions = playStream.sendState(state, STATE_REPLY_TIMEOUT_MILLIS);
+                if (actions == null) {
+                    log.debug("No actions within {} ms, skipping this turn", STATE_REPLY_TIMEOUT_MILLIS);
+                    return;
+                }
+            } else {
+                actions = blockingStub.sendState(state);
+            }
             log.debug("Received actions from Python server: {}", actions);
+            plannedActions = actions;
+            repeatsLeft = actions.getRepeat();
             performActions(actions);
+            executedSequence = state.getSequence();
         } catch (StatusRuntimeException e) {
             log.error("gRPC error when sending state to Python: {} - {}", e.getStatus(), e.getMessage());
             // Optionally, you might want to attempt reconnecting to the gRPC server here
@@ -201,12 +296,65 @@ public class NeuralRobot extends AdvancedRobot {
         }
     }
 
+    /**
+     * Picks the action with the local policy and reports the state without waiting for a reply.
+     * Returns false when no policy could be fetched, so the caller asks the server as usual.
+     */
+    private boolean actLocally(Robot.GameState state) {
+        if (getTime() - lastPolicySyncTime >= POLICY_SYNC_INTERVAL_TURNS) {
+            syncPolicy();
+        }
+        if (localPolicy == null) {
+            return false;
+        }
+        int action = localPolicy.chooseAction(state);
+        Robot.GameState transition = state.toBuilder().setLocalAction(action).build();
+        if (playStream != null && playStream.isOpen()) {
+            playStream.sendTransition(transition);
+        } else {
+            asyncStub.sendState(transition, IGNORE_ACTIONS);
+        }
+        plannedActions = Robot.Actions.newBuilder().addActions(localPolicy.action(action)).build();
+        performActions(plannedActions);
+        executedSequence = state.getSequence();
+        return true;
+    }
+
+    private void syncPolicy() {
+        lastPolicySyncTime = getTime();
+        try {
+            long held = localPolicy == null ? 0 : localPolicy.getVersion();
+            Robot.Policy policy = blockingStub.withDeadlineAfter(STATE_REPLY_TIMEOUT_MILLIS, TimeUnit.MILLISECONDS)
+                    .getPolicy(Robot.PolicyRequest.newBuilder().setVersion(held).build());
+            if (!policy.getNotModified()) {
+                localPolicy = new LocalPolicy(policy);
+                log.debug("Loaded policy version {}", policy.getVersion());
+            }
+        } catch (StatusRuntimeException e) {
+            log.warn("Could not fetch policy, keeping version {}: {}",
+                    localPolicy == null ? "none" : localPolicy.getVersion(), e.getStatus());
+        } catch (IllegalArgumentException e) {
+            log.error("Rejected policy from server: {}", e.getMessage());
+        }
+    }
+
     private void endRound(Robot.RoundResult.Reason reason) {
         try {
             log.debug("Ending round");
-            Robot.RoundResult result = Robot.RoundResult.newBuilder().setReason(reason).build(); // Add more fields as needed (e.g., score, rank, etc.)
+            repeatsLeft = 0;
+            Robot.RoundResult result = Robot.RoundResult.newBuilder()
+                    .setReason(reason)
+                    .addAllEvents(pendingEvents)
+                    .setExecutedSequence(executedSequence)
+                    .build(); // Add more fields as needed (e.g., score, rank, etc.)
+            pendingEvents.clear();
 //                            .
-            blockingStub.endRound(result);
+            if (playStream != null && playStream.isOpen()) {
+                playStream.endRound(result);
+                playStream.close();
+            } else {
+                blockingStub.endRound(result);
+            }
             log.debug("Round end signal sent to Python server");
             cleanupGrpcConnection();
         } catch (StatusRuntimeException e) {
@@ -219,7 +367,15 @@ public class NeuralRobot extends AdvancedRobot {
         try {
             log.debug("Start a round");
 
-            blockingStub.startRound(Empty.newBuilder().build());
+            // endRound closes the stream with the round, so every round opens its own
+            if (USE_PLAY_STREAM && (playStream == null || !playStream.isOpen())) {
+                playStream = new PlayStream(asyncStub);
+            }
+            if (playStream != null && playStream.isOpen()) {
+                playStream.startRound();
+            } else {
+                blockingStub.startRound(Empty.newBuilder().build());
+            }
             log.debug("Round start signal sent to Python server");
         } catch (StatusRuntimeException e) {
             log.error("Error start round: {}", e.getMessage(), e);
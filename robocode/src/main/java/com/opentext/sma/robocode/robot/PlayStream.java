@@ -0,0 +1,102 @@
+package com.opentext.sma.robocode.robot;
+
+import com.google.protobuf.Empty;
+import io.grpc.stub.StreamObserver;
+import lombok.extern.slf4j.Slf4j;
+import robot.Robot;
+import robot.RobotServiceGrpc;
+
+import java.util.concurrent.BlockingQueue;
+import java.util.concurrent.LinkedBlockingQueue;
+import java.util.concurrent.TimeUnit;
+
+/**
+ * Client side of the bidirectional Play RPC. Events and round markers are written to the
+ * stream without waiting; only a state waits for its Actions reply.
+ */
+@Slf4j
+public class PlayStream implements StreamObserver<Robot.Actions> {
+
+    private final BlockingQueue<Robot.Actions> responses = new LinkedBlockingQueue<>();
+    private final StreamObserver<Robot.RobotMessage> requests;
+    private volatile boolean open = true;
+
+    public PlayStream(RobotServiceGrpc.RobotServiceStub asyncStub) {
+        this.requests = asyncStub.play(this);
+    }
+
+    public boolean isOpen() {
+        return open;
+    }
+
+    public void sendEvent(Robot.Event event) {
+        send(Robot.RobotMessage.newBuilder().setEvent(event).build());
+    }
+
+    public void startRound() {
+        send(Robot.RobotMessage.newBuilder().setStartRound(Empty.getDefaultInstance()).build());
+    }
+
+    public void endRound(Robot.RoundResult result) {
+        send(Robot.RobotMessage.newBuilder().setRoundResult(result).build());
+    }
+
+    /**
+     * Sends a state and waits up to timeoutMillis for the Actions answering it, matched on
+     * GameState.sequence. Returns null on timeout; replies to earlier states are dropped, so a late
+     * reply is never executed as the answer to a newer state.
+     */
+    public Robot.Actions sendState(Robot.GameState state, long timeoutMillis) throws InterruptedException {
+        responses.clear();
+        send(Robot.RobotMessage.newBuilder().setState(state).build());
+        long deadline = System.nanoTime() + TimeUnit.MILLISECONDS.toNanos(timeoutMillis);
+        while (true) {
+            Robot.Actions actions = responses.poll(deadline - System.nanoTime(), TimeUnit.NANOSECONDS);
+            if (actions == null || actions.getSequence() == state.getSequence()) {
+                return actions;
+            }
+            log.debug("Dropping late reply to state {}", actions.getSequence());
+        }
+    }
+
+    /**
+     * Sends a state whose action was already chosen locally (GameState.localAction). The server
+     * still answers it with empty Actions, which are dropped instead of waited for.
+     */
+    public void sendTransition(Robot.GameState state) {
+        responses.clear();
+        send(Robot.RobotMessage.newBuilder().setState(state).build());
+    }
+
+    public synchronized void close() {
+        if (open) {
+            open = false;
+            requests.onCompleted();
+        }
+    }
+
+    private synchronized void send(Robot.RobotMessage message) {
+        if (!open) {
+            log.warn("Play stream is closed, dropping {}", message.getPayloadCase());
+            return;
+        }
+        requests.onNext(message);
+    }
+
+    @Override
+    public void onNext(Robot.Actions actions) {
+        responses.offer(actions);
+    }
+
+    @Override
+    public void onError(Throwable t) {
+        open = false;
+        log.error("Play stream failed: {}", t.getMessage());
+    }
+
+    @Override
+    public void onCompleted() {
+        open = false;
+        log.debug("Play stream completed by server");
+    }
+}
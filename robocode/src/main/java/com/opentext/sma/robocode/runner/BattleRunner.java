@@ -1,7 +1,11 @@
 package com.opentext.sma.robocode.runner;
 
+import com.google.protobuf.Empty;
 import com.opentext.sma.robocode.robot.NeuralRobot;
 import com.opentext.sma.robocode.robot.SampleRamFire;
+import io.grpc.ManagedChannel;
+import io.grpc.ManagedChannelBuilder;
+import io.grpc.StatusRuntimeException;
 import lombok.extern.slf4j.Slf4j;
 import org.slf4j.Logger;
 import org.slf4j.LoggerFactory;
@@ -13,21 +17,29 @@ import robocode.control.events.BattleAdaptor;
 import robocode.control.events.BattleCompletedEvent;
 import robocode.control.events.BattleErrorEvent;
 import robocode.control.events.BattleMessageEvent;
+import robot.Robot;
+import robot.RobotServiceGrpc;
 
 import java.io.File;
 import java.util.Arrays;
 import java.util.List;
 import java.util.Random;
+import java.util.concurrent.TimeUnit;
 
 @Slf4j
 public class BattleRunner {
+    private static final long SERVER_READY_TIMEOUT_MILLIS = 120_000;
+    private static final long HEALTH_POLL_INTERVAL_MILLIS = 500;
+
     public static void main(String[] args) {
         log.info("Starting Robocode Battle");
+        waitForServer();
 
         RobocodeEngine.setLogMessagesEnabled(false);
         RobocodeEngine engine = new RobocodeEngine(new File("."));
 
-        engine.addBattleListener(new BattleObserver());
+        BattleObserver observer = new BattleObserver();
+        engine.addBattleListener(observer);
         boolean visible = Boolean.parseBoolean(System.getProperty("VISIBLE", "false"));
         engine.setVisible(visible);
 
@@ -46,6 +58,12 @@ public class BattleRunner {
                 "sample.SpinBot"
         );
 
+        if (NeuralRobot.EVAL) {
+            runEvaluationSweep(engine, observer, battlefield, neuralRobot, enemyRobots);
+            engine.close();
+            return;
+        }
+
         while (true) {
             Random random = new Random();
             String selectedEnemyName = enemyRobots.get(random.nextInt(enemyRobots.size()));
@@ -57,10 +75,67 @@ public class BattleRunner {
         }
     }
 
+    /**
+     * One battle of EVAL_ROUNDS rounds against every enemy, reporting how many rounds NeuralRobot won.
+     * With -DEVAL=true the server serves these games greedily from a frozen policy and does not learn from them.
+     */
+    private static void runEvaluationSweep(RobocodeEngine engine, BattleObserver observer,
+                                           BattlefieldSpecification battlefield, RobotSpecification neuralRobot,
+                                           List<String> enemyRobots) {
+        int rounds = Integer.getInteger("EVAL_ROUNDS", 100);
+        for (String enemyName : enemyRobots) {
+            RobotSpecification enemy = engine.getLocalRepository(enemyName)[0];
+            engine.runBattle(new BattleSpecification(rounds, battlefield,
+                    new RobotSpecification[]{neuralRobot, enemy}), true);
+            for (robocode.BattleResults result : observer.lastResults) {
+                if (result.getTeamLeaderName().startsWith(NeuralRobot.class.getName())) {
+                    log.info("Evaluation vs {}: won {}/{} rounds ({} %)", enemyName, result.getFirsts(), rounds,
+                            String.format("%.1f", 100.0 * result.getFirsts() / rounds));
+                }
+            }
+        }
+    }
+
+    /**
+     * Polls the Health RPC until the Python server reports ready, so the first rounds are not played
+     * against a port that is closed or a model that is still loading.
+     */
+    private static void waitForServer() {
+        ManagedChannel channel = ManagedChannelBuilder
+                .forAddress(NeuralRobot.PYTHON_SERVER_HOST, NeuralRobot.PYTHON_SERVER_PORT)
+                .usePlaintext()
+                .build();
+        RobotServiceGrpc.RobotServiceBlockingStub stub = RobotServiceGrpc.newBlockingStub(channel);
+        long deadline = System.currentTimeMillis() + SERVER_READY_TIMEOUT_MILLIS;
+        try {
+            while (System.currentTimeMillis() < deadline) {
+                try {
+                    Robot.HealthStatus status = stub.withDeadlineAfter(HEALTH_POLL_INTERVAL_MILLIS, TimeUnit.MILLISECONDS)
+                            .health(Empty.getDefaultInstance());
+                    if (status.getReady()) {
+                        log.info("Python server ready (started in {} s)", String.format("%.2f", status.getStartupSeconds()));
+                        return;
+                    }
+                    log.debug("Python server is up, still loading");
+                } catch (StatusRuntimeException e) {
+                    log.debug("Python server not reachable yet: {}", e.getStatus());
+                }
+                Thread.sleep(HEALTH_POLL_INTERVAL_MILLIS);
+            }
+            log.warn("Python server not ready after {} ms, starting battles anyway", SERVER_READY_TIMEOUT_MILLIS);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+        } finally {
+            channel.shutdownNow();
+        }
+    }
+
     static class BattleObserver extends BattleAdaptor {
         private static final Logger logger = LoggerFactory.getLogger(BattleObserver.class);
+        volatile robocode.BattleResults[] lastResults = new robocode.BattleResults[0];
 
         public void onBattleCompleted(BattleCompletedEvent e) {
+            lastResults = e.getSortedResults();
             logger.info("-- Battle has completed --");
             logger.info("Battle results:");
             for (robocode.BattleResults result : e.getSortedResults()) {